@@ -1,7 +1,11 @@
 from allauth.account.adapter import DefaultAccountAdapter
+from allauth.core import context
 from django.conf import settings
+from django.contrib.sites.shortcuts import get_current_site
 from django.urls import reverse
 
+from . import outbox
+
 class CustomAccountAdapter(DefaultAccountAdapter):
     def get_email_confirmation_url(self, request, emailconfirmation):
         """
@@ -16,3 +20,19 @@ class CustomAccountAdapter(DefaultAccountAdapter):
         This method is called by allauth during the password reset flow.
         """
         return f"{settings.FRONTEND_URL}/reset-password/{key}"
+
+    def send_mail(self, template_prefix, email, context_data):
+        """
+        Renders the email like allauth does, but queues it in the outbox
+        (accounts/outbox.py) instead of sending it during the request.
+        Covers confirmation emails and dj-rest-auth's password reset.
+        """
+        request = context.request
+        ctx = {
+            "request": request,
+            "email": email,
+            "current_site": get_current_site(request),
+        }
+        ctx.update(context_data)
+        outbox.enqueue(self.render_mail(template_prefix, email, ctx))
+
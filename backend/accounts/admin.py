@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 
+from .models import OutboundEmail
+
 # Get our CustomUser model
 User = get_user_model()
 
@@ -101,3 +103,17 @@ class CustomUserAdmin(UserAdmin):
     
     # Fields that cannot be edited (only viewed)
     readonly_fields = ['date_joined', 'last_login']
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Read-only view of the email outbox, e.g. to find failed deliveries."""
+    list_display = ['subject', 'to', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject']
+    ordering = ['-created_at']
+    readonly_fields = [field.name for field in OutboundEmail._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
@@ -0,0 +1,90 @@
+"""
+JWT authentication without a user query on every request.
+
+`CachedJWTAuthentication` validates the token like simplejwt's
+JWTAuthentication, but resolves the user from a small per-worker cache
+that keeps users for AUTH_USER_CACHE_TTL seconds. Saving or deleting a
+user (password change, deactivation, name edits) or their profile evicts
+the entry in the worker that made the change (see accounts/signals.py);
+other workers pick the change up when their entry expires.
+
+`TokenUserJWTAuthentication` goes further for read-only endpoints that
+only need to know who is asking: safe requests get a stateless TokenUser
+built from the token's claims (no query, no cache), anything else is
+authenticated like CachedJWTAuthentication.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+_lock = threading.Lock()
+_users = {}  # user id -> (expires at, user), oldest first
+
+
+def cache_ttl():
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 30)
+
+
+def evict(user_id):
+    """Forget a user in this worker, e.g. after it was saved."""
+    _users.pop(str(user_id), None)
+
+
+def clear():
+    """Forget every cached user (used by tests and benchmarks)."""
+    _users.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication with a short-TTL per-worker user cache."""
+
+    def get_user(self, validated_token):
+        ttl = cache_ttl()
+        if ttl <= 0:
+            return super().get_user(validated_token)
+
+        # Tokens carry the id as a string; signals evict by primary key
+        user_id = str(validated_token.get(api_settings.USER_ID_CLAIM))
+        entry = _users.get(user_id)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            user = entry[1]
+        else:
+            # Runs simplejwt's checks (user exists, is active, revocation)
+            user = super().get_user(validated_token)
+            with _lock:
+                _users.pop(user_id, None)
+                _users[user_id] = (now + ttl, user)
+                while len(_users) > getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000):
+                    _users.pop(next(iter(_users)))
+        # A copy per request, so relations cached by one request (e.g.
+        # user.profile) never leak into another
+        return copy.copy(user)
+
+
+class TokenUserJWTAuthentication(CachedJWTAuthentication):
+    """
+    Stateless TokenUser for safe methods, cached users otherwise. Only for
+    views that use nothing but `request.user.id`.
+    """
+
+    def authenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            return super().authenticate(request)
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return api_settings.TOKEN_USER_CLASS(validated_token), validated_token
@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts import authentication
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-request JWT authentication overhead (accounts/authentication.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000, help='Requests per authentication class (default: 5000).')
+        parser.add_argument('--username', type=str, default=None, help='User to authenticate as (default: the first user).')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(is_active=True).order_by('pk')
+        if options['username']:
+            users = users.filter(username=options['username'])
+        user = users.first()
+        if user is None:
+            raise CommandError("No active user to authenticate as; create one first.")
+
+        header = f'Bearer {AccessToken.for_user(user)}'
+        factory = APIRequestFactory()
+        classes = (
+            ('JWTAuthentication', JWTAuthentication),
+            ('CachedJWTAuthentication', authentication.CachedJWTAuthentication),
+            ('TokenUserJWTAuthentication (GET)', authentication.TokenUserJWTAuthentication),
+        )
+        self.stdout.write(f"{options['iterations']} requests per class, authenticating as {user.username}")
+        # The cache is usually disabled under tests; make sure it is on here
+        with override_settings(AUTH_USER_CACHE_TTL=max(authentication.cache_ttl(), 30)):
+            authentication.clear()
+            for name, auth_class in classes:
+                auth = auth_class()
+                timings = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(options['iterations']):
+                        request = Request(factory.get('/api/v1/exercises/', HTTP_AUTHORIZATION=header))
+                        start = time.perf_counter_ns()
+                        auth.authenticate(request)
+                        timings.append((time.perf_counter_ns() - start) / 1000)
+                timings.sort()
+                self.stdout.write(
+                    f"{name}: mean {statistics.fmean(timings):.1f} us, "
+                    f"p50 {timings[len(timings) // 2]:.1f} us, p99 {timings[int(len(timings) * 0.99)]:.1f} us, "
+                    f"{len(queries) / len(timings):.3f} queries/request"
+                )
+            authentication.clear()
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import ThrottleBucket
+from accounts.throttling import longest_period
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete rate limit buckets that have been idle long enough to be full again. "
+        "A missing bucket behaves exactly like a full one, so this only reclaims space. "
+        "Meant to run on a schedule (e.g. daily from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Buckets deleted per statement (default: 1000).')
+
+    def handle(self, *args, **options):
+        # Every bucket refills within the longest configured period
+        cutoff = time.time() - longest_period()
+        batch_size = max(options['batch_size'], 1)
+        deleted = 0
+        while True:
+            keys = list(
+                ThrottleBucket.objects.filter(updated_at__lt=cutoff).order_by().values_list('key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            # Re-checked, in case a request used the bucket in the meantime
+            deleted += ThrottleBucket.objects.filter(key__in=keys, updated_at__lt=cutoff).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} idle rate limit buckets."))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted refresh tokens in small batches. "
+        "Meant to run on a schedule (e.g. hourly from cron); each batch is its own "
+        "short transaction, so refreshes are never blocked for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tokens deleted per transaction (default: 1000).')
+        parser.add_argument(
+            '--sleep', type=float, default=0.0,
+            help='Seconds to pause between batches, to spread the load (default: 0).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        # Only tokens expired before the start; newer ones wait for the next run
+        cutoff = timezone.now()
+        start = time.perf_counter()
+        outstanding = blacklisted = batches = 0
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=cutoff).order_by().values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            batches += 1
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"Batch {batches}: {len(ids)} tokens")
+            if options['sleep'] and len(ids) == batch_size:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {outstanding} outstanding and {blacklisted} blacklisted tokens "
+            f"in {batches} batches ({time.perf_counter() - start:.2f}s)."
+        ))
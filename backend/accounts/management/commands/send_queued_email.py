@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts import outbox
+from accounts.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued emails (accounts/outbox.py) in batches. Runs until the queue is "
+        "drained, or keeps polling with --loop (e.g. as a supervised background worker)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails per batch and connection (default: 50).')
+        parser.add_argument('--loop', action='store_true', help='Keep running, polling for new emails.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --loop (default: 2).')
+        parser.add_argument(
+            '--purge-days', type=int, default=None,
+            help='Also delete emails sent more than this many days ago.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = outbox.send_batch(batch_size)
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f"Batch: {sent} sent, {failed} failed")
+                # A full batch likely means more are waiting
+                if sent + failed == batch_size:
+                    continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        if options['purge_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['purge_days'])
+            purged = OutboundEmail.objects.filter(status=OutboundEmail.Status.SENT, sent_at__lt=cutoff).delete()[0]
+            self.stdout.write(f"Purged {purged} sent emails.")
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} emails, {total_failed} failed."))
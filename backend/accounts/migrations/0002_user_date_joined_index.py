@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:54
+
+from django.db import migrations, models
+
+
+def create_username_prefix_index(apps, schema_editor):
+    # LOWER(username) LIKE 'prefix%' (profile directory search) can only use
+    # a text_pattern_ops index on PostgreSQL; other backends skip it.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS user_username_lower_prefix_idx '
+        'ON accounts_customuser (LOWER(username) text_pattern_ops)'
+    )
+
+
+def drop_username_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS user_username_lower_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-date_joined', '-id'], name='user_date_joined_idx'),
+        ),
+        migrations.RunPython(create_username_prefix_index, drop_username_prefix_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:01
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def backfill_email_verified(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    EmailAddress = apps.get_model('account', 'EmailAddress')
+    verified = EmailAddress.objects.filter(user=OuterRef('pk'), email__iexact=OuterRef('email'), verified=True)
+    CustomUser.objects.filter(Exists(verified)).update(email_verified=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_date_joined_index'),
+        ('account', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='email_verified',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(backfill_email_verified, migrations.RunPython.noop),
+    ]
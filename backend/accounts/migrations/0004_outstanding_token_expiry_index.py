@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_expiry_index(apps, schema_editor):
+    # prune_token_blacklist selects expired tokens in batches; simplejwt's
+    # table has no index on expires_at. Created here because the model
+    # belongs to a third-party app.
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS outstanding_token_expires_idx '
+        'ON token_blacklist_outstandingtoken (expires_at)'
+    )
+
+
+def drop_expiry_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS outstanding_token_expires_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_email_verified'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_expiry_index, drop_expiry_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_outstanding_token_expiry_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:18
+
+import accounts.models
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# Username lookups use user_username_lower_prefix_idx (0002), a
+# text_pattern_ops index on LOWER(username) that serves equality as well as
+# prefix lookups
+INDEXES = [
+    models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    # CONCURRENTLY on PostgreSQL, so signups and logins aren't blocked while
+    # the index is built; a plain CREATE INDEX elsewhere.
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for index in INDEXES:
+        if concurrently:
+            schema_editor.add_index(CustomUser, index, concurrently=True)
+        else:
+            schema_editor.add_index(CustomUser, index)
+
+
+def drop_indexes(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for index in INDEXES:
+        if concurrently:
+            schema_editor.remove_index(CustomUser, index, concurrently=True)
+        else:
+            schema_editor.remove_index(CustomUser, index)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0006_outboundemail'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', accounts.models.CustomUserManager()),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='customuser', index=index) for index in INDEXES],
+            database_operations=[migrations.RunPython(create_indexes, drop_indexes, atomic=False)],
+        ),
+    ]
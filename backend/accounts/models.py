@@ -1,5 +1,21 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+
+class CustomUserManager(UserManager):
+    """
+    Case-insensitive lookups written as LOWER(column) = LOWER(value), which
+    the functional indexes on CustomUser can serve. (`__iexact` compiles to
+    UPPER(column::text) on PostgreSQL and can't use any index.)
+    """
+
+    def filter_username(self, username):
+        return self.annotate(username_lower=Lower('username')).filter(username_lower=Lower(Value(username)))
+
+    def filter_email(self, email):
+        return self.annotate(email_lower=Lower('email')).filter(email_lower=Lower(Value(email)))
 
 
 class CustomUser(AbstractUser):
@@ -17,8 +33,9 @@ class CustomUser(AbstractUser):
     - date_joined: timestamp when account was created
     - last_login: timestamp of last login
     
-    Email verification is handled by django-allauth's EmailAddress model,
-    so we don't need to add any extra fields for that.
+    Email verification is handled by django-allauth's EmailAddress model.
+    Whether the current email is verified is copied to `email_verified`
+    (see accounts/signals.py), so serializing a user needs no extra query.
     
     Why create a CustomUser at all if we don't add fields?
     - It's a Django best practice to use a custom user model from the start
@@ -28,14 +45,74 @@ class CustomUser(AbstractUser):
     
     # Make email field required and unique
     email = models.EmailField(unique=True)
+
+    # Mirrors allauth's EmailAddress for `email`; kept in sync by signals
+    email_verified = models.BooleanField(default=False, editable=False)
     
     # When creating superuser via command line, Django will ask for these fields
     # in addition to username and password
     REQUIRED_FIELDS = ['email']
+
+    objects = CustomUserManager()
     
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Newest-first ordering of the public profile directory
+            models.Index(fields=['-date_joined', '-id'], name='user_date_joined_idx'),
+            # Case-insensitive email lookups (CustomUserManager). Username
+            # lookups and prefix searches share the LOWER(username)
+            # text_pattern_ops index created on PostgreSQL in migration 0002.
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
     
     def __str__(self):
         return self.username
+
+
+class ThrottleBucket(models.Model):
+    """
+    Token bucket of one rate limit key (see accounts/throttling.py). Kept in
+    the database so every worker shares the same limits.
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    tokens = models.FloatField()
+    # Epoch seconds of the last refill; plain float arithmetic in SQL
+    updated_at = models.FloatField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class OutboundEmail(models.Model):
+    """
+    A queued email (see accounts/outbox.py). Auth flows only insert a row;
+    the send_queued_email command delivers them.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    subject = models.CharField(max_length=998)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(help_text='List of recipient addresses')
+    headers = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=6, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    send_after = models.DateTimeField(help_text='Not sent before this time (retry backoff)')
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's queue: due messages, oldest first
+            models.Index(fields=['send_after'], condition=models.Q(status='queued'), name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)}"
@@ -0,0 +1,124 @@
+"""
+Outbound email queue.
+
+Confirmation and password reset emails used to be sent over SMTP inside
+the request, so a slow mail server stalled signup and reset. The account
+adapter now renders each message and stores it in OutboundEmail (one
+INSERT); `send_queued_email` delivers due messages in batches over a single
+connection, retrying failures with exponential backoff. The worker runs as
+the email-worker service in docker/compose.yaml; without it, messages stay
+queued.
+
+Any EMAIL_BACKEND works for delivery, e.g. the console or file backend in
+development and locmem in tests.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+def max_attempts():
+    return getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the given number of failed attempts."""
+    return getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60) * 2 ** (attempts - 1)
+
+
+def enqueue(message):
+    """Queue a rendered EmailMessage instead of sending it."""
+    html_body = next(
+        (content for content, mimetype in getattr(message, 'alternatives', []) if mimetype == 'text/html'), ''
+    )
+    return OutboundEmail.objects.create(
+        subject=message.subject,
+        body=message.body,
+        html_body=html_body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL or '',
+        to=list(message.to),
+        headers=dict(message.extra_headers),
+        send_after=timezone.now(),
+    )
+
+
+def _message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.to, headers=email.headers, connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def lease():
+    """Seconds a claimed message stays reserved for the worker sending it."""
+    return getattr(settings, 'EMAIL_OUTBOX_LEASE', 300)
+
+
+def claim(batch_size, now):
+    """
+    Reserve up to `batch_size` due messages by moving their send_after past
+    the lease, in a short transaction (locked rows are skipped by other
+    workers on PostgreSQL). A worker that dies mid-batch leaves its
+    messages to be picked up again once the lease runs out.
+    """
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboundEmail.Status.QUEUED, send_after__lte=now,
+            ).order_by('send_after', 'id')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            send_after=now + timedelta(seconds=lease())
+        )
+    return emails
+
+
+def send_batch(batch_size=50):
+    """
+    Send up to `batch_size` due messages. Messages are claimed first and
+    sent without holding a transaction or row locks open, then the results
+    are saved in one statement. Returns (sent, failed).
+    """
+    now = timezone.now()
+    emails = claim(batch_size, now)
+    if not emails:
+        return 0, 0
+
+    try:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+    except Exception as e:
+        connection, error = None, e
+
+    sent = failed = 0
+    for email in emails:
+        email.attempts += 1
+        if connection is not None:
+            try:
+                _message(email, connection).send()
+            except Exception as e:
+                error = e
+            else:
+                email.status = OutboundEmail.Status.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                sent += 1
+                continue
+        email.last_error = f'{type(error).__name__}: {error}'
+        if email.attempts >= max_attempts():
+            email.status = OutboundEmail.Status.FAILED
+        else:
+            email.send_after = now + timedelta(seconds=retry_delay(email.attempts))
+        failed += 1
+
+    if connection is not None:
+        connection.close()
+    OutboundEmail.objects.bulk_update(emails, ['status', 'sent_at', 'attempts', 'last_error', 'send_after'])
+    return sent, failed
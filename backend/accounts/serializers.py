@@ -6,7 +6,6 @@ from allauth.account.forms import ResetPasswordForm
 from django.conf import settings
 from allauth.account.utils import user_pk_to_url_str
 from allauth.account.forms import default_token_generator
-from allauth.account.models import EmailAddress
 
 # Get our CustomUser model
 User = get_user_model()
@@ -37,7 +36,7 @@ class RegisterSerializer(BaseRegisterSerializer):
         Check that email is unique before allowing registration.
         """
         email = email.lower()  # Normalize email to lowercase
-        if User.objects.filter(email__iexact=email).exists():
+        if User.objects.filter_email(email).exists():
             raise serializers.ValidationError(
                 "A user with that email already exists."
             )
@@ -78,14 +77,6 @@ class UserSerializer(serializers.ModelSerializer):
     - Provides default create() and update() methods
     """
     
-    email_verified = serializers.SerializerMethodField()
-
-    def get_email_verified(self, obj):
-        try:
-            return EmailAddress.objects.filter(user=obj, email=obj.email, verified=True).exists()
-        except Exception:
-            return False
-
     class Meta:
         model = User
         
@@ -96,7 +87,7 @@ class UserSerializer(serializers.ModelSerializer):
             'email',        # Email address
             'first_name',   # Optional first name
             'last_name',    # Optional last name
-            'email_verified', # Whether primary email is verified
+            'email_verified', # Whether the email is verified (denormalized, no query)
         ]
         
         # Fields that cannot be modified via API
@@ -0,0 +1,70 @@
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from profiles.models import Profile
+
+from . import authentication
+
+User = get_user_model()
+
+
+def update_email_verified(user_id):
+    """
+    Recompute CustomUser.email_verified from allauth's EmailAddress rows.
+    Returns the new value.
+    """
+    email = User.objects.filter(pk=user_id).values_list('email', flat=True).first()
+    if email is None:
+        return False
+    verified = EmailAddress.objects.filter(user_id=user_id, email__iexact=email, verified=True).exists()
+    User.objects.filter(pk=user_id).exclude(email_verified=verified).update(email_verified=verified)
+    return verified
+
+
+# allauth saves the EmailAddress row when an address is confirmed, added,
+# changed or made primary, so these cover its email_confirmed and
+# email_changed flows as well as admin edits.
+@receiver(post_save, sender=EmailAddress)
+@receiver(post_delete, sender=EmailAddress)
+def sync_email_verified(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    verified = update_email_verified(instance.user_id)
+    if sender._meta.get_field('user').is_cached(instance):
+        instance.user.email_verified = verified
+
+
+@receiver(pre_save, sender=User)
+def remember_email(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._previous_email = None
+    # Most saves (e.g. last_login on every login) don't touch the email
+    if raw or not instance.pk or (update_fields is not None and 'email' not in update_fields):
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list('email', 'email_verified').first()
+    if stored is not None:
+        # The flag is only ever set by update_email_verified; don't let a
+        # full save of an instance loaded earlier write back a stale value
+        instance._previous_email, instance.email_verified = stored
+
+
+@receiver(post_save, sender=User)
+def sync_email_verified_on_email_change(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_email', None)
+    if raw or created or previous is None or previous == instance.email:
+        return
+    instance.email_verified = update_email_verified(instance.pk)
+
+
+# --- Per-worker user cache (accounts/authentication.py) ------------------------
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    # Password changes, deactivation and name edits all save the user
+    authentication.evict(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def evict_cached_profile_user(sender, instance, **kwargs):
+    authentication.evict(instance.user_id)
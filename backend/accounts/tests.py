@@ -1,9 +1,30 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
 from django.urls import reverse
-from allauth.account.models import EmailAddress
+from allauth.account.models import EmailAddress, EmailConfirmationHMAC
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import authentication, outbox, throttling, tokens
+from .models import OutboundEmail, ThrottleBucket
 
 User = get_user_model()
 
@@ -434,3 +455,506 @@ class UserLogoutTestCase(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+
+
+@override_settings(
+    ACCOUNT_EMAIL_VERIFICATION='optional',
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+)
+class EmailVerifiedTestCase(APITestCase):
+    """
+    Test suite for the denormalized CustomUser.email_verified flag.
+
+    Tests cover:
+    - Confirming the email through allauth sets the flag
+    - Unverifying, removing or changing the email clears it
+    - Saving a stale user instance doesn't overwrite it
+    - User details are served from the authenticated user, without extra queries
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='SecurePass123'
+        )
+
+    def verified(self):
+        return User.objects.get(pk=self.user.pk).email_verified
+
+    def test_confirmation_sets_flag(self):
+        """
+        Confirming a registration email through the API sets the flag.
+        """
+        self.client.post('/api/v1/auth/registration/', {
+            'username': 'newuser',
+            'email': 'new@example.com',
+            'password1': 'SecurePass123',
+            'password2': 'SecurePass123'
+        })
+        user = User.objects.get(username='newuser')
+        self.assertFalse(user.email_verified)
+
+        key = EmailConfirmationHMAC(EmailAddress.objects.get(user=user)).key
+        response = self.client.post('/api/v1/auth/registration/verify-email/', {'key': key})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.email_verified)
+
+    def test_flag_follows_email_addresses(self):
+        """
+        The flag tracks the EmailAddress row of the user's current email.
+        """
+        address = EmailAddress.objects.create(user=self.user, email='test@example.com', primary=True, verified=True)
+        self.assertTrue(self.verified())
+
+        address.verified = False
+        address.save()
+        self.assertFalse(self.verified())
+
+        address.verified = True
+        address.save()
+        # A verified address other than the user's email doesn't count
+        self.user.email = 'changed@example.com'
+        self.user.save()
+        self.assertFalse(self.user.email_verified)
+        self.assertFalse(self.verified())
+
+        self.user.email = 'test@example.com'
+        self.user.save()
+        self.assertTrue(self.verified())
+        address.delete()
+        self.assertFalse(self.verified())
+
+    def test_stale_instance_keeps_flag(self):
+        """
+        Saving a user loaded before the confirmation keeps the flag set.
+        """
+        stale = User.objects.get(pk=self.user.pk)
+        EmailAddress.objects.create(user=self.user, email='test@example.com', primary=True, verified=True)
+        stale.first_name = 'Test'
+        stale.save()
+        self.assertTrue(self.verified())
+
+    def test_user_details_query_count(self):
+        """
+        GET /auth/user/ is a single primary-key read of the user.
+        """
+        EmailAddress.objects.create(user=self.user, email='test@example.com', primary=True, verified=True)
+        access = self.client.post('/api/v1/auth/login/', {
+            'username': 'testuser',
+            'password': 'SecurePass123'
+        }).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/auth/user/')
+        self.assertTrue(response.data['email_verified'])
+
+
+@override_settings(AUTH_USER_CACHE_TTL=30)
+class CachedJWTAuthenticationTestCase(APITestCase):
+    """
+    Test suite for the per-worker authenticated user cache.
+
+    Tests cover:
+    - Repeated requests resolve the user without a query
+    - Deactivation, password changes and profile edits evict the user
+    - Stateless token users on safe requests of catalog endpoints
+    """
+
+    def setUp(self):
+        authentication.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='SecurePass123'
+        )
+        self.token = str(AccessToken.for_user(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def tearDown(self):
+        authentication.clear()
+
+    def test_repeated_requests_skip_user_query(self):
+        """
+        Only the first request reads the user.
+        """
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/auth/user/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/auth/user/')
+        self.assertEqual(response.data['username'], 'testuser')
+
+    def test_deactivation_evicts_user(self):
+        """
+        A deactivated user is rejected on the next request.
+        """
+        self.client.get('/api/v1/auth/user/')
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/v1/auth/user/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_evicts_user(self):
+        """
+        Changing the password makes the next request read the user again.
+        """
+        self.client.get('/api/v1/auth/user/')
+        self.user.set_password('AnotherPass456')
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/auth/user/')
+
+    def test_profile_edit_is_visible(self):
+        """
+        Names edited through the profile show up on the next request.
+        """
+        self.client.get('/api/v1/auth/user/')
+        self.client.patch('/api/v1/profiles/me/', {'first_name': 'Changed'})
+        response = self.client.get('/api/v1/auth/user/')
+        self.assertEqual(response.data['first_name'], 'Changed')
+
+    def test_token_user_on_safe_requests(self):
+        """
+        Safe requests get a stateless TokenUser; others a real user.
+        """
+        auth = authentication.TokenUserJWTAuthentication()
+        factory = APIRequestFactory()
+        header = f'Bearer {self.token}'
+        with self.assertNumQueries(0):
+            user, _ = auth.authenticate(Request(factory.get('/', HTTP_AUTHORIZATION=header)))
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual(str(user.id), str(self.user.id))
+        user, _ = auth.authenticate(Request(factory.post('/', HTTP_AUTHORIZATION=header)))
+        self.assertIsInstance(user, User)
+
+        response = self.client.get('/api/v1/exercises/muscle-groups/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TokenBlacklistTestCase(APITestCase):
+    """
+    Test suite for refresh token rotation and blacklist maintenance.
+
+    Tests cover:
+    - Rotation in a fixed, small number of queries
+    - Replayed refresh tokens rejected, from the worker's cache the second time
+    - Batched pruning of expired outstanding and blacklisted tokens
+    """
+
+    def setUp(self):
+        tokens.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='SecurePass123'
+        )
+        self.refresh_url = '/api/v1/auth/token/refresh/'
+
+    def tearDown(self):
+        tokens.clear()
+
+    def test_rotation_and_replay(self):
+        """
+        A refresh blacklists the old token and issues a new outstanding one.
+        """
+        refresh = str(RefreshToken.for_user(self.user))
+        # Four statements, plus the savepoint around the blacklist insert
+        with self.assertNumQueries(6):
+            response = self.client.post(self.refresh_url, {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+        self.assertTrue(OutstandingToken.objects.filter(jti=RefreshToken(response.data['refresh'])['jti']).exists())
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+        # The new token works, the old one doesn't; no query needed to know
+        with self.assertNumQueries(0):
+            response = self.client.post(self.refresh_url, {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Blacklisted by another worker: found in the database
+        tokens.clear()
+        response = self.client.post(self.refresh_url, {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prune(self):
+        """
+        Expired tokens go, in batches; live ones stay.
+        """
+        now = timezone.now()
+        expired = [
+            OutstandingToken.objects.create(user=self.user, jti=f'expired-{i}', token='x', expires_at=now - timedelta(hours=i + 1))
+            for i in range(3)
+        ]
+        BlacklistedToken.objects.create(token=expired[0])
+        live = OutstandingToken.objects.create(user=self.user, jti='live', token='x', expires_at=now + timedelta(days=1))
+        BlacklistedToken.objects.create(token=live)
+
+        out = StringIO()
+        call_command('prune_token_blacklist', batch_size=2, stdout=out)
+        self.assertIn('Pruned 3 outstanding and 1 blacklisted tokens in 2 batches', out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
+THROTTLE_RATES = {'anon': '3/min', 'user': '5/min', 'dj_rest_auth': '20/min', 'password_reset': '2/hour', 'logged_sets': '10/min'}
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': THROTTLE_RATES})
+class ThrottlingTestCase(APITestCase):
+    """
+    Test suite for the database-backed token bucket throttles.
+
+    Tests cover:
+    - Buckets empty after N requests and refill over the period
+    - Per-user default limits, with a Retry-After header
+    - Scoped endpoints use their own rate instead of the default
+    - Tokens reserved in batches, with the limit shared by all workers
+    - Pruning idle buckets
+    """
+
+    def setUp(self):
+        throttling._reserves.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='SecurePass123'
+        )
+
+    def test_bucket_refills(self):
+        """
+        A bucket allows `capacity` requests at once, then one per refill interval.
+        """
+        now = 1000.0
+        self.assertEqual([throttling.take('k', 3, 60, now)[0] for _ in range(4)], [True, True, True, False])
+        allowed, wait = throttling.take('k', 3, 60, now + 10)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 10)
+        self.assertTrue(throttling.take('k', 3, 60, now + 20)[0])
+        self.assertFalse(throttling.take('k', 3, 60, now + 20)[0])
+        # Never more than `capacity` tokens, however long the bucket was idle
+        self.assertEqual([throttling.take('k', 3, 60, now + 10000)[0] for _ in range(4)], [True, True, True, False])
+
+    def test_user_limit(self):
+        """
+        The default user rate applies across requests, with Retry-After.
+        """
+        self.client.force_authenticate(self.user)
+        codes = [self.client.get('/api/v1/auth/user/').status_code for _ in range(6)]
+        self.assertEqual(codes, [200] * 5 + [429])
+        response = self.client.get('/api/v1/profiles/me/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_scoped_limits(self):
+        """
+        Password reset is stricter than the anonymous default; logged sets
+        are looser than the user default.
+        """
+        codes = [
+            self.client.post('/api/v1/auth/password/reset/', {'email': 'test@example.com'}).status_code
+            for _ in range(3)
+        ]
+        self.assertEqual(codes[2], status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertNotIn(status.HTTP_429_TOO_MANY_REQUESTS, codes[:2])
+
+        self.client.force_authenticate(self.user)
+        codes = [self.client.get('/api/v1/workouts/logged-sets/').status_code for _ in range(11)]
+        self.assertEqual(codes, [200] * 10 + [429])
+
+    def test_reserves(self):
+        """
+        At high rates a worker takes a batch of tokens from the shared bucket
+        per query and spends them locally; the limit stays exact, also for
+        other workers.
+        """
+        rates = {**THROTTLE_RATES, 'user': '40/min'}
+        self.client.force_authenticate(self.user)
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}), \
+                mock.patch('time.time', return_value=1000.0):
+            self.assertEqual(self.client.get('/api/v1/auth/user/').status_code, 200)
+            self.assertEqual(ThrottleBucket.objects.get().tokens, 38)
+
+            with CaptureQueriesContext(connection) as queries:
+                codes = [self.client.get('/api/v1/auth/user/').status_code for _ in range(39)]
+            self.assertEqual(codes, [200] * 39)
+            takes = [query for query in queries if 'throttlebucket' in query['sql'].lower()]
+            self.assertEqual(len(takes), 19)
+            self.assertEqual(self.client.get('/api/v1/auth/user/').status_code, 429)
+
+            # A worker without a reserve draws from the same, empty bucket
+            throttling._reserves.clear()
+            self.assertEqual(self.client.get('/api/v1/auth/user/').status_code, 429)
+
+    def test_refund(self):
+        """
+        Tokens handed back with a take are added to the bucket again.
+        """
+        self.assertTrue(throttling.take('k', 100, 60, 1000.0, count=10)[0])
+        self.assertTrue(throttling.take('k', 100, 60, 1000.0, count=10, refund=9)[0])
+        self.assertEqual(ThrottleBucket.objects.get().tokens, 89)
+
+    def test_prune(self):
+        """
+        Buckets idle for longer than the longest period are removed.
+        """
+        ThrottleBucket.objects.create(key='idle', tokens=0, updated_at=time.time() - 7200)
+        ThrottleBucket.objects.create(key='busy', tokens=0, updated_at=time.time())
+        out = StringIO()
+        call_command('prune_throttle_buckets', stdout=out)
+        self.assertIn('Pruned 1 idle', out.getvalue())
+        self.assertEqual(list(ThrottleBucket.objects.values_list('key', flat=True)), ['busy'])
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Email backend standing in for an unreachable SMTP server."""
+
+    def send_messages(self, email_messages):
+        raise SMTPException('Connection unexpectedly closed')
+
+
+@override_settings(
+    ACCOUNT_EMAIL_VERIFICATION='optional',
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+)
+class EmailOutboxTestCase(APITestCase):
+    """
+    Test suite for the outbound email queue.
+
+    Tests cover:
+    - Registration and password reset queue their emails instead of sending
+    - The worker command delivers queued emails
+    - Failed sends are retried with backoff, then given up
+    - Claimed emails are leased to one worker until the lease runs out
+    """
+
+    def setUp(self):
+        # allauth rate-limits confirmation emails per address in the cache
+        cache.clear()
+
+    def register(self):
+        return self.client.post('/api/v1/auth/registration/', {
+            'username': 'newuser',
+            'email': 'new@example.com',
+            'password1': 'SecurePass123',
+            'password2': 'SecurePass123'
+        })
+
+    def test_auth_emails_are_queued_then_sent(self):
+        """
+        Requests only queue emails; send_queued_email delivers them.
+        """
+        response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post('/api/v1/auth/password/reset/', {'email': 'new@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.Status.QUEUED).count(), 2)
+
+        out = StringIO()
+        call_command('send_queued_email', stdout=out)
+        self.assertIn('Sent 2 emails, 0 failed', out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+        self.assertIn(f'{settings.FRONTEND_URL}/verify-email/', mail.outbox[0].body)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.Status.SENT).exists())
+
+        # Nothing left to send
+        call_command('send_queued_email', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_failed_sends_are_retried(self):
+        """
+        A failed send is retried after the backoff delay, then marked failed.
+        """
+        self.register()
+        email = OutboundEmail.objects.get()
+        with override_settings(EMAIL_BACKEND='accounts.tests.FailingEmailBackend'):
+            self.assertEqual(outbox.send_batch(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), (OutboundEmail.Status.QUEUED, 1))
+            self.assertIn('SMTPException', email.last_error)
+            # Not due again before the delay
+            self.assertEqual(outbox.send_batch(), (0, 0))
+
+            OutboundEmail.objects.update(send_after=timezone.now())
+            self.assertEqual(outbox.send_batch(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), (OutboundEmail.Status.FAILED, 2))
+
+        self.assertEqual(outbox.send_batch(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_claimed_emails_are_leased(self):
+        """
+        Claimed emails aren't handed to another worker until the lease runs
+        out, e.g. because the worker sending them died.
+        """
+        self.register()
+        self.assertEqual(len(outbox.claim(50, timezone.now())), 1)
+        self.assertEqual(outbox.send_batch(), (0, 0))
+
+        OutboundEmail.objects.update(send_after=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(outbox.send_batch(), (1, 0))
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.Status.SENT, 1))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class CaseInsensitiveLookupTestCase(APITestCase):
+    """
+    Test suite for case-insensitive username and email lookups.
+
+    Tests cover:
+    - filter_username / filter_email match regardless of case
+    - Both are planned as lookups on the LOWER() indexes
+    - Registration and public workout history use them
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='TestUser',
+            email='Test@Example.com',
+            password='SecurePass123'
+        )
+
+    def test_lookups_match_any_case(self):
+        """
+        Lookups ignore case on both sides.
+        """
+        self.assertEqual(User.objects.filter_username('testUSER').get(), self.user)
+        self.assertEqual(User.objects.filter_email('TEST@example.COM').get(), self.user)
+        self.assertFalse(User.objects.filter_username('testuse').exists())
+
+    def test_lookups_use_indexes(self):
+        """
+        EXPLAIN shows the functional indexes, not a scan of the user table.
+        Usernames share the text_pattern_ops index of prefix searches, which
+        only exists on PostgreSQL.
+        """
+        plan = User.objects.filter_email('test@example.com').explain()
+        self.assertIn('user_email_lower_idx', plan)
+        if connection.vendor == 'postgresql':
+            plan = User.objects.filter_username('testuser').explain()
+            self.assertIn('user_username_lower_prefix_idx', plan)
+
+    def test_endpoints_ignore_case(self):
+        """
+        Registration rejects an email differing only in case; public
+        workout history resolves usernames in any case.
+        """
+        response = self.client.post('/api/v1/auth/registration/', {
+            'username': 'other',
+            'email': 'TEST@EXAMPLE.COM',
+            'password1': 'SecurePass123',
+            'password2': 'SecurePass123'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+
+        self.user.profile.is_public = True
+        self.user.profile.save()
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/v1/workouts/sessions/user/testuser/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
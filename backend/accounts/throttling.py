@@ -0,0 +1,159 @@
+"""
+Rate limiting shared by all workers.
+
+DRF's throttles keep their request history in the default cache, which is
+per-process local memory here: every worker counts on its own, so limits
+are multiplied by the number of workers. These throttles keep a token
+bucket per key in the ThrottleBucket table instead.
+
+A bucket holds up to N tokens for a rate of N requests per period and
+refills continuously. Taking tokens is a single conditional UPDATE that
+refills and decrements in one statement, so concurrent requests can't
+both take the last token. A request on a new key inserts a full bucket
+minus what it takes.
+
+To keep that UPDATE off most requests, a worker takes up to 1/RESERVE_SHARE
+of a bucket at once and spends it locally. Reserved tokens are already
+gone from the shared bucket, so the limit still holds across workers; a
+reserve lasts as long as the bucket needs to refill it, and what's left
+of it is handed back with the next take. Buckets of fewer than
+RESERVE_SHARE tokens (the auth scopes) take one token per request.
+
+Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']. A view with a
+`throttle_scope` is limited by that scope's rate only, so endpoints can be
+stricter (password reset) or looser (logged sets) than the defaults.
+"""
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from rest_framework import throttling
+from rest_framework.settings import api_settings
+
+from .models import ThrottleBucket
+
+# A worker reserves at most this fraction of a bucket at a time
+RESERVE_SHARE = 20
+
+# key -> [reserved tokens, expiry (epoch seconds)], per worker
+_reserves = {}
+_reserves_lock = threading.Lock()
+
+
+def take(key, capacity, period, now=None, count=1, refund=0):
+    """
+    Take `count` tokens from the bucket of `key` (`capacity` tokens,
+    refilled over `period` seconds), first handing back `refund` unused
+    ones. Returns (allowed, seconds until the next token).
+    """
+    now = time.time() if now is None else now
+    refill = capacity / period
+    available = F('tokens') + (Value(now) - F('updated_at')) * Value(refill) + Value(refund)
+    bucket = ThrottleBucket.objects.filter(key=key)
+    for attempt in range(2):
+        if bucket.filter(**{'tokens__gte': count - refund - (Value(now) - F('updated_at')) * Value(refill)}).update(
+            tokens=Least(Value(float(capacity)), available) - count, updated_at=Value(now)
+        ):
+            return True, 0
+        if attempt:
+            break
+        try:
+            with transaction.atomic():
+                ThrottleBucket.objects.create(key=key, tokens=capacity - count, updated_at=now)
+            return True, 0
+        except IntegrityError:
+            # The bucket exists (and is short of tokens), or another request created it
+            continue
+    tokens, updated_at = bucket.values_list('tokens', 'updated_at').first() or (0, now)
+    available = min(capacity, tokens + (now - updated_at) * refill)
+    return False, max(0.0, (1 - available) / refill)
+
+
+def longest_period():
+    """Seconds the slowest configured rate needs to refill a bucket completely."""
+    durations = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    return max(
+        (durations[rate.split('/')[1][0]] for rate in api_settings.DEFAULT_THROTTLE_RATES.values() if rate),
+        default=0,
+    )
+
+
+class TokenBucketMixin:
+    """allow_request/wait of a SimpleRateThrottle, backed by ThrottleBucket."""
+
+    def get_rate(self):
+        # Read at request time (not import time), so settings overrides apply
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{self.scope}' scope")
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self._wait = 0
+        batch = self.num_requests // RESERVE_SHARE
+        if batch <= 1:
+            allowed, self._wait = take(key, self.num_requests, self.duration)
+            return allowed
+
+        now = time.time()
+        with _reserves_lock:
+            reserve = _reserves.get(key)
+            if reserve and reserve[0] and reserve[1] > now:
+                reserve[0] -= 1
+                return True
+            # Expired or spent; whatever is left goes back with this take
+            leftover = _reserves.pop(key, (0, 0))[0]
+            if len(_reserves) > 10000:
+                for stale in [k for k, (_, expires) in _reserves.items() if expires <= now]:
+                    del _reserves[stale]
+        count = batch
+        allowed, self._wait = take(key, self.num_requests, self.duration, now, count, leftover)
+        if not allowed and (leftover or not self._wait):
+            # Less than a batch left, but at least one token
+            count = 1
+            allowed, self._wait = take(key, self.num_requests, self.duration, now, count, leftover)
+        if allowed:
+            with _reserves_lock:
+                _reserves[key] = [count - 1, now + count * self.duration / self.num_requests]
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(TokenBucketMixin, throttling.AnonRateThrottle):
+    """Anonymous requests by IP, on views without a throttle_scope."""
+
+    def allow_request(self, request, view):
+        if getattr(view, 'throttle_scope', None):
+            return True
+        return super().allow_request(request, view)
+
+
+class UserRateThrottle(TokenBucketMixin, throttling.UserRateThrottle):
+    """Authenticated requests by user, on views without a throttle_scope."""
+
+    def allow_request(self, request, view):
+        if getattr(view, 'throttle_scope', None):
+            return True
+        return super().allow_request(request, view)
+
+
+class ScopedRateThrottle(TokenBucketMixin, throttling.ScopedRateThrottle):
+    """Requests to views with a throttle_scope, by user or IP."""
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
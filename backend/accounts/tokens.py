@@ -0,0 +1,130 @@
+"""
+Refresh token rotation with fewer queries.
+
+simplejwt's refresh endpoint checks the blacklist with a join, reads the
+user three times and uses get_or_create for both the blacklisted and the
+new outstanding token: about ten queries per refresh. Here a refresh is
+four: one lookup that answers "blacklisted?" and returns the outstanding
+row at once, the user, and two inserts. Blacklisting inserts without a
+prior read, so of two concurrent refreshes with the same token only one
+succeeds.
+
+Tokens found blacklisted are remembered per worker until they expire, so
+replays of a revoked token are rejected without a query. Only positive
+answers are cached: a token revoked in another worker is not known here,
+so a "not blacklisted" answer always comes from the database. That
+lookup is a unique-index probe on `jti`; prune_token_blacklist keeps the
+table from growing with expired rows.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+from dj_rest_auth.jwt_auth import CookieTokenRefreshSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+_lock = threading.Lock()
+_blacklisted = {}  # jti -> expiry (epoch seconds) of tokens known to be blacklisted
+
+
+def remember_blacklisted(jti, exp):
+    with _lock:
+        if len(_blacklisted) >= getattr(settings, 'TOKEN_BLACKLIST_CACHE_SIZE', 10000):
+            now = time.time()
+            for key in [key for key, expiry in _blacklisted.items() if expiry <= now]:
+                del _blacklisted[key]
+            while len(_blacklisted) >= getattr(settings, 'TOKEN_BLACKLIST_CACHE_SIZE', 10000):
+                _blacklisted.pop(next(iter(_blacklisted)))
+        _blacklisted[jti] = exp
+
+
+def clear():
+    """Forget the blacklisted tokens known to this worker (used by tests)."""
+    _blacklisted.clear()
+
+
+class RotatingRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check also finds its outstanding row."""
+
+    outstanding_id = None
+
+    def _blacklisted(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if jti in _blacklisted:
+            return True
+        row = OutstandingToken.objects.filter(jti=jti).order_by('pk').values_list('id', 'blacklistedtoken__id').first()
+        if row is None:
+            return False
+        self.outstanding_id = row[0]
+        if row[1] is not None:
+            remember_blacklisted(jti, self.payload['exp'])
+            return True
+        return False
+
+    def check_blacklist(self):
+        if self._blacklisted():
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """
+        Blacklist the token. Raises TokenError when it already was, e.g.
+        by a concurrent refresh.
+        """
+        if self.outstanding_id is None:
+            return super().blacklist()
+        try:
+            with transaction.atomic():
+                blacklisted = BlacklistedToken.objects.create(token_id=self.outstanding_id)
+        except IntegrityError:
+            raise TokenError(_("Token is blacklisted"))
+        remember_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return blacklisted
+
+    def outstand_for(self, user):
+        """Record a freshly issued token as outstanding, without reading the user."""
+        return OutstandingToken.objects.create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            user=user,
+            created_at=self.current_time,
+            token=str(self),
+            expires_at=datetime_from_epoch(self.payload['exp']),
+        )
+
+
+class TokenRefreshSerializer(CookieTokenRefreshSerializer):
+    """
+    dj-rest-auth's refresh (token from the body or the refresh cookie) with
+    rotation and blacklisting in four queries.
+    """
+    token_class = RotatingRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(self.extract_refresh_token())
+
+        user = None
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand_for(user)
+            data['refresh'] = str(refresh)
+
+        return data
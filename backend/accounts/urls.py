@@ -1,6 +1,5 @@
 from django.urls import path, include
-from rest_framework_simplejwt.views import TokenRefreshView
-from .views import CustomPasswordResetView
+from .views import CustomPasswordResetView, TokenRefreshView
 
 app_name = 'accounts'
 urlpatterns = [
@@ -8,6 +7,9 @@ urlpatterns = [
     # Must come BEFORE including dj_rest_auth.urls to take precedence
     path('auth/password/reset/', CustomPasswordResetView.as_view(), name='rest_password_reset'),
 
+    # JWT token refresh endpoint, also ahead of dj_rest_auth.urls' own
+    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+
     # dj-rest-auth provides these endpoints under /auth/
     path('auth/', include('dj_rest_auth.urls')),
 
@@ -16,7 +18,4 @@ urlpatterns = [
 
     # django-allauth account URLs (required for email verification)
     path('auth/account/', include('allauth.account.urls')),
-
-    # JWT token refresh endpoint
-    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
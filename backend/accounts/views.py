@@ -1,17 +1,21 @@
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from dj_rest_auth.jwt_auth import get_refresh_view
 from dj_rest_auth.views import PasswordResetView as BasePasswordResetView
+from monitoring.timing import SerializerTimingMixin
 from .serializers import CustomPasswordResetSerializer
+from .tokens import TokenRefreshSerializer
 
 
-class CustomPasswordResetView(BasePasswordResetView):
+class CustomPasswordResetView(SerializerTimingMixin, BasePasswordResetView):
     """
     Overrides dj-rest-auth PasswordResetView to return uid and token in response
     so the frontend can build links or navigate without waiting for e-mail.
     """
     permission_classes = (AllowAny,)
     serializer_class = CustomPasswordResetSerializer
+    throttle_scope = 'password_reset'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -34,3 +38,11 @@ class CustomPasswordResetView(BasePasswordResetView):
                     'combined_key': f"{uid}-{token}",
                 })
         return Response(payload, status=status.HTTP_200_OK)
+
+
+class TokenRefreshView(SerializerTimingMixin, get_refresh_view()):
+    """
+    dj-rest-auth's refresh view (cookies included) with the cheaper token
+    rotation of accounts/tokens.py.
+    """
+    serializer_class = TokenRefreshSerializer
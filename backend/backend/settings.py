@@ -46,12 +46,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
 
     # My apps
     'accounts',
     'profiles',
     'exercises',
     'workouts',
+    'monitoring',
     
     # Third party apps
     'rest_framework',
@@ -67,6 +69,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -74,6 +77,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'monitoring.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -113,23 +117,6 @@ DATABASES = {
 }
 
 
-# Use SQLite in memory for tests
-if 'test' in sys.argv:
-    DATABASES['default'] = {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': ':memory:',
-    }
-    # Migrations turned off for tests
-    class DisableMigrations:
-        def __contains__(self, item):
-            return True
-
-        def __getitem__(self, item):
-            return None
-
-    MIGRATION_MODULES = DisableMigrations()
-
-
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -194,19 +181,26 @@ SITE_ID = 1
 # Django REST framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Token buckets in the database, shared by all workers (accounts/throttling.py);
+    # workers reserve tokens in batches, so most requests don't write.
+    # Views with a `throttle_scope` are limited by that scope's rate instead.
     'DEFAULT_THROTTLE_CLASSES': [
-    'rest_framework.throttling.AnonRateThrottle',
-    'rest_framework.throttling.UserRateThrottle'
+        'accounts.throttling.AnonRateThrottle',
+        'accounts.throttling.UserRateThrottle',
+        'accounts.throttling.ScopedRateThrottle',
     ],
-    # 'DEFAULT_THROTTLE_RATES': {
-    #     'anon': '100/day',  # not logged in
-    #     'user': '1000/day' # logged in
-    # },
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '100/min',  # not logged in, per IP
+        'user': '300/min',  # logged in, per user
+        'dj_rest_auth': '20/min',  # login, registration, email verification, ...
+        'password_reset': '5/hour',
+        'logged_sets': '1200/min',  # set logging during a workout, incl. offline sync bursts
+    },
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
@@ -344,3 +338,125 @@ REST_AUTH = {
     # Custom serializer for password reset
     'PASSWORD_RESET_SERIALIZER': 'accounts.serializers.CustomPasswordResetSerializer',
 }
+
+# Workout history archival
+# Completed sessions older than this many days are packed into compact
+# per-session blobs by the `archive_sessions` management command
+WORKOUT_ARCHIVE_AFTER_DAYS = int(os.getenv('WORKOUT_ARCHIVE_AFTER_DAYS', 90))
+
+# Public leaderboards
+# Number of entries kept per (exercise, metric) board
+LEADERBOARD_SIZE = 100
+# How long a rendered board stays cached. Rendered boards live in each
+# worker's own cache (no shared CACHES backend is configured), keyed by the
+# board version stored in the database (LeaderboardVersion), so a change
+# made by any worker invalidates them on the next request.
+LEADERBOARD_CACHE_TIMEOUT = 60 * 10
+
+# Exercise search
+# Minimum trigram word similarity for a fuzzy name match ("dumbell" -> "Dumbbell")
+EXERCISE_SEARCH_TRIGRAM_THRESHOLD = 0.6
+
+# In-memory exercise catalog (see exercises/catalog.py)
+# Seconds between checks of the stored catalog version; changes made by
+# other workers (e.g. load_exercises) become visible after at most this long
+EXERCISE_CATALOG_CHECK_INTERVAL = 5
+
+# Maximum number of ids accepted by /api/v1/exercises/batch/
+EXERCISE_BATCH_MAX_IDS = 200
+
+# Maximum `k` of /api/v1/exercises/<id>/alternatives/
+EXERCISE_ALTERNATIVES_MAX = 50
+
+# Autocomplete (see exercises/autocomplete.py): maximum `limit`, and how
+# long a user's exercise usage counts used for ranking are cached
+EXERCISE_AUTOCOMPLETE_MAX = 25
+EXERCISE_USAGE_CACHE_TIMEOUT = 300
+
+# Maximum `limit` of /api/v1/workouts/exercises/recent/ and /frequent/
+EXERCISE_USAGE_LIST_MAX = 100
+
+# Precompressed exercise library bundle for offline clients (see exercises/bundle.py)
+EXERCISE_BUNDLE_DIR = BASE_DIR / 'exercise_bundles'
+
+# Body-metrics series (see profiles/metrics.py): points returned when the
+# client doesn't ask for a number, and the most it may ask for
+BODY_METRIC_SERIES_DEFAULT_POINTS = 300
+BODY_METRIC_SERIES_MAX_POINTS = 2000
+
+# Per-worker cache of authenticated users (see accounts/authentication.py):
+# seconds a user is reused before it is read again, and how many are kept.
+# Saving a user evicts it at once in the worker that saved it; other
+# workers see the change after at most AUTH_USER_CACHE_TTL seconds.
+AUTH_USER_CACHE_TTL = 30
+AUTH_USER_CACHE_SIZE = 10000
+
+# Email outbox (see accounts/outbox.py): auth emails are queued and sent by
+# `manage.py send_queued_email --loop` (the email-worker service in
+# docker/compose.yaml). Failed sends are retried after
+# EMAIL_OUTBOX_RETRY_DELAY seconds, doubling each time, up to
+# EMAIL_OUTBOX_MAX_ATTEMPTS attempts. A worker reserves the messages it is
+# sending for EMAIL_OUTBOX_LEASE seconds; if it dies, they are sent again
+# after that.
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_LEASE = 300
+
+
+# Request metrics (see monitoring/): with SERVER_TIMING_HEADER on (off by
+# default, as it tells clients how long queries take; set the environment
+# variable to 1 in development) responses carry a Server-Timing header with
+# their database, serializer and total time. /metrics serves per-view
+# histograms in the Prometheus text format to requests bearing
+# MONITORING_METRICS_TOKEN (or to anyone while DEBUG is on and no token is
+# set). Histograms are kept per worker process: scrape every worker and let
+# Prometheus add them up, or a load-balanced scrape sees only whichever
+# worker answered.
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', '') == '1'
+MONITORING_METRICS_TOKEN = os.getenv('MONITORING_METRICS_TOKEN', '')
+
+# Results of `manage.py bench_api` (one JSON file per run, named by time and commit)
+BENCHMARK_RESULTS_DIR = BASE_DIR / 'benchmarks'
+
+# Opt-in profiler (see monitoring/profiling.py): staff requests sent with an
+# `X-Profile: 1` header or `?_profile=1` run under cProfile, and the stats and
+# SQL trace are stored in PROFILER_CAPTURE_DIR (listed in the admin).
+# Turning it off removes the middleware entirely.
+PROFILER_ENABLED = True
+PROFILER_CAPTURE_DIR = BASE_DIR / 'profiler_captures'
+
+
+# Test settings
+if 'test' in sys.argv:
+    import tempfile
+
+    # SQLite in memory, migrations turned off
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+
+    class DisableMigrations:
+        def __contains__(self, item):
+            return True
+
+        def __getitem__(self, item):
+            return None
+
+    MIGRATION_MODULES = DisableMigrations()
+
+    # Check the catalog version on every request, so a test case never sees
+    # a catalog built from another test's (rolled back) data
+    EXERCISE_CATALOG_CHECK_INTERVAL = 0
+
+    # Test cases reuse user ids after rolling back, so never cache users
+    # across them
+    AUTH_USER_CACHE_TTL = 0
+
+    # No rate limits (query counts would include the bucket updates);
+    # accounts.tests sets rates for the throttling tests
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = dict.fromkeys(REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'])
+
+    # Generated files go to the temp directory
+    EXERCISE_BUNDLE_DIR = Path(tempfile.gettempdir()) / 'gym_tracker_test_exercise_bundles'
+    PROFILER_CAPTURE_DIR = Path(tempfile.gettempdir()) / 'gym_tracker_test_profiler_captures'
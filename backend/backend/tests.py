@@ -0,0 +1,237 @@
+"""
+Query budgets for the API.
+
+Every endpoint below is requested twice: with one row of every kind of
+seeded data (sessions, sets, plans, weigh-ins, public profiles, ...) and
+with fifty. An endpoint fails when it needs more queries for fifty rows
+than for one, i.e. when something is loaded per row (an N+1), or when it
+needs more queries than its declared budget.
+
+Add new endpoints to ENDPOINTS with the budget they need today.
+"""
+import copy
+from collections import namedtuple
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from exercises.models import Exercise
+from profiles.models import BodyMetric, Profile
+from workouts import leaderboards, usage
+from workouts.models import ExerciseGroup, LoggedSet, PlannedSet, WorkoutPlan, WorkoutSession
+
+User = get_user_model()
+
+# `path` is formatted with the seeded rows (see QueryBudgetTestCase.seed),
+# `data` is sent as JSON; a value that is a lone placeholder is replaced by
+# the row itself (e.g. a list of groups). `saves` names a row that is set
+# to the id of the created object. Writes come last, in an order where each
+# one still finds the data it needs.
+Endpoint = namedtuple('Endpoint', 'name method path budget data saves', defaults=(None, None))
+
+ENDPOINTS = [
+    # accounts
+    Endpoint('auth: user', 'get', '/api/v1/auth/user/', 0),
+    # profiles
+    Endpoint('profiles: me', 'get', '/api/v1/profiles/me/', 1),
+    Endpoint('profiles: public list', 'get', '/api/v1/profiles/', 1),
+    Endpoint('profiles: public detail', 'get', '/api/v1/profiles/{username}/', 1),
+    Endpoint('profiles: body metrics', 'get', '/api/v1/profiles/me/body-metrics/', 2),
+    Endpoint('profiles: body metric series', 'get', '/api/v1/profiles/me/body-metrics/series/', 1),
+    # exercises (served from the in-memory catalog)
+    Endpoint('exercises: list', 'get', '/api/v1/exercises/', 1),
+    Endpoint('exercises: detail', 'get', '/api/v1/exercises/{exercise}/', 1),
+    Endpoint('exercises: autocomplete', 'get', '/api/v1/exercises/autocomplete/?q=ex', 1),
+    Endpoint('exercises: alternatives', 'get', '/api/v1/exercises/{exercise}/alternatives/', 1),
+    Endpoint('exercises: facets', 'get', '/api/v1/exercises/facets/', 1),
+    Endpoint('exercises: batch', 'get', '/api/v1/exercises/batch/?ids={exercise}', 1),
+    Endpoint('exercises: muscle groups', 'get', '/api/v1/exercises/muscle-groups/', 1),
+    Endpoint('exercises: equipment', 'get', '/api/v1/exercises/equipment/', 1),
+    Endpoint('exercises: categories', 'get', '/api/v1/exercises/categories/', 1),
+    # workouts
+    Endpoint('plans: list', 'get', '/api/v1/workouts/plans/', 4),
+    Endpoint('plans: detail', 'get', '/api/v1/workouts/plans/{plan}/', 3),
+    Endpoint('plans: adherence', 'get', '/api/v1/workouts/plans/{plan}/adherence/', 3),
+    Endpoint('sessions: list', 'get', '/api/v1/workouts/sessions/', 2),
+    Endpoint('sessions: detail', 'get', '/api/v1/workouts/sessions/{session}/', 4),
+    Endpoint('sessions: active', 'get', '/api/v1/workouts/sessions/active/', 4),
+    Endpoint('sessions: adherence', 'get', '/api/v1/workouts/sessions/{session}/adherence/', 2),
+    Endpoint('sessions: public list', 'get', '/api/v1/workouts/sessions/user/{username}/', 3),
+    Endpoint('sessions: public detail', 'get', '/api/v1/workouts/sessions/{session}/public/', 4),
+    Endpoint('logged sets: list', 'get', '/api/v1/workouts/logged-sets/', 2),
+    Endpoint('logged sets: detail', 'get', '/api/v1/workouts/logged-sets/{logged_set}/', 1),
+    # Rendered boards are cached; only their version is read
+    Endpoint('leaderboard', 'get', '/api/v1/workouts/leaderboards/{exercise}/', 1),
+    Endpoint('exercises: recent', 'get', '/api/v1/workouts/exercises/recent/', 1),
+    Endpoint('exercises: frequent', 'get', '/api/v1/workouts/exercises/frequent/', 1),
+    Endpoint('sessions: update progress', 'patch', '/api/v1/workouts/sessions/{active}/update_progress/', 5, {
+        'current_group_index': 1, 'current_set_index': 0,
+    }),
+    # Includes updating the three leaderboards of a public lifter
+    Endpoint('logged sets: create', 'post', '/api/v1/workouts/logged-sets/', 12, {
+        'session_id': '{active}', 'exercise': '{exercise}', 'order': 1000, 'actual_reps': 5, 'actual_weight': '80.00',
+    }, saves='new_set'),
+    # Raises the lifter's best again
+    Endpoint('logged sets: update', 'patch', '/api/v1/workouts/logged-sets/{new_set}/', 14, {
+        'actual_reps': 6, 'actual_weight': '90.00',
+    }),
+    # A set that isn't anyone's best
+    Endpoint('logged sets: delete', 'delete', '/api/v1/workouts/logged-sets/{active_set}/', 6),
+    Endpoint('plans: create', 'post', '/api/v1/workouts/plans/', 7, {
+        'name': 'New plan', 'groups': [{'order': 0, 'sets': [{'exercise': '{exercise}', 'order': 1, 'target_reps': '8-12'}]}],
+    }),
+    # Replaces every group and set of the first plan (one per seeded row)
+    Endpoint('plans: update', 'put', '/api/v1/workouts/plans/{plan}/', 14, {
+        'name': 'Plan 0', 'groups': '{plan_groups}',
+    }),
+    Endpoint('sessions: finish', 'post', '/api/v1/workouts/sessions/{active}/finish/', 5),
+    Endpoint('sessions: create', 'post', '/api/v1/workouts/sessions/', 9, {'plan': '{plan}'}, saves='active'),
+    Endpoint('sessions: cancel', 'post', '/api/v1/workouts/sessions/{active}/cancel/', 5),
+    # Rescores the lifter's DOTS/Wilks leaderboard entries
+    Endpoint('profiles: body metric create', 'post', '/api/v1/profiles/me/body-metrics/', 12, {
+        'measured_at': '{now}', 'weight': '81.50',
+    }),
+    Endpoint('profiles: update', 'patch', '/api/v1/profiles/me/', 15, {'weight': '82.00', 'first_name': 'Owner'}),
+]
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Test suite for per-endpoint query budgets.
+
+    Tests cover:
+    - No endpoint's query count grows with the number of rows
+    - No endpoint exceeds its declared budget
+    """
+
+    def seed(self, size):
+        """
+        `size` rows of each kind: exercises, public lifters, plans (the
+        first with `size` groups), completed sessions (the first with
+        `size` sets), sets in the active session and weigh-ins.
+        """
+        now = timezone.now()
+        exercises = [
+            Exercise.objects.create(name=f'Exercise {i}', source_id=f'exercise_{i}', level='beginner', category='strength')
+            for i in range(size)
+        ]
+        user = User.objects.create_user(username='owner', email='owner@example.com', password='SecurePass123')
+        Profile.objects.filter(user=user).update(is_public=True, weight=80, gender='M')
+        # Without the profile create_user cached, which predates the update
+        user = User.objects.get(pk=user.pk)
+        for i in range(size):
+            other = User.objects.create_user(username=f'lifter{i}', email=f'lifter{i}@example.com', password='SecurePass123')
+            Profile.objects.filter(user=other).update(is_public=True)
+
+        plans = WorkoutPlan.objects.bulk_create([WorkoutPlan(owner=user, name=f'Plan {i}') for i in range(size)])
+        groups = ExerciseGroup.objects.bulk_create(
+            [ExerciseGroup(workout_plan=plans[0], order=i) for i in range(size)]
+            + [ExerciseGroup(workout_plan=plan, order=0) for plan in plans[1:]]
+        )
+        planned_sets = PlannedSet.objects.bulk_create([
+            PlannedSet(group=group, exercise=exercises[i % size], order=1, target_reps='8-12', target_reps_min=8, target_reps_max=12)
+            for i, group in enumerate(groups)
+        ])
+
+        sessions = WorkoutSession.objects.bulk_create([
+            WorkoutSession(owner=user, plan=plans[i], status='completed', date_finished=now) for i in range(size)
+        ])
+        active = WorkoutSession.objects.create(owner=user, plan=plans[0])
+        logged_sets = LoggedSet.objects.bulk_create(
+            [
+                LoggedSet(
+                    session=sessions[0], exercise=exercises[i % size], planned_set=planned_sets[i], order=i + 1,
+                    actual_reps=10, actual_weight=60 + i,
+                )
+                for i in range(size)
+            ]
+            + [
+                LoggedSet(session=session, exercise=exercises[0], order=1, actual_reps=8, actual_weight=50)
+                for session in sessions[1:]
+            ]
+            + [
+                LoggedSet(session=active, exercise=exercises[i % size], order=i + 1, actual_reps=8, actual_weight=50)
+                for i in range(size)
+            ]
+        )
+        BodyMetric.objects.bulk_create([
+            BodyMetric(user=user, measured_at=now - timedelta(days=i), weight=80 + i % 3) for i in range(size)
+        ])
+        usage.rebuild([user.pk])
+        for exercise in exercises:
+            leaderboards.rebuild_board(exercise.pk)
+
+        return user, {
+            'username': user.username, 'exercise': exercises[0].pk, 'plan': plans[0].pk,
+            'session': sessions[0].pk, 'active': active.pk, 'logged_set': logged_sets[0].pk,
+            'active_set': logged_sets[-1].pk, 'now': now.isoformat(),
+            'plan_groups': [
+                {'order': i, 'sets': [{'exercise': exercises[i % size].pk, 'order': 1, 'target_reps': '8-12'}]}
+                for i in range(size)
+            ],
+        }
+
+    def format(self, value, rows):
+        if isinstance(value, dict):
+            return {key: self.format(item, rows) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.format(item, rows) for item in value]
+        if isinstance(value, str):
+            if value.startswith('{') and value.endswith('}') and value[1:-1] in rows:
+                return rows[value[1:-1]]
+            return value.format(**rows)
+        return value
+
+    def request(self, endpoint, rows):
+        # A fresh copy per request, like CachedJWTAuthentication, so no
+        # relation (e.g. a stale user.profile) is cached across requests
+        self.client.force_authenticate(copy.copy(self.user))
+        send = getattr(self.client, endpoint.method)
+        path = self.format(endpoint.path, rows)
+        if endpoint.data is None:
+            return send(path)
+        return send(path, self.format(endpoint.data, rows), format='json')
+
+    def measure(self, size):
+        """Query counts of every endpoint with `size` rows of seeded data."""
+        counts = {}
+        with transaction.atomic():
+            cache.clear()
+            self.user, rows = self.seed(size)
+            for endpoint in ENDPOINTS:
+                if endpoint.method == 'get':
+                    # Warm up per-worker caches (catalog, content types, ...)
+                    self.request(endpoint, rows)
+                # The log is capped (the seed alone can fill it), which would shift the capture
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.request(endpoint, rows)
+                self.assertLess(response.status_code, 400, f'{endpoint.name}: {response.status_code} {response.data}')
+                if endpoint.saves:
+                    rows[endpoint.saves] = response.data['id']
+                counts[endpoint.name] = queries.captured_queries
+            transaction.set_rollback(True)
+        return counts
+
+    def test_query_budgets(self):
+        """
+        Query counts stay within budget and don't depend on the number of
+        rows.
+        """
+        one = self.measure(1)
+        fifty = self.measure(50)
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint.name):
+                few, many = len(one[endpoint.name]), len(fifty[endpoint.name])
+                queries = '\n'.join(query['sql'] for query in fifty[endpoint.name])
+                self.assertEqual(
+                    many, few, f'{endpoint.name}: {few} queries for 1 row, {many} for 50 rows:\n{queries}'
+                )
+                self.assertLessEqual(
+                    many, endpoint.budget, f'{endpoint.name}: {many} queries, budget {endpoint.budget}:\n{queries}'
+                )
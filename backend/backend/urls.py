@@ -18,6 +18,9 @@ urlpatterns = [
     path('api/v1/workouts/', include('workouts.urls')),
     path('api/v1/', include('accounts.urls')),
 
+    # Request histograms for Prometheus (see monitoring/views.py)
+    path('metrics/', include('monitoring.urls')),
+
     # Utility auth URLs required internally by dj-rest-auth/allauth (not part of public API)
     path('auth-utils/', include('django.contrib.auth.urls')),
 ]
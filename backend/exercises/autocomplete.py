@@ -0,0 +1,112 @@
+"""
+Prefix autocomplete over exercise names.
+
+Every name and alias is indexed under each of its word suffixes, with and
+without spaces ("Barbell Bench Press" -> "barbell bench press", "bench
+press", "press", "barbellbenchpress", "benchpress", ...), in one sorted
+list. A prefix lookup is two binary searches, so typing "bench pr",
+"benchpr" or "push-up"/"pushup" all find their exercise without scanning
+the library.
+
+Results are ranked by how often the user used the exercise, then by
+whether the match is at the start of the name (alias matches rank like
+matches inside the name), then by name length.
+"""
+import heapq
+import re
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def normalize(text):
+    """Lower-cased words joined by single spaces, punctuation dropped."""
+    return ' '.join(_WORD_RE.findall(text.casefold()))
+
+
+class PrefixIndex:
+    """Sorted (key, position) pairs for a tuple of serialized exercises."""
+
+    def __init__(self, exercises):
+        self.exercises = exercises
+        entries = set()
+        for position, exercise in enumerate(exercises):
+            names = [exercise['name'], *exercise.get('aliases', ())]
+            for index, name in enumerate(names):
+                words = normalize(name).split()
+                for start in range(len(words)):
+                    # Rank 0 for matches at the start of the name
+                    rank = 0 if index == 0 and start == 0 else 1
+                    entries.add((' '.join(words[start:]), position, rank))
+                    entries.add((''.join(words[start:]), position, rank))
+        entries = sorted(entries)
+        self._keys = [key for key, _, _ in entries]
+        self._matches = [(position, rank) for _, position, rank in entries]
+
+    def matches(self, prefix):
+        """{position: best rank} of every exercise with a key starting with `prefix`."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return {}
+        low = bisect_left(self._keys, prefix)
+        # Every key starting with the prefix sorts before prefix + U+10FFFF
+        high = bisect_left(self._keys, prefix + '\U0010ffff', low)
+        found = {}
+        for position, rank in self._matches[low:high]:
+            if rank < found.get(position, 2):
+                found[position] = rank
+        return found
+
+    def complete(self, prefix, limit=10, usage=None):
+        """
+        Up to `limit` exercises matching `prefix` as {id, name, equipment},
+        ranked by `usage` ({exercise_id: count}) first.
+        """
+        usage = usage or {}
+        found = self.matches(prefix)
+
+        def sort_key(item):
+            position, rank = item
+            exercise = self.exercises[position]
+            return (-usage.get(exercise['id'], 0), rank, len(exercise['name']), exercise['name'])
+
+        best = heapq.nsmallest(limit, found.items(), key=sort_key)
+        return [
+            {
+                'id': self.exercises[position]['id'],
+                'name': self.exercises[position]['name'],
+                'equipment': self.exercises[position]['equipment'],
+            }
+            for position, _ in best
+        ]
+
+
+def _usage_key(user_id):
+    return f'exercise-usage:{user_id}'
+
+
+def usage_counts(user):
+    """
+    {exercise_id: number of uses} for a user (a model or a stateless token
+    user), from the usage counters kept by the workouts app. Cached until
+    the counters change (forget_usage).
+    """
+    # Imported here because workouts depends on exercises, not the reverse
+    from workouts.models import ExerciseUsage
+
+    key = _usage_key(user.id)
+    counts = cache.get(key)
+    if counts is None:
+        counts = dict(
+            ExerciseUsage.objects.filter(user_id=user.id, use_count__gt=0).values_list('exercise_id', 'use_count')
+        )
+        cache.set(key, counts, getattr(settings, 'EXERCISE_USAGE_CACHE_TIMEOUT', 300))
+    return counts
+
+
+def forget_usage(user_id):
+    """Drop a user's cached usage counts after they changed."""
+    cache.delete(_usage_key(user_id))
@@ -0,0 +1,170 @@
+"""
+Precompressed, versioned bundle of the whole exercise library.
+
+Mobile clients sync the library for offline use with a single request.
+The bundle is the catalog (see exercises/catalog.py) as one JSON document,
+stored next to its gzip and brotli compressions as files named after the
+catalog version. load_exercises writes them after loading; a worker that
+finds no file for the current version (e.g. after an admin edit) builds
+them on first request. Each worker keeps the current bundle in memory.
+
+brotli is optional: without the package only gzip and plain JSON are served.
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.http import parse_etags
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+IDENTITY = 'identity'
+GZIP = 'gzip'
+BROTLI = 'br'
+_SUFFIXES = {IDENTITY: '.json', GZIP: '.json.gz', BROTLI: '.json.br'}
+
+_lock = threading.Lock()
+_bundle = None  # (version, {encoding: bytes}) of this worker's current bundle
+
+
+def bundle_dir():
+    return Path(getattr(settings, 'EXERCISE_BUNDLE_DIR', settings.BASE_DIR / 'exercise_bundles'))
+
+
+def version_name(version):
+    # Same fallback as the catalog ETag for a library that was never versioned
+    return version or 'initial'
+
+
+def encodings():
+    """Available encodings, in order of preference."""
+    return (BROTLI, GZIP, IDENTITY) if brotli is not None else (GZIP, IDENTITY)
+
+
+def etag(version, encoding):
+    return f'"exercise-bundle-{version_name(version)}-{encoding}"'
+
+
+def render(exercise_catalog):
+    """The bundle document for a catalog, as compact JSON bytes."""
+    return json.dumps({
+        'version': version_name(exercise_catalog.version),
+        'exercises': exercise_catalog.exercises,
+        'muscle_groups': exercise_catalog.muscle_groups,
+        'equipment': exercise_catalog.equipment,
+        'categories': exercise_catalog.categories,
+    }, cls=JSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def compress(payload, best=False):
+    """
+    All encodings of a payload. Brotli's best quality takes seconds on the
+    full library, so it is only used offline (load_exercises); bundles
+    built on a request use a quality that takes milliseconds.
+    """
+    variants = {IDENTITY: payload, GZIP: gzip.compress(payload, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[BROTLI] = brotli.compress(payload, quality=11 if best else 9)
+    return variants
+
+
+def _path(version, encoding):
+    return bundle_dir() / f'exercises-{version_name(version)}{_SUFFIXES[encoding]}'
+
+
+def write_bundle(exercise_catalog, best=False):
+    """
+    Write all encodings of the catalog's bundle to disk, replacing the files
+    of older versions. Returns {encoding: bytes}.
+    """
+    variants = compress(render(exercise_catalog), best=best)
+    directory = bundle_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    keep = set()
+    for encoding, data in variants.items():
+        path = _path(exercise_catalog.version, encoding)
+        # Write to a temporary file first so readers never see a partial bundle
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        keep.add(path.name)
+    for old in directory.glob('exercises-*.json*'):
+        if old.name not in keep:
+            old.unlink(missing_ok=True)
+    return variants
+
+
+def exists(version):
+    """True when every encoding of the version's bundle is on disk."""
+    return all(_path(version, encoding).exists() for encoding in encodings())
+
+
+def _read_bundle(version):
+    variants = {}
+    for encoding in encodings():
+        try:
+            variants[encoding] = _path(version, encoding).read_bytes()
+        except FileNotFoundError:
+            return None
+    return variants
+
+
+def get_bundle(exercise_catalog):
+    """
+    {encoding: bytes} for the catalog's version: from memory, from disk, or
+    built and written now. A read-only disk only costs the write.
+    """
+    global _bundle
+    version = exercise_catalog.version
+    current = _bundle
+    if current is not None and current[0] == version:
+        return current[1]
+    with _lock:
+        current = _bundle
+        if current is not None and current[0] == version:
+            return current[1]
+        variants = _read_bundle(version)
+        if variants is None:
+            try:
+                variants = write_bundle(exercise_catalog)
+            except OSError:
+                variants = compress(render(exercise_catalog))
+        _bundle = (version, variants)
+        return variants
+
+
+def clear():
+    """Forget this worker's bundle (used by tests)."""
+    global _bundle
+    _bundle = None
+
+
+def negotiate(request):
+    """Pick the preferred encoding the client accepts."""
+    accepted = {
+        part.split(';')[0].strip().lower()
+        for part in request.headers.get('Accept-Encoding', '').split(',')
+        if part.strip() and not part.replace(' ', '').endswith(';q=0')
+    }
+    for encoding in encodings():
+        if encoding == IDENTITY or encoding in accepted:
+            return encoding
+    return IDENTITY
+
+
+def not_modified(request, version):
+    """True when the client already has this version, in any encoding."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or any(etag(version, encoding) in etags for encoding in _SUFFIXES)
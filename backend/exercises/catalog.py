@@ -0,0 +1,223 @@
+"""
+Immutable in-memory exercise catalog, one per worker process.
+
+The exercise library only changes when `load_exercises` runs (or an admin
+edits it), so every worker keeps a fully serialized copy in memory and
+answers list, retrieve, filter and the muscle-group/equipment/category
+lists from it. Every field value also gets a bitmap over the catalog,
+so filters and facet counts are a few integer ANDs and popcounts.
+
+The catalog is keyed by the version stored in CatalogVersion. Workers
+check that version at most once per EXERCISE_CATALOG_CHECK_INTERVAL
+seconds and only go back to the database to rebuild when it changed.
+Changes made in this process invalidate the local copy immediately.
+"""
+import threading
+import time
+import uuid
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.http import parse_etags
+
+from .models import Exercise, MuscleGroup, Equipment, CatalogVersion
+from .autocomplete import PrefixIndex
+from .similarity import SimilarityIndex
+
+# Fields of ExerciseFilter answered from per-value bitmaps
+BITMAP_FIELDS = ('force', 'level', 'mechanic', 'category', 'equipment', 'primary_muscles', 'secondary_muscles')
+FILTER_FIELDS = BITMAP_FIELDS + ('name', 'id_in', 'q')
+FACETS = ('category', 'equipment', 'level', 'force', 'mechanic', 'primary_muscles')
+# Cached facet results per catalog; cleared when full
+FACET_CACHE_SIZE = 512
+
+_lock = threading.Lock()
+_catalog = None
+_checked_at = 0.0
+
+
+def _freeze(data):
+    """Recursively turn serializer output into read-only containers."""
+    if isinstance(data, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in data.items()})
+    if isinstance(data, (list, tuple)):
+        return tuple(_freeze(value) for value in data)
+    return data
+
+
+def _lower(value):
+    return value.casefold() if value else None
+
+
+class ExerciseCatalog:
+    """
+    A frozen snapshot of the exercise library at one catalog version.
+    Entries are the exact ExerciseSerializer output, wrapped read-only.
+    """
+
+    def __init__(self, version, exercises, muscle_groups, equipment, categories):
+        self.version = version
+        self.etag = f'"exercise-catalog-{version or "initial"}"'
+        self.exercises = tuple(_freeze(e) for e in exercises)
+        self.by_id = MappingProxyType({e['id']: e for e in self.exercises})
+        self.muscle_groups = _freeze(muscle_groups)
+        self.equipment = _freeze(equipment)
+        self.categories = _freeze(categories)
+
+        # One bitmap (a Python int, bit i = self.exercises[i]) per value of
+        # every filterable field, keyed by the case-folded value.
+        self._all = (1 << len(self.exercises)) - 1
+        self._bitmaps = {field: {} for field in BITMAP_FIELDS}
+        self._labels = {field: {} for field in BITMAP_FIELDS}
+        self._names = tuple(e['name'].casefold() for e in self.exercises)
+        for position, exercise in enumerate(self.exercises):
+            bit = 1 << position
+            for field in BITMAP_FIELDS:
+                values = exercise[field]
+                if not isinstance(values, tuple):
+                    values = (values,) if values else ()
+                for value in values:
+                    key = value.casefold()
+                    self._bitmaps[field][key] = self._bitmaps[field].get(key, 0) | bit
+                    self._labels[field].setdefault(key, value)
+
+        self._facet_cache = {}
+        # Feature matrix for substitute lookups (see exercises/similarity.py)
+        self.similarity = SimilarityIndex(self.exercises)
+        # Name prefixes for autocomplete (see exercises/autocomplete.py)
+        self.prefix_index = PrefixIndex(self.exercises)
+
+    @classmethod
+    def build(cls, version):
+        # Imported here to avoid a circular import with the serializers module
+        from .serializers import ExerciseSerializer, MuscleGroupSerializer, EquipmentSerializer
+
+        exercises = Exercise.objects.select_related('equipment')
+        categories = Exercise.objects.values_list('category', flat=True).distinct().order_by('category')
+        return cls(
+            version=version,
+            exercises=ExerciseSerializer(exercises, many=True).data,
+            muscle_groups=MuscleGroupSerializer(MuscleGroup.objects.order_by('name'), many=True).data,
+            equipment=EquipmentSerializer(Equipment.objects.order_by('name'), many=True).data,
+            categories=[{'category': category} for category in categories],
+        )
+
+    def _mask(self, params, skip=None):
+        """
+        Bitmap of the exercises matching ExerciseFilter's parameters (except
+        `q`), ignoring the `skip` field. Same semantics: `name` is
+        icontains, the rest are iexact, and `id_in` is a comma-separated
+        list of ids.
+        """
+        mask = self._all
+        for field in BITMAP_FIELDS:
+            value = params.get(field)
+            if value and field != skip:
+                mask &= self._bitmaps[field].get(value.casefold(), 0)
+
+        name = _lower(params.get('name'))
+        if name:
+            mask &= sum(1 << i for i, exercise_name in enumerate(self._names) if name in exercise_name)
+        if params.get('id_in'):
+            ids = {int(i.strip()) for i in params['id_in'].split(',') if i.strip().isdigit()}
+            mask &= sum(1 << i for i, exercise in enumerate(self.exercises) if exercise['id'] in ids)
+        return mask
+
+    def _select(self, mask):
+        return [exercise for i, exercise in enumerate(self.exercises) if mask >> i & 1]
+
+    def filter(self, params):
+        """Apply ExerciseFilter's parameters (except `q`) to the catalog."""
+        return self._select(self._mask(params))
+
+    def facets(self, params, search=None):
+        """
+        Counts per value of every facet for the given filter parameters.
+
+        Each facet is counted with all filters applied except its own, so
+        the sidebar can still show how many results picking another value
+        of that facet would give. Values without matches are included with
+        a count of 0. `search`, called only on a cache miss, returns the
+        ids matching `q`.
+
+        Results are cached on this catalog (and so dropped with it) per
+        filter combination.
+        """
+        cache_key = tuple(sorted(
+            (field, params[field].casefold()) for field in FILTER_FIELDS if params.get(field)
+        ))
+        cached = self._facet_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        base = self._all
+        if params.get('q') and search is not None:
+            ids = set(search(params['q']))
+            base = sum(1 << i for i, exercise in enumerate(self.exercises) if exercise['id'] in ids)
+        result = {'count': (self._mask(params) & base).bit_count()}
+        for facet in FACETS:
+            mask = self._mask(params, skip=facet) & base
+            labels = self._labels[facet]
+            result[facet] = {
+                labels[key]: (bitmap & mask).bit_count()
+                for key, bitmap in sorted(self._bitmaps[facet].items())
+            }
+        result = _freeze(result)
+
+        if len(self._facet_cache) >= FACET_CACHE_SIZE:
+            self._facet_cache.clear()
+        self._facet_cache[cache_key] = result
+        return result
+
+    def not_modified(self, request):
+        """True when the client already has this catalog version."""
+        header = request.headers.get('If-None-Match')
+        if not header:
+            return False
+        etags = parse_etags(header)
+        return '*' in etags or self.etag in etags
+
+
+def current_version():
+    return CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first() or ''
+
+
+def get_catalog():
+    """
+    Return this worker's catalog, rebuilding it only when the stored
+    catalog version changed since it was built.
+    """
+    global _catalog, _checked_at
+    interval = getattr(settings, 'EXERCISE_CATALOG_CHECK_INTERVAL', 5)
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _checked_at < interval:
+        return catalog
+
+    version = current_version()
+    if catalog is None or catalog.version != version:
+        with _lock:
+            catalog = _catalog
+            if catalog is None or catalog.version != version:
+                catalog = ExerciseCatalog.build(version)
+                _catalog = catalog
+    _checked_at = time.monotonic()
+    return catalog
+
+
+def invalidate():
+    """Drop this worker's catalog; the next request rebuilds it."""
+    global _catalog
+    _catalog = None
+
+
+def bump_version():
+    """
+    Store a new catalog version so every worker rebuilds its catalog.
+    Random versions (rather than a counter) can never collide with a
+    catalog built from a rolled-back transaction.
+    """
+    CatalogVersion.objects.update_or_create(pk=1, defaults={'version': uuid.uuid4().hex})
+    invalidate()
+    # A request running before the commit may have rebuilt from old data
+    transaction.on_commit(invalidate)
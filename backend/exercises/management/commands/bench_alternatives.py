@@ -0,0 +1,47 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from exercises.catalog import ExerciseCatalog, current_version
+from exercises.similarity import SimilarityIndex
+
+
+class Command(BaseCommand):
+    help = "Benchmark substitute lookups (exercises/similarity.py) on the current exercise library."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10000, help='Number of lookups (default: 10000).')
+        parser.add_argument('--k', type=int, default=10, help='Alternatives per lookup (default: 10).')
+        parser.add_argument(
+            '--equipment', type=str, default=None,
+            help='Comma-separated equipment filter applied to every lookup.',
+        )
+
+    def handle(self, *args, **options):
+        exercise_catalog = ExerciseCatalog.build(current_version())
+        if not exercise_catalog.exercises:
+            raise CommandError("The exercise library is empty; run load_exercises first.")
+
+        start = time.perf_counter()
+        index = SimilarityIndex(exercise_catalog.exercises)
+        build = time.perf_counter() - start
+
+        equipment = options['equipment'].split(',') if options['equipment'] else None
+        rng = random.Random(0)
+        ids = [rng.choice(exercise_catalog.exercises)['id'] for _ in range(options['iterations'])]
+        timings = []
+        for exercise_id in ids:
+            start = time.perf_counter_ns()
+            index.alternatives(exercise_id, k=options['k'], equipment=equipment)
+            timings.append((time.perf_counter_ns() - start) / 1000)
+        timings.sort()
+
+        self.stdout.write(
+            f"{len(exercise_catalog.exercises)} exercises, {index.matrix.shape[1]} features, "
+            f"index built in {build * 1000:.1f} ms"
+        )
+        self.stdout.write(
+            f"{len(timings)} lookups (k={options['k']}): mean {statistics.fmean(timings):.1f} us, "
+            f"p50 {timings[len(timings) // 2]:.1f} us, p99 {timings[int(len(timings) * 0.99)]:.1f} us"
+        )
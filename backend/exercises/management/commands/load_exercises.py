@@ -1,71 +1,220 @@
+import hashlib
 import json
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from exercises.models import Exercise, MuscleGroup, Equipment
+from exercises import bundle, catalog, search
+from exercises.signals import bulk_load
+
+# Exercise columns written from the JSON file
+FIELDS = [
+    'name', 'aliases', 'force', 'level', 'mechanic', 'category', 'equipment',
+    'instructions', 'primary_muscle_names', 'secondary_muscle_names', 'content_hash',
+]
+
+
+def iter_json_array(fp, chunk_size=64 * 1024):
+    """
+    Yield the items of a top-level JSON array one at a time, reading the
+    file in chunks, so very large files never have to fit in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof, started = '', 0, False, False
+
+    def read_more():
+        nonlocal buffer, pos, eof
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError('Unexpected end of JSON file.')
+            read_more()
+            continue
+
+        char = buffer[pos]
+        if not started:
+            if char != '[':
+                raise ValueError('Expected a JSON array of exercises.')
+            started = True
+            pos += 1
+        elif char == ']':
+            return
+        elif char == ',':
+            pos += 1
+        else:
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Most likely an item cut off at the end of the buffer
+                if eof:
+                    raise
+                read_more()
+                continue
+            yield item
+
+
+def content_hash(exercise_data):
+    """Stable hash of the parts of a JSON record that we store."""
+    record = {
+        'name': exercise_data['name'],
+        'force': exercise_data.get('force'),
+        'level': exercise_data['level'],
+        'mechanic': exercise_data.get('mechanic'),
+        'category': exercise_data['category'],
+        'equipment': exercise_data.get('equipment'),
+        'instructions': exercise_data.get('instructions', []),
+        'primaryMuscles': exercise_data.get('primaryMuscles', []),
+        'secondaryMuscles': exercise_data.get('secondaryMuscles', []),
+    }
+    # Only hashed when present, so records without aliases keep their hash
+    if exercise_data.get('aliases'):
+        record['aliases'] = exercise_data['aliases']
+    return hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
+
 
 class Command(BaseCommand):
+    help = (
+        "Load the exercise library from a JSON file. Unchanged exercises are "
+        "skipped, changed ones are written in batches."
+    )
+
     def add_arguments(self, parser):
         parser.add_argument('json_file', type=str)
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of changed exercises written per batch (default: 500).',
+        )
 
     @transaction.atomic
     def handle(self, *args, **options):
         json_file_path = options['json_file']
         self.stdout.write(f"Loading exercises from {json_file_path}...")
+        started = time.perf_counter()
+        self.verbosity = options['verbosity']
+
+        self.timings = {'parse': 0.0, 'write': 0.0, 'index': 0.0, 'bundle': 0.0}
+        self.counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+        self.known = dict(Exercise.objects.order_by().values_list('source_id', 'content_hash'))
+        self.muscle_groups = dict(MuscleGroup.objects.values_list('name', 'id'))
+        self.equipments = dict(Equipment.objects.values_list('name', 'id'))
+        changed_ids = []
 
         try:
-            with open(json_file_path, 'r') as f:
-                data = json.load(f)
+            with open(json_file_path, 'r', encoding='utf-8') as f, bulk_load():
+                batch = []
+                for exercise_data, digest in self.changed_records(f):
+                    batch.append((exercise_data, digest))
+                    if len(batch) >= options['batch_size']:
+                        changed_ids.extend(self.write_batch(batch))
+                        batch = []
+                if batch:
+                    changed_ids.extend(self.write_batch(batch))
         except FileNotFoundError:
-            self.stderr.write(self.style.ERROR(f"Fiel not found at {json_file_path}"))
-            return
-        
-        # Keep track of created objects to avoid redundant DB queries
-        muscle_groups = {mg.name: mg for mg in MuscleGroup.objects.all()}
-        equipments = {eq.name: eq for eq in Equipment.objects.all()}
-
-        for exercise_data in data:
-            # Get or create Equipment
-            equipment_name = exercise_data.get('equipment')
-            if equipment_name and equipment_name not in equipments:
-                equipments[equipment_name] = Equipment.objects.create(name=equipment_name)
-            equipment_obj = equipments.get(equipment_name)
-
-            # Create the exercise object
-            exercise, created = Exercise.objects.update_or_create(
-                source_id=exercise_data['id'],
-                defaults={
-                    'name': exercise_data['name'],
-                    'force': exercise_data.get('force'),
-                    'level': exercise_data['level'],
-                    'mechanic': exercise_data.get('mechanic'),
-                    'category': exercise_data['category'],
-                    'equipment': equipment_obj,
-                    'instructions': exercise_data.get('instructions', []),
-                }
+            raise CommandError(f"File not found at {json_file_path}")
+        except ValueError as exc:
+            raise CommandError(f"Invalid exercise file {json_file_path}: {exc}")
+
+        if changed_ids:
+            timer = time.perf_counter()
+            search.refresh_search_index(changed_ids)
+            # Tell every worker to rebuild its in-memory catalog
+            catalog.bump_version()
+            self.timings['index'] += time.perf_counter() - timer
+
+        # Precompressed bundle for offline clients; also written on a no-op
+        # reload when the current version has no bundle yet
+        timer = time.perf_counter()
+        version = catalog.current_version()
+        if changed_ids or not bundle.exists(version):
+            bundle.write_bundle(catalog.ExerciseCatalog.build(version), best=True)
+        self.timings['bundle'] = time.perf_counter() - timer
+
+        total = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            "Finished loading exercises: {created} created, {updated} updated, "
+            "{unchanged} unchanged.".format(**self.counts)
+        ))
+        self.stdout.write(
+            f"Timings: parse {self.timings['parse']:.3f}s, write {self.timings['write']:.3f}s, "
+            f"index {self.timings['index']:.3f}s, bundle {self.timings['bundle']:.3f}s, total {total:.3f}s"
+        )
+
+    def changed_records(self, f):
+        """Yield (record, hash) for every record that differs from the database."""
+        timer = time.perf_counter()
+        for exercise_data in iter_json_array(f):
+            digest = content_hash(exercise_data)
+            if self.known.get(exercise_data['id']) == digest:
+                self.counts['unchanged'] += 1
+                continue
+            self.timings['parse'] += time.perf_counter() - timer
+            yield exercise_data, digest
+            timer = time.perf_counter()
+        self.timings['parse'] += time.perf_counter() - timer
+
+    def ensure(self, model, names, known):
+        """Create any missing lookup rows (equipment, muscle groups) in bulk."""
+        missing = {name for name in names if name and name not in known}
+        if missing:
+            model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+            known.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    def write_batch(self, batch):
+        """Upsert a batch of changed exercises and replace their muscle links."""
+        timer = time.perf_counter()
+        self.ensure(Equipment, {data.get('equipment') for data, _ in batch}, self.equipments)
+        self.ensure(MuscleGroup, {
+            name for data, _ in batch
+            for name in data.get('primaryMuscles', []) + data.get('secondaryMuscles', [])
+        }, self.muscle_groups)
+
+        exercises = [
+            Exercise(
+                source_id=data['id'],
+                name=data['name'],
+                aliases=data.get('aliases', []),
+                force=data.get('force'),
+                level=data['level'],
+                mechanic=data.get('mechanic'),
+                category=data['category'],
+                equipment_id=self.equipments.get(data.get('equipment')),
+                instructions=data.get('instructions', []),
+                primary_muscle_names=data.get('primaryMuscles', []),
+                secondary_muscle_names=data.get('secondaryMuscles', []),
+                content_hash=digest,
             )
+            for data, digest in batch
+        ]
+        Exercise.objects.bulk_create(
+            exercises, update_conflicts=True, unique_fields=['source_id'],
+            update_fields=FIELDS,
+        )
+        ids = dict(Exercise.objects.filter(
+            source_id__in=[data['id'] for data, _ in batch]
+        ).values_list('source_id', 'id'))
 
-            # Handle Primary Muscles (ManyToMany)
-            primary_muscle_names = exercise_data.get('primaryMuscles', [])
-            primary_muscle_objs = []
-            for name in primary_muscle_names:
-                if name not in muscle_groups:
-                    muscle_groups[name] = MuscleGroup.objects.create(name=name)
-                primary_muscle_objs.append(muscle_groups[name])
-            exercise.primary_muscles.set(primary_muscle_objs)
-
-            # Handle Secondary Muscles (ManyToMany)
-            secondary_muscle_names = exercise_data.get('secondaryMuscles', [])
-            secondary_muscle_objs = []
-            for name in secondary_muscle_names:
-                if name not in muscle_groups:
-                    muscle_groups[name] = MuscleGroup.objects.create(name=name)
-                secondary_muscle_objs.append(muscle_groups[name])
-            exercise.secondary_muscles.set(secondary_muscle_objs)
-
-            if created:
-                self.stdout.write(self.style.SUCCESS(f"Successfully created exercise: {exercise.name}"))
-            else:
-                self.stdout.write(f"Updated exercise: {exercise.name}")
-
-        self.stdout.write(self.style.SUCCESS("Finished loading all exercises."))
+        # Replace the M2M links of the changed exercises with two bulk inserts
+        for field, key in (('primary_muscles', 'primaryMuscles'), ('secondary_muscles', 'secondaryMuscles')):
+            through = getattr(Exercise, field).through
+            through.objects.filter(exercise_id__in=ids.values()).delete()
+            through.objects.bulk_create([
+                through(exercise_id=ids[data['id']], musclegroup_id=self.muscle_groups[name])
+                for data, _ in batch
+                for name in dict.fromkeys(data.get(key, []))
+            ])
 
+        for data, _ in batch:
+            created = data['id'] not in self.known
+            self.counts['created' if created else 'updated'] += 1
+            if self.verbosity >= 2:
+                self.stdout.write(f"{'Created' if created else 'Updated'} exercise: {data['name']}")
+            self.known[data['id']] = None
+        self.timings['write'] += time.perf_counter() - timer
+        return list(ids.values())
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import exercises.models
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def backfill_search_index(apps, schema_editor):
+    Exercise = apps.get_model('exercises', 'Exercise')
+    exercises = list(
+        Exercise.objects.select_related('equipment').prefetch_related('primary_muscles', 'secondary_muscles')
+    )
+    for exercise in exercises:
+        parts = [exercise.category, exercise.force, exercise.mechanic, exercise.level]
+        if exercise.equipment_id:
+            parts.append(exercise.equipment.name)
+        parts.extend(m.name for m in exercise.primary_muscles.all())
+        parts.extend(m.name for m in exercise.secondary_muscles.all())
+        parts.extend(exercise.instructions or [])
+        exercise.search_document = ' '.join(p for p in parts if p)
+    Exercise.objects.bulk_update(exercises, ['search_document'], batch_size=500)
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE exercises_exercise SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(search_document, '')), 'B')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercises', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='exercise',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=exercises.models.FallbackGinIndex(fields=['search_vector'], name='exercise_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=exercises.models.FallbackGinIndex(
+                django.contrib.postgres.indexes.OpClass('name', name='gin_trgm_ops'), name='exercise_name_trgm_gin'
+            ),
+        ),
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
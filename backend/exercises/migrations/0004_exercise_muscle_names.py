@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:39
+
+from django.db import migrations, models
+
+
+def backfill_muscle_names(apps, schema_editor):
+    Exercise = apps.get_model('exercises', 'Exercise')
+    exercises = list(Exercise.objects.prefetch_related('primary_muscles', 'secondary_muscles'))
+    for exercise in exercises:
+        exercise.primary_muscle_names = [m.name for m in exercise.primary_muscles.all()]
+        exercise.secondary_muscle_names = [m.name for m in exercise.secondary_muscles.all()]
+    Exercise.objects.bulk_update(exercises, ['primary_muscle_names', 'secondary_muscle_names'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercises', '0003_catalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='primary_muscle_names',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='secondary_muscle_names',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_muscle_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercises', '0004_exercise_muscle_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercises', '0005_exercise_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='aliases',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
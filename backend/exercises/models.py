@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 
 class MuscleGroup(models.Model):
     """Represents a muscle group, e.g., 'Chest', 'Back', 'Legs'."""
@@ -14,10 +16,31 @@ class Equipment(models.Model):
     def __str__(self):
         return self.name
 
+class FallbackGinIndex(GinIndex):
+    """
+    A GIN index on PostgreSQL and a plain index (without operator classes)
+    elsewhere, so SQLite can still build the tables in tests.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+        if self.expressions:
+            expressions = [
+                e.get_source_expressions()[0] if isinstance(e, OpClass) else e for e in self.expressions
+            ]
+            plain = models.Index(*expressions, name=self.name)
+        else:
+            plain = models.Index(fields=self.fields, name=self.name)
+        return plain.create_sql(model, schema_editor, **kwargs)
+
+
 class Exercise(models.Model):
     """Represents a single exercise from the library."""
     name = models.CharField(max_length=200, unique=True)
     source_id = models.CharField(max_length=100, unique=True, help_text="The ID from the source JSON file")
+    # Hash of the source JSON record, so load_exercises can skip unchanged rows
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
     force = models.CharField(max_length=50, null=True, blank=True)
     level = models.CharField(max_length=50)
     mechanic = models.CharField(max_length=50, null=True, blank=True)
@@ -26,11 +49,54 @@ class Exercise(models.Model):
     equipment = models.ForeignKey(Equipment, on_delete=models.SET_NULL, null=True, blank=True, related_name="exercises")
     primary_muscles = models.ManyToManyField(MuscleGroup, related_name="primary_exercises")
     secondary_muscles = models.ManyToManyField(MuscleGroup, related_name="secondary_exercises", blank=True)
+    # Muscle names copied from the M2M fields above, so serializing an
+    # exercise needs no extra queries. Kept in sync by refresh_muscle_names().
+    primary_muscle_names = models.JSONField(default=list, editable=False)
+    secondary_muscle_names = models.JSONField(default=list, editable=False)
     
     instructions = models.JSONField(default=list)
+    # Other names lifters search for, e.g. "RDL" or "Skull Crusher"
+    aliases = models.JSONField(default=list, blank=True)
+
+    # Search index (see exercises/search.py)
+    # Muscles, equipment, category and instructions as plain text
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Weighted tsvector of name + search_document, only populated on PostgreSQL
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.name
 
+    def refresh_muscle_names(self):
+        """
+        Copy the current M2M muscle names into the denormalized columns.
+        Uses a queryset update, so no save signals are sent.
+        """
+        self.primary_muscle_names = list(self.primary_muscles.values_list('name', flat=True))
+        self.secondary_muscle_names = list(self.secondary_muscles.values_list('name', flat=True))
+        Exercise.objects.filter(pk=self.pk).update(
+            primary_muscle_names=self.primary_muscle_names,
+            secondary_muscle_names=self.secondary_muscle_names,
+        )
+
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Full-text and trigram search (see exercises/search.py)
+            FallbackGinIndex(fields=['search_vector'], name='exercise_search_vector_gin'),
+            FallbackGinIndex(OpClass('name', name='gin_trgm_ops'), name='exercise_name_trgm_gin'),
+        ]
+
+
+class CatalogVersion(models.Model):
+    """
+    Single-row table holding the current version of the exercise library.
+    Every change to exercises, muscle groups or equipment stores a new
+    random version; workers compare it to the version of their in-memory
+    catalog (see exercises/catalog.py) to know when to rebuild it.
+    """
+    version = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.version
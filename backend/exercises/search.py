@@ -0,0 +1,192 @@
+"""
+Ranked, typo-tolerant exercise search.
+
+Every exercise carries a denormalized `search_document` (muscles, equipment,
+category and instructions). On PostgreSQL the name and the document are
+indexed in a weighted `search_vector` column (GIN) and the name also gets a
+trigram GIN index, so a query matches either through full-text search or
+through trigram word similarity (which catches "benchpress" or "dumbell").
+Both are index lookups; the queries of a search run in search_transaction(),
+which sets the similarity threshold the %> operator uses.
+
+Other databases (SQLite in tests) use an in-process fallback that mirrors
+the same rules closely enough to behave the same way.
+"""
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, When, F, Q, Value, FloatField
+from django.db.models.functions import Coalesce
+
+from .models import Exercise
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+SEARCH_CONFIG = 'english'
+
+
+def trigram_threshold():
+    # Same default as pg_trgm.word_similarity_threshold
+    return getattr(settings, 'EXERCISE_SEARCH_TRIGRAM_THRESHOLD', 0.6)
+
+
+@contextmanager
+def search_transaction():
+    """
+    Transaction to evaluate search() querysets in. On PostgreSQL it sets
+    pg_trgm.word_similarity_threshold (read by the %> operator) to
+    EXERCISE_SEARCH_TRIGRAM_THRESHOLD until it ends.
+    """
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # SET takes no parameters; the value is a formatted float
+            cursor.execute(f'SET LOCAL pg_trgm.word_similarity_threshold = {float(trigram_threshold())}')
+        yield
+
+
+def build_search_document(exercise):
+    """
+    Text indexed besides the name (aliases, muscles, ...). Expects equipment to be selected when
+    called for many exercises.
+    """
+    parts = list(exercise.aliases or [])
+    parts += [exercise.category or '', exercise.force or '', exercise.mechanic or '', exercise.level or '']
+    if exercise.equipment_id:
+        parts.append(exercise.equipment.name)
+    parts.extend(exercise.primary_muscle_names)
+    parts.extend(exercise.secondary_muscle_names)
+    parts.extend(exercise.instructions or [])
+    return ' '.join(p for p in parts if p)
+
+
+def refresh_search_index(exercise_ids=None):
+    """
+    Rebuild search documents (and the tsvector column on PostgreSQL) for the
+    given exercises, or for the whole library.
+    """
+    queryset = Exercise.objects.select_related('equipment')
+    if exercise_ids is not None:
+        queryset = queryset.filter(id__in=exercise_ids)
+
+    exercises = list(queryset)
+    for exercise in exercises:
+        exercise.search_document = build_search_document(exercise)
+    Exercise.objects.bulk_update(exercises, ['search_document'], batch_size=500)
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+
+        Exercise.objects.filter(id__in=[e.id for e in exercises]).update(
+            search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector('search_document', weight='B', config=SEARCH_CONFIG)
+            )
+        )
+
+
+def search(queryset, query):
+    """
+    Filter `queryset` to exercises matching `query`, best matches first.
+    Evaluate the result in search_transaction().
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return _search_postgres(queryset, query)
+    return _search_in_process(queryset, query)
+
+
+def _search_postgres(queryset, query):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+
+    ts_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.annotate(
+        text_rank=Coalesce(SearchRank(F('search_vector'), ts_query), Value(0.0), output_field=FloatField()),
+        name_similarity=TrigramWordSimilarity(query, 'name'),
+    ).filter(
+        # Both served by the GIN indexes; %> compares with the threshold set
+        # in search_transaction()
+        Q(search_vector=ts_query) | Q(name__trigram_word_similar=query)
+    ).annotate(
+        search_rank=F('text_rank') + F('name_similarity')
+    ).order_by('-search_rank', 'name')
+
+
+# --- In-process fallback ---------------------------------------------------
+
+def _words(text):
+    return _WORD_RE.findall((text or '').lower())
+
+
+def _trigrams(words):
+    grams = set()
+    for word in words:
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def word_similarity(query, text):
+    """
+    Approximation of pg_trgm's word_similarity(): the best share of the
+    query's trigrams found in any run of consecutive words of `text`.
+    Spaces in the query are ignored, so "bench press" and "benchpress"
+    both match "Barbell Bench Press".
+    """
+    query_grams = _trigrams([''.join(_words(query))])
+    if not query_grams:
+        return 0.0
+    words = _words(text)
+    best = 0.0
+    for start in range(len(words)):
+        for end in range(start + 1, min(start + 4, len(words)) + 1):
+            window = words[start:end]
+            common = query_grams & (_trigrams(window) | _trigrams([''.join(window)]))
+            best = max(best, len(common) / len(query_grams))
+    return best
+
+
+def text_rank(query_words, name_words, document_words):
+    """Share of query words found in the name (weight 1) or document (0.4)."""
+    if not query_words:
+        return 0.0
+    score = 0.0
+    for word in query_words:
+        if any(w.startswith(word) for w in name_words):
+            score += 1.0
+        elif any(w.startswith(word) for w in document_words):
+            score += 0.4
+    return score / len(query_words)
+
+
+def rank_documents(query, documents):
+    """
+    Score (id, name, search_document) triples against `query`.
+    Returns [(score, name, id)] for matches, best first.
+    """
+    query_words = _words(query)
+    threshold = trigram_threshold()
+    matches = []
+    for exercise_id, name, document in documents:
+        rank = text_rank(query_words, _words(name), _words(document))
+        similarity = word_similarity(query, name)
+        if rank > 0 or similarity >= threshold:
+            matches.append((rank + similarity, name, exercise_id))
+    matches.sort(key=lambda match: (-match[0], match[1]))
+    return matches
+
+
+def _search_in_process(queryset, query):
+    # M2M filters can repeat rows; score every exercise once
+    documents = {row[0]: row for row in queryset.order_by().values_list('id', 'name', 'search_document')}
+    ids = [exercise_id for _, _, exercise_id in rank_documents(query, documents.values())]
+    if not ids:
+        return queryset.none()
+    ordering = Case(*[When(id=pk, then=position) for position, pk in enumerate(ids)])
+    return queryset.filter(id__in=ids).order_by(ordering)
@@ -24,18 +24,13 @@ class CategorySerializer(serializers.Serializer):
 class ExerciseSerializer(serializers.ModelSerializer):
     """Serializer for the Exercise model"""
     equipment = serializers.StringRelatedField()
-    primary_muscles = serializers.SerializerMethodField()
-    secondary_muscles = serializers.SerializerMethodField()
-
-    def get_primary_muscles(self, obj):
-        return [str(m) for m in obj.primary_muscles.all()] if obj.primary_muscles.exists() else []
-
-    def get_secondary_muscles(self, obj):
-        return [str(m) for m in obj.secondary_muscles.all()] if obj.secondary_muscles.exists() else []
+    # Read from the denormalized name columns, so no M2M queries are needed
+    primary_muscles = serializers.ListField(source='primary_muscle_names', child=serializers.CharField(), read_only=True)
+    secondary_muscles = serializers.ListField(source='secondary_muscle_names', child=serializers.CharField(), read_only=True)
 
     class Meta:
         model = Exercise
         fields = [
-            'id', 'name', 'force', 'level', 'mechanic', 'category', 
+            'id', 'name', 'aliases', 'force', 'level', 'mechanic', 'category', 
             'equipment', 'primary_muscles', 'secondary_muscles', 'instructions'
         ]
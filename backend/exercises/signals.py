@@ -0,0 +1,106 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Exercise, MuscleGroup, Equipment
+from . import catalog, search
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_load():
+    """
+    Suppress the per-row search refreshes and catalog version bumps below.
+    For bulk loads (load_exercises) that refresh the search index and bump
+    the catalog version once at the end.
+    """
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = False
+
+
+def _suspended():
+    return getattr(_state, 'suspended', False)
+
+
+def _exercises_using(muscle_group):
+    return Exercise.objects.filter(
+        Q(primary_muscles=muscle_group) | Q(secondary_muscles=muscle_group)
+    ).distinct()
+
+
+def _refresh_muscle_names(exercises):
+    # Order matters: the search document is built from the muscle names
+    exercise_ids = []
+    for exercise in exercises:
+        exercise.refresh_muscle_names()
+        exercise_ids.append(exercise.id)
+    if exercise_ids:
+        search.refresh_search_index(exercise_ids)
+
+
+@receiver(post_save, sender=Exercise)
+def refresh_search_on_save(sender, instance, raw=False, **kwargs):
+    if raw or _suspended():
+        return
+    search.refresh_search_index([instance.id])
+
+
+@receiver(m2m_changed, sender=Exercise.primary_muscles.through)
+@receiver(m2m_changed, sender=Exercise.secondary_muscles.through)
+def refresh_on_muscles_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear') or _suspended():
+        return
+    if not reverse:
+        exercises = [instance]
+    elif pk_set:
+        exercises = Exercise.objects.filter(pk__in=pk_set)
+    else:
+        # Cleared from the muscle group side: the affected exercises are unknown
+        exercises = Exercise.objects.all()
+    _refresh_muscle_names(exercises)
+    catalog.bump_version()
+
+
+@receiver(post_save, sender=MuscleGroup)
+def refresh_on_muscle_group_rename(sender, instance, created, raw=False, **kwargs):
+    if created or raw or _suspended():
+        return
+    _refresh_muscle_names(_exercises_using(instance))
+
+
+@receiver(post_save, sender=Equipment)
+def refresh_on_equipment_rename(sender, instance, created, raw=False, **kwargs):
+    if created or raw or _suspended():
+        return
+    search.refresh_search_index(list(instance.exercises.values_list('id', flat=True)))
+
+
+@receiver(pre_delete, sender=MuscleGroup)
+def remember_muscle_group_exercises(sender, instance, **kwargs):
+    # The through rows are gone by post_delete, so collect the exercises now
+    instance._exercise_ids = [exercise.id for exercise in _exercises_using(instance)]
+
+
+@receiver(post_delete, sender=MuscleGroup)
+def refresh_on_muscle_group_delete(sender, instance, **kwargs):
+    if _suspended():
+        return
+    _refresh_muscle_names(Exercise.objects.filter(pk__in=getattr(instance, '_exercise_ids', [])))
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+@receiver(post_save, sender=MuscleGroup)
+@receiver(post_delete, sender=MuscleGroup)
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def bump_catalog_version(sender, raw=False, **kwargs):
+    if raw or _suspended():
+        return
+    catalog.bump_version()
@@ -0,0 +1,80 @@
+"""
+Exercise substitutes by muscle and equipment similarity.
+
+Every exercise of the catalog becomes a weighted one-hot feature vector
+(primary and secondary muscles, equipment, mechanic, force, level),
+normalized to unit length and stacked into one float32 matrix when the
+catalog is built. The alternatives of an exercise are then a single
+matrix-vector product (cosine similarity) plus a partial sort, which takes
+microseconds for the whole library.
+"""
+import numpy as np
+
+# Weight of each feature group. Primary muscles dominate: a substitute has
+# to train the same thing; the rest only breaks ties between those.
+WEIGHTS = {
+    'primary_muscles': 1.0,
+    'secondary_muscles': 0.4,
+    'mechanic': 0.3,
+    'force': 0.3,
+    'equipment': 0.2,
+    'level': 0.15,
+}
+
+
+class SimilarityIndex:
+    """Unit feature vectors of a tuple of serialized exercises."""
+
+    def __init__(self, exercises):
+        self.exercises = exercises
+        self.positions = {exercise['id']: position for position, exercise in enumerate(exercises)}
+
+        features = {}
+        rows, columns, values = [], [], []
+        for position, exercise in enumerate(exercises):
+            for group, weight in WEIGHTS.items():
+                items = exercise[group]
+                if not isinstance(items, tuple):
+                    items = (items,) if items else ()
+                for item in items:
+                    column = features.setdefault((group, item.casefold()), len(features))
+                    rows.append(position)
+                    columns.append(column)
+                    values.append(weight)
+
+        matrix = np.zeros((len(exercises), max(len(features), 1)), dtype=np.float32)
+        matrix[rows, columns] = values
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.matrix = matrix / norms
+
+        # Equipment as small integer codes, for fast filtering; 0 is "none"
+        self.equipment_codes = {}
+        self.equipment = np.array([
+            self.equipment_codes.setdefault(exercise['equipment'].casefold(), len(self.equipment_codes) + 1)
+            if exercise['equipment'] else 0
+            for exercise in exercises
+        ], dtype=np.int32)
+
+    def alternatives(self, exercise_id, k=10, equipment=None):
+        """
+        The k exercises most similar to `exercise_id` as [(exercise, score)],
+        best first. `equipment` optionally limits the results to exercises
+        using one of the given equipment names (case-insensitive); exercises
+        needing no equipment are always allowed. Only exercises sharing at
+        least one feature are returned. Raises KeyError for unknown ids.
+        """
+        position = self.positions[exercise_id]
+        scores = self.matrix @ self.matrix[position]
+        scores[position] = -1
+        if equipment is not None:
+            allowed = [0] + [self.equipment_codes[name.casefold()] for name in equipment
+                             if name.casefold() in self.equipment_codes]
+            scores[~np.isin(self.equipment, allowed)] = -1
+
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.exercises[i], float(scores[i])) for i in top if scores[i] > 0]
@@ -1,3 +1,646 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .models import Exercise, MuscleGroup, Equipment
+from .serializers import ExerciseSerializer
+from .views import ExerciseFilter
+from .management.commands.load_exercises import iter_json_array
+from . import bundle, catalog, search
+
+User = get_user_model()
+
+
+def create_exercise(name, equipment=None, primary=(), secondary=(), **kwargs):
+    """Create an exercise with its related equipment and muscle groups."""
+    defaults = {
+        'source_id': name.replace(' ', '_'),
+        'level': 'beginner',
+        'category': 'strength',
+    }
+    defaults.update(kwargs)
+    if equipment:
+        defaults['equipment'], _ = Equipment.objects.get_or_create(name=equipment)
+    exercise = Exercise.objects.create(name=name, **defaults)
+    exercise.primary_muscles.set([MuscleGroup.objects.get_or_create(name=m)[0] for m in primary])
+    exercise.secondary_muscles.set([MuscleGroup.objects.get_or_create(name=m)[0] for m in secondary])
+    return exercise
+
+
+class ExerciseTestMixin:
+    """Creates a small exercise library and an authenticated client."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='SecurePass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.bench = create_exercise(
+            'Barbell Bench Press', equipment='barbell', primary=['chest'],
+            secondary=['shoulders', 'triceps'], force='push', mechanic='compound',
+            instructions=['Lie back on a flat bench.'],
+        )
+        self.db_bench = create_exercise(
+            'Dumbbell Bench Press', equipment='dumbbell', primary=['chest'],
+            secondary=['triceps'], force='push', mechanic='compound',
+        )
+        self.curl = create_exercise(
+            'Dumbbell Bicep Curl', equipment='dumbbell', primary=['biceps'],
+            force='pull', mechanic='isolation', level='intermediate',
+        )
+        self.squat = create_exercise(
+            'Barbell Squat', equipment='barbell', primary=['quadriceps'],
+            secondary=['glutes', 'hamstrings'], force='push', mechanic='compound',
+            category='powerlifting', instructions=['Keep your chest up.'],
+        )
+
+
+class ExerciseSearchTestCase(ExerciseTestMixin, APITestCase):
+    """
+    Test suite for the ranked `?q=` exercise search.
+
+    Runs against the in-process fallback used on SQLite; the PostgreSQL
+    query is only compiled.
+    """
+
+    def search(self, query):
+        response = self.client.get('/api/v1/exercises/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [e['name'] for e in response.data['results']]
+
+    def test_search_document_is_maintained(self):
+        """
+        Muscles and equipment end up in the search document.
+        """
+        self.bench.refresh_from_db()
+        self.assertIn('chest', self.bench.search_document)
+        self.assertIn('barbell', self.bench.search_document)
+
+    def test_typos_and_missing_spaces(self):
+        """
+        Fuzzy name matching catches 'benchpress' and 'dumbell'.
+        """
+        self.assertEqual(set(self.search('benchpress')), {'Barbell Bench Press', 'Dumbbell Bench Press'})
+        self.assertEqual(set(self.search('dumbell')), {'Dumbbell Bench Press', 'Dumbbell Bicep Curl'})
+
+    def test_searches_muscles_and_instructions(self):
+        """
+        Muscles, equipment and instructions are searchable, not only names.
+        """
+        self.assertEqual(set(self.search('chest')), {'Barbell Bench Press', 'Dumbbell Bench Press', 'Barbell Squat'})
+        self.assertEqual(set(self.search('triceps')), {'Barbell Bench Press', 'Dumbbell Bench Press'})
+
+    def test_results_are_ranked(self):
+        """
+        Name matches come before exercises only mentioning the query.
+        """
+        self.assertEqual(self.search('bench press barbell')[0], 'Barbell Bench Press')
+        self.assertEqual(self.search('barbell chest'), ['Barbell Bench Press', 'Barbell Squat', 'Dumbbell Bench Press'])
+
+    def test_search_combines_with_filters(self):
+        """
+        `q` narrows down together with the existing filters.
+        """
+        response = self.client.get('/api/v1/exercises/', {'q': 'press', 'equipment': 'dumbbell'})
+        self.assertEqual([e['name'] for e in response.data['results']], ['Dumbbell Bench Press'])
+        self.assertEqual(self.search('zzzz'), [])
+
+    @override_settings(EXERCISE_SEARCH_TRIGRAM_THRESHOLD=0.3)
+    def test_postgres_search_uses_trigram_index(self):
+        """
+        On PostgreSQL names match through the %> operator, which the trigram
+        GIN index serves, with the configured threshold set for the
+        search's transaction.
+        """
+        where = repr(search._search_postgres(Exercise.objects.all(), 'dumbell').query.where)
+        self.assertIn("TrigramWordSimilar(Col(exercises_exercise, exercises.Exercise.name), 'dumbell')", where)
+
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+
+        with mock.patch.object(connection, 'vendor', 'postgresql'), connection.execute_wrapper(record):
+            with search.search_transaction():
+                pass
+        self.assertIn('SET LOCAL pg_trgm.word_similarity_threshold = 0.3', statements)
+
+
+class ExerciseCatalogTestCase(ExerciseTestMixin, APITestCase):
+    """
+    Test suite for the in-memory exercise catalog.
+
+    Tests cover:
+    - Parity with the database-backed filters
+    - Serving warm requests without exercise queries
+    - ETags and conditional requests
+    - Invalidation when the library changes
+    """
+
+    def test_catalog_filters_match_database_filters(self):
+        """
+        Every filter returns the same exercises as ExerciseFilter on the DB.
+        """
+        exercise_catalog = catalog.get_catalog()
+        cases = [
+            {},
+            {'name': 'PRESS'},
+            {'equipment': 'Barbell'},
+            {'primary_muscles': 'chest', 'force': 'push'},
+            {'secondary_muscles': 'triceps', 'equipment': 'dumbbell'},
+            {'level': 'intermediate'},
+            {'category': 'powerlifting'},
+            {'id_in': f'{self.curl.id},{self.squat.id},x'},
+        ]
+        for params in cases:
+            expected = list(ExerciseFilter(params, queryset=Exercise.objects.all()).qs.values_list('id', flat=True))
+            self.assertEqual([e['id'] for e in exercise_catalog.filter(params)], expected, params)
+
+    def test_warm_requests_skip_exercise_queries(self):
+        """
+        Once built, list/retrieve/lookup lists only check the catalog version.
+        """
+        self.client.get('/api/v1/exercises/')
+        for url in [
+            '/api/v1/exercises/',
+            f'/api/v1/exercises/{self.bench.id}/',
+            '/api/v1/exercises/muscle-groups/',
+            '/api/v1/exercises/equipment/',
+            '/api/v1/exercises/categories/',
+        ]:
+            with self.assertNumQueries(1):  # the catalog version check
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+    def test_responses_match_serializer_output(self):
+        """
+        Catalog entries are exactly what ExerciseSerializer produces.
+        """
+        response = self.client.get(f'/api/v1/exercises/{self.bench.id}/')
+        expected = ExerciseSerializer(Exercise.objects.get(pk=self.bench.id)).data
+        self.assertEqual(json.loads(response.content), json.loads(json.dumps(expected)))
+        self.assertEqual(self.client.get('/api/v1/exercises/0/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_etag_and_conditional_get(self):
+        """
+        Responses carry a version ETag; a matching If-None-Match gives 304.
+        """
+        response = self.client.get('/api/v1/exercises/')
+        etag = response['ETag']
+        response = self.client.get('/api/v1/exercises/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Any change to the library produces a new version
+        create_exercise('Cable Fly', equipment='cable', primary=['chest'])
+        response = self.client.get('/api/v1/exercises/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Cable Fly', [e['name'] for e in response.data['results']])
+        self.assertIn({'id': Equipment.objects.get(name='cable').id, 'name': 'cable'},
+                      self.client.get('/api/v1/exercises/equipment/').data)
+
+    def test_unknown_id_is_not_found_despite_etag(self):
+        """
+        A current ETag doesn't turn a missing exercise into a 304.
+        """
+        etag = self.client.get('/api/v1/exercises/')['ETag']
+        for url in ('/api/v1/exercises/999999/', '/api/v1/exercises/999999/alternatives/'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, url)
+
+
+class ExerciseSerializerQueryTestCase(ExerciseTestMixin, APITestCase):
+    """
+    Test suite for the denormalized muscle names and the query counts of
+    exercise list and detail responses.
+    """
+
+    def test_muscle_names_follow_m2m_changes(self):
+        """
+        Editing the M2M fields (e.g. in the admin) updates the name columns.
+        """
+        self.curl.secondary_muscles.set([MuscleGroup.objects.get(name='chest')])
+        self.curl.refresh_from_db()
+        self.assertEqual(self.curl.secondary_muscle_names, ['chest'])
+
+        MuscleGroup.objects.filter(name='chest').update(name='pectorals')
+        MuscleGroup.objects.get(name='pectorals').save()
+        self.bench.refresh_from_db()
+        self.assertEqual(self.bench.primary_muscle_names, ['pectorals'])
+
+        response = self.client.get(f'/api/v1/exercises/{self.bench.id}/')
+        self.assertEqual(response.data['primary_muscles'], ('pectorals',))
+
+    def test_serializer_needs_no_muscle_queries(self):
+        """
+        Serializing any number of exercises is a single query.
+        """
+        with self.assertNumQueries(1):
+            data = ExerciseSerializer(Exercise.objects.select_related('equipment'), many=True).data
+        self.assertEqual(len(data), 4)
+        self.assertEqual(data[0]['secondary_muscles'], ['shoulders', 'triceps'])
+
+    def test_list_query_count(self):
+        """
+        A cold catalog is built with a fixed number of queries; a warm one
+        needs only the version check. Search pages don't grow with page size.
+        """
+        catalog.invalidate()
+        # version, exercises, muscle groups, equipment, categories
+        with self.assertNumQueries(5):
+            self.client.get('/api/v1/exercises/')
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/exercises/', {'page': 1})
+
+        # search documents, count, page
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/exercises/', {'q': 'press'})
+        self.assertEqual(response.data['count'], 2)
+        for i in range(10):
+            create_exercise(f'Machine Press {i}', equipment='machine', primary=['chest'])
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/exercises/', {'q': 'press'})
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_detail_query_count(self):
+        """
+        Detail responses come from the catalog after the first build.
+        """
+        catalog.invalidate()
+        with self.assertNumQueries(5):
+            self.client.get(f'/api/v1/exercises/{self.bench.id}/')
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/v1/exercises/{self.squat.id}/')
+        self.assertEqual(response.data['secondary_muscles'], ('glutes', 'hamstrings'))
+
+
+class ExerciseBatchTestCase(ExerciseTestMixin, APITestCase):
+    """
+    Test suite for the unpaginated batch lookup endpoint.
+    """
+
+    def test_batch_returns_exercises_keyed_by_id(self):
+        """
+        All requested exercises come back keyed by id, unknown ids omitted.
+        """
+        ids = f'{self.bench.id},{self.squat.id},{self.bench.id},999999'
+        response = self.client.get('/api/v1/exercises/batch/', {'ids': ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {str(self.bench.id), str(self.squat.id)})
+        self.assertEqual(response.data[str(self.squat.id)]['name'], 'Barbell Squat')
+
+    def test_batch_is_not_paginated(self):
+        """
+        More ids than a page holds are returned in one response and one query.
+        """
+        ids = [self.bench.id, self.db_bench.id, self.curl.id, self.squat.id]
+        ids += [create_exercise(f'Cable Row {i}', equipment='cable').id for i in range(12)]
+        self.client.get('/api/v1/exercises/batch/', {'ids': ids[0]})
+        with self.assertNumQueries(1):  # the catalog version check
+            response = self.client.get('/api/v1/exercises/batch/', {'ids': ','.join(map(str, ids))})
+        self.assertEqual(len(response.data), 16)
+
+    def test_batch_validation(self):
+        """
+        Non-numeric ids and too many ids are rejected.
+        """
+        response = self.client.get('/api/v1/exercises/batch/', {'ids': '1,abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(EXERCISE_BATCH_MAX_IDS=2):
+            response = self.client.get('/api/v1/exercises/batch/', {'ids': '1,2,3'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/v1/exercises/batch/').data, {})
+
+
+class ExerciseFacetsTestCase(ExerciseTestMixin, APITestCase):
+    """
+    Test suite for the facet counts endpoint.
+    """
+
+    def facets(self, **params):
+        response = self.client.get('/api/v1/exercises/facets/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_unfiltered_counts(self):
+        """
+        Without filters every facet counts the whole library.
+        """
+        data = self.facets()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['equipment'], {'barbell': 2, 'dumbbell': 2})
+        self.assertEqual(data['primary_muscles'], {'biceps': 1, 'chest': 2, 'quadriceps': 1})
+        self.assertEqual(data['mechanic'], {'compound': 3, 'isolation': 1})
+        self.assertEqual(data['category'], {'powerlifting': 1, 'strength': 3})
+
+    def test_facets_ignore_their_own_filter(self):
+        """
+        A facet is counted with the other filters only, so alternatives stay visible.
+        """
+        data = self.facets(equipment='Dumbbell', force='push')
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['equipment'], {'barbell': 2, 'dumbbell': 1})
+        self.assertEqual(data['force'], {'pull': 1, 'push': 1})
+        self.assertEqual(data['primary_muscles'], {'biceps': 0, 'chest': 1, 'quadriceps': 0})
+
+    def test_counts_match_list_results(self):
+        """
+        The total equals the `count` of the list endpoint for the same filters.
+        """
+        for params in [{'name': 'bench'}, {'secondary_muscles': 'triceps'}, {'q': 'press', 'level': 'beginner'}]:
+            listed = self.client.get('/api/v1/exercises/', params).data['count']
+            self.assertEqual(self.facets(**params)['count'], listed, params)
+
+    def test_facets_are_cached_per_filter_combination(self):
+        """
+        Repeated filter combinations only check the catalog version, and a
+        library change is reflected immediately.
+        """
+        self.facets(q='bench')
+        with self.assertNumQueries(1):
+            self.facets(q='BENCH')
+        create_exercise('Incline Bench Press', equipment='barbell', primary=['chest'])
+        self.assertEqual(self.facets(q='bench')['count'], 3)
+
+
+class LoadExercisesTestCase(APITestCase):
+    """
+    Test suite for the load_exercises command.
+
+    Tests cover:
+    - Creating exercises, equipment, muscle groups and their links
+    - Skipping unchanged records on reload
+    - Updating changed records and replacing their muscle links
+    - Incremental parsing of the JSON file
+    """
+
+    records = [
+        {
+            'id': 'Barbell_Curl', 'name': 'Barbell Curl', 'force': 'pull', 'level': 'beginner',
+            'mechanic': 'isolation', 'equipment': 'barbell', 'category': 'strength',
+            'primaryMuscles': ['biceps'], 'secondaryMuscles': ['forearms'],
+            'instructions': ['Curl the bar.'], 'images': [],
+        },
+        {
+            'id': 'Push-Up', 'name': 'Push-Up', 'force': 'push', 'level': 'beginner',
+            'mechanic': 'compound', 'equipment': None, 'category': 'strength',
+            'primaryMuscles': ['chest'], 'secondaryMuscles': ['shoulders', 'triceps'],
+            'instructions': [], 'images': [],
+        },
+    ]
+
+    def load(self, records):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(records, f, indent=2)
+        self.addCleanup(os.remove, f.name)
+        out = io.StringIO()
+        call_command('load_exercises', f.name, stdout=out)
+        return out.getvalue()
+
+    def test_initial_load(self):
+        """
+        Records become exercises with muscle links and denormalized names.
+        """
+        output = self.load(self.records)
+        self.assertIn('2 created, 0 updated, 0 unchanged', output)
+        self.assertIn('Timings:', output)
+        push_up = Exercise.objects.get(source_id='Push-Up')
+        self.assertIsNone(push_up.equipment)
+        self.assertEqual(push_up.secondary_muscle_names, ['shoulders', 'triceps'])
+        self.assertEqual(set(push_up.secondary_muscles.values_list('name', flat=True)), {'shoulders', 'triceps'})
+        self.assertIn('triceps', push_up.search_document)
+        self.assertEqual(Exercise.objects.get(source_id='Barbell_Curl').equipment.name, 'barbell')
+        self.assertEqual(push_up.aliases, [])
+        self.assertTrue(bundle.exists(catalog.current_version()))
+
+    def test_aliases_are_loaded(self):
+        """
+        Optional `aliases` in a record are stored and part of its hash.
+        """
+        self.load(self.records)
+        records = json.loads(json.dumps(self.records))
+        records[1]['aliases'] = ['Press-Up']
+        self.assertIn('0 created, 1 updated, 1 unchanged', self.load(records))
+        self.assertEqual(Exercise.objects.get(source_id='Push-Up').aliases, ['Press-Up'])
+
+    def test_reload_skips_unchanged_records(self):
+        """
+        A no-op reload writes nothing and keeps the catalog version.
+        """
+        self.load(self.records)
+        version = catalog.current_version()
+        with self.assertNumQueries(6):  # savepoint, three lookups, catalog version, release
+            output = self.load(self.records)
+        self.assertIn('0 created, 0 updated, 2 unchanged', output)
+        self.assertEqual(catalog.current_version(), version)
+
+    def test_changed_record_is_updated(self):
+        """
+        Only the changed record is rewritten, links are replaced.
+        """
+        self.load(self.records)
+        records = json.loads(json.dumps(self.records))
+        records[1]['secondaryMuscles'] = ['triceps']
+        records[1]['equipment'] = 'body only'
+        version = catalog.current_version()
+        output = self.load(records)
+        self.assertIn('0 created, 1 updated, 1 unchanged', output)
+        push_up = Exercise.objects.get(source_id='Push-Up')
+        self.assertEqual(list(push_up.secondary_muscles.values_list('name', flat=True)), ['triceps'])
+        self.assertEqual(push_up.secondary_muscle_names, ['triceps'])
+        self.assertEqual(push_up.equipment.name, 'body only')
+        self.assertNotEqual(catalog.current_version(), version)
+
+    def test_incremental_parsing(self):
+        """
+        Items split across read chunks are decoded correctly.
+        """
+        text = json.dumps(self.records * 3, indent=2)
+        self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size=7)), self.records * 3)
+        self.assertEqual(list(iter_json_array(io.StringIO(' [ ] '))), [])
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('{"id": 1}')))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"id": 1}, {"id"')))
+
+
+class ExerciseBundleTestCase(ExerciseTestMixin, APITestCase):
+    """
+    Test suite for the precompressed offline bundle.
+
+    Tests cover:
+    - Content negotiation between brotli, gzip and plain JSON
+    - Conditional GET and cache headers
+    - Versioned URLs
+    """
+
+    def setUp(self):
+        super().setUp()
+        bundle.clear()
+        self.addCleanup(bundle.clear)
+
+    def test_bundle_contains_the_catalog(self):
+        """
+        Every encoding decodes to the same catalog document.
+        """
+        response = self.client.get('/api/v1/exercises/bundle/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        document = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(document['exercises']), 4)
+        self.assertEqual(document['version'], bundle.version_name(catalog.current_version()))
+        self.assertTrue({e['name'] for e in document['muscle_groups']} >= {'chest', 'biceps'})
+
+        plain = self.client.get('/api/v1/exercises/bundle/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(plain.content), document)
+
+        if bundle.brotli is not None:
+            response = self.client.get('/api/v1/exercises/bundle/', HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(json.loads(bundle.brotli.decompress(response.content)), document)
+
+    def test_conditional_get_and_versioned_url(self):
+        """
+        The bundle revalidates with its ETag; the versioned URL is immutable.
+        """
+        response = self.client.get('/api/v1/exercises/bundle/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        again = self.client.get('/api/v1/exercises/bundle/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        versioned = self.client.get(response['Content-Location'])
+        self.assertEqual(versioned.status_code, status.HTTP_200_OK)
+        self.assertIn('immutable', versioned['Cache-Control'])
+
+        # A library change makes both the ETag and the old versioned URL stale
+        create_exercise('Cable Fly', equipment='cable', primary=['chest'])
+        response = self.client.get('/api/v1/exercises/bundle/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(response.content)['exercises']), 5)
+        self.assertEqual(self.client.get(versioned.request['PATH_INFO']).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bundle_is_written_to_disk(self):
+        """
+        Bundles are stored as files named after the version, old ones removed.
+        """
+        self.client.get('/api/v1/exercises/bundle/')
+        version = catalog.current_version()
+        self.assertTrue(bundle.exists(version))
+        create_exercise('Cable Fly', equipment='cable', primary=['chest'])
+        self.client.get('/api/v1/exercises/bundle/')
+        self.assertFalse(bundle.exists(version))
+        self.assertTrue(bundle.exists(catalog.current_version()))
+
+
+class ExerciseAlternativesTestCase(ExerciseTestMixin, APITestCase):
+    """
+    Test suite for substitute exercises by similarity.
+    """
+
+    def alternatives(self, exercise, **params):
+        response = self.client.get(f'/api/v1/exercises/{exercise.id}/alternatives/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [e['name'] for e in response.data]
+
+    def test_most_similar_first(self):
+        """
+        Same primary muscle ranks first; exercises sharing nothing are left out.
+        """
+        self.assertEqual(self.alternatives(self.bench), ['Dumbbell Bench Press', 'Barbell Squat'])
+        self.assertEqual(self.alternatives(self.bench, k=1), ['Dumbbell Bench Press'])
+        self.assertEqual(self.alternatives(self.curl), ['Dumbbell Bench Press'])
+
+    def test_equipment_filter(self):
+        """
+        Only exercises with the available equipment (or none) are returned.
+        """
+        create_exercise('Push-Up', primary=['chest'], secondary=['triceps'], force='push', mechanic='compound')
+        self.assertEqual(self.alternatives(self.bench, equipment='Barbell'), ['Push-Up', 'Barbell Squat'])
+        self.assertEqual(self.alternatives(self.bench, equipment='kettlebells'), ['Push-Up'])
+
+    def test_scores_and_validation(self):
+        """
+        Results carry a similarity score; bad ids and k values are rejected.
+        """
+        response = self.client.get(f'/api/v1/exercises/{self.bench.id}/alternatives/')
+        self.assertGreater(response.data[0]['similarity'], response.data[1]['similarity'])
+        self.assertEqual(self.client.get('/api/v1/exercises/0/alternatives/').status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(f'/api/v1/exercises/{self.bench.id}/alternatives/', {'k': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExerciseAutocompleteTestCase(ExerciseTestMixin, APITestCase):
+    """
+    Test suite for name and alias autocomplete.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def complete(self, query, **params):
+        response = self.client.get('/api/v1/exercises/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [e['name'] for e in response.data]
+
+    def test_prefix_matching(self):
+        """
+        Prefixes of the name or of any word match, ignoring spaces and punctuation.
+        """
+        create_exercise('Push-Up', primary=['chest'])
+        self.assertEqual(self.complete('bench'), ['Barbell Bench Press', 'Dumbbell Bench Press'])
+        self.assertEqual(self.complete('BARB'), ['Barbell Squat', 'Barbell Bench Press'])
+        self.assertEqual(self.complete('benchpr'), ['Barbell Bench Press', 'Dumbbell Bench Press'])
+        self.assertEqual(self.complete('pushup'), ['Push-Up'])
+        self.assertEqual(self.complete('push up'), ['Push-Up'])
+        self.assertEqual(self.complete('ench'), [])
+        self.assertEqual(self.complete('  '), [])
+
+    def test_alias_matching(self):
+        """
+        Aliases match like names; the exercise is returned under its name.
+        """
+        create_exercise('Romanian Deadlift', equipment='barbell', aliases=['RDL', 'Stiff-Leg Deadlift'])
+        create_exercise('Deadlift', equipment='barbell')
+        self.assertEqual(self.complete('rdl'), ['Romanian Deadlift'])
+        self.assertEqual(self.complete('stiffleg'), ['Romanian Deadlift'])
+        # Name prefixes rank before alias matches
+        self.assertEqual(self.complete('dead'), ['Deadlift', 'Romanian Deadlift'])
+        self.assertEqual(self.client.get('/api/v1/exercises/', {'q': 'rdl'}).data['results'][0]['name'], 'Romanian Deadlift')
+
+    def test_minimal_payload_and_limit(self):
+        """
+        Entries only carry id, name and equipment; `limit` caps them.
+        """
+        response = self.client.get('/api/v1/exercises/autocomplete/', {'q': 'b', 'limit': 1})
+        self.assertEqual(response.data, [
+            {'id': self.squat.id, 'name': 'Barbell Squat', 'equipment': 'barbell'},
+        ])
+
+    def test_frequently_used_exercises_first(self):
+        """
+        Exercises the user logged most often are ranked first.
+        """
+        from workouts.models import WorkoutSession, LoggedSet
+
+        session = WorkoutSession.objects.create(owner=self.user, status='completed')
+        for order in range(1, 3):
+            LoggedSet.objects.create(
+                session=session, exercise=self.db_bench, order=order, actual_reps=8, actual_weight=30
+            )
+        self.assertEqual(self.complete('bench'), ['Dumbbell Bench Press', 'Barbell Bench Press'])
+        with self.assertNumQueries(1):  # usage counts are cached
+            self.complete('bench')
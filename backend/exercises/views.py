@@ -1,11 +1,21 @@
-from rest_framework import viewsets, generics
+from rest_framework import viewsets, generics, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from accounts.authentication import TokenUserJWTAuthentication
+from monitoring.timing import SerializerTimingMixin
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
 from .models import Exercise, MuscleGroup, Equipment
 from .serializers import ExerciseSerializer, MuscleGroupSerializer, EquipmentSerializer, CategorySerializer
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
 import django_filters
+from . import autocomplete, bundle, catalog, search
 
 class ExerciseFilter(django_filters.FilterSet):
+    q = django_filters.CharFilter(method='filter_search')
     name = django_filters.CharFilter(lookup_expr='icontains')
     force = django_filters.CharFilter(lookup_expr='iexact')
     level = django_filters.CharFilter(lookup_expr='iexact')
@@ -16,6 +26,10 @@ class ExerciseFilter(django_filters.FilterSet):
     secondary_muscles = django_filters.CharFilter(field_name='secondary_muscles__name', lookup_expr='iexact')
     id_in = django_filters.CharFilter(method='filter_id_in')
 
+    def filter_search(self, queryset, name, value):
+        """Ranked full-text and fuzzy search over name, muscles, equipment and instructions"""
+        return search.search(queryset, value)
+
     def filter_id_in(self, queryset, name, value):
         """Filter exercises by comma-separated list of IDs"""
         if value:
@@ -26,21 +40,182 @@ class ExerciseFilter(django_filters.FilterSet):
     class Meta:
         model = Exercise
         fields = [
-            'name', 'force', 'level', 'mechanic', 'category',
+            'q', 'name', 'force', 'level', 'mechanic', 'category',
             'equipment', 'primary_muscles', 'secondary_muscles', 'id_in'
         ]
 
-class ExerciseViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogMixin:
+    """
+    Serves responses from the worker's in-memory exercise catalog, with an
+    ETag tied to the catalog version (see exercises/catalog.py).
+    """
+    # Catalog reads only need the user id, which the token carries
+    authentication_classes = [TokenUserJWTAuthentication]
+
+    def catalog_response(self, build_data, exercise_catalog=None):
+        exercise_catalog = exercise_catalog or catalog.get_catalog()
+        if exercise_catalog.not_modified(self.request):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = build_data(exercise_catalog)
+        response['ETag'] = exercise_catalog.etag
+        return response
+
+    def catalog_exercise(self, exercise_catalog, pk):
+        """The catalog entry of `pk`; a 404 (never a 304) for unknown ids."""
+        try:
+            return exercise_catalog.by_id[int(pk)]
+        except (KeyError, ValueError):
+            raise Http404
+
+class ExerciseViewSet(SerializerTimingMixin, CatalogMixin, viewsets.ReadOnlyModelViewSet):
     """
     A viewset for viewing exercises. Provides `list` and `retrieve` actions.
+    Both are answered from the in-memory catalog; only ranked search (`q`)
+    goes to the database.
     """
-    queryset = Exercise.objects.all().select_related('equipment').prefetch_related('primary_muscles', 'secondary_muscles')
+    queryset = Exercise.objects.all().select_related('equipment')
     serializer_class = ExerciseSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_class = ExerciseFilter
 
-class MuscleGroupListView(generics.ListAPIView):
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('q'):
+            with search.search_transaction():
+                return super().list(request, *args, **kwargs)
+
+        def build(exercise_catalog):
+            page = self.paginate_queryset(exercise_catalog.filter(request.query_params))
+            return self.get_paginated_response(page)
+        return self.catalog_response(build)
+
+    def retrieve(self, request, *args, **kwargs):
+        exercise_catalog = catalog.get_catalog()
+        exercise = self.catalog_exercise(exercise_catalog, kwargs['pk'])
+        return self.catalog_response(lambda _: Response(exercise), exercise_catalog)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Exercises whose name (or any word of it) starts with `q`, as minimal
+        {id, name, equipment} entries. The user's most used exercises come
+        first. `limit` caps the number of results.
+        """
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected a number.'})
+        limit = min(max(limit, 1), getattr(settings, 'EXERCISE_AUTOCOMPLETE_MAX', 25))
+        query = request.query_params.get('q', '')
+        if not autocomplete.normalize(query):
+            return Response([])
+        exercise_catalog = catalog.get_catalog()
+        return Response(exercise_catalog.prefix_index.complete(
+            query, limit=limit, usage=autocomplete.usage_counts(request.user)
+        ))
+
+    @action(detail=True, methods=['get'])
+    def alternatives(self, request, pk=None):
+        """
+        Substitutes for an exercise, most similar first, by muscles,
+        equipment, mechanic, force and level. `k` sets the number of
+        results; `equipment` (comma-separated names) limits them to what is
+        available.
+        """
+        try:
+            k = int(request.query_params.get('k', 10))
+        except ValueError:
+            raise ValidationError({'k': 'Expected a number.'})
+        limit = getattr(settings, 'EXERCISE_ALTERNATIVES_MAX', 50)
+        if not 1 <= k <= limit:
+            raise ValidationError({'k': f'Must be between 1 and {limit}.'})
+        equipment = request.query_params.get('equipment')
+        if equipment is not None:
+            equipment = [name.strip() for name in equipment.split(',') if name.strip()]
+
+        exercise_catalog = catalog.get_catalog()
+        exercise_id = self.catalog_exercise(exercise_catalog, pk)['id']
+
+        def build(exercise_catalog):
+            results = exercise_catalog.similarity.alternatives(exercise_id, k=k, equipment=equipment)
+            return Response([
+                {**exercise, 'similarity': round(score, 3)} for exercise, score in results
+            ])
+        return self.catalog_response(build, exercise_catalog)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Counts per category, equipment, level, force, mechanic and primary
+        muscle for the current filter parameters (the same as `list`).
+        """
+        def matching_ids(query):
+            with search.search_transaction():
+                return list(search.search(Exercise.objects.all(), query).values_list('id', flat=True))
+
+        return self.catalog_response(
+            lambda exercise_catalog: Response(exercise_catalog.facets(request.query_params, search=matching_ids))
+        )
+
+    def bundle_response(self, request, exercise_catalog, cache_control):
+        version = exercise_catalog.version
+        encoding = bundle.negotiate(request)
+        if bundle.not_modified(request, version):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(bundle.get_bundle(exercise_catalog)[encoding], content_type='application/json')
+            if encoding != bundle.IDENTITY:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = bundle.etag(version, encoding)
+        response['Cache-Control'] = cache_control
+        response['Content-Location'] = f'/api/v1/exercises/bundle/{bundle.version_name(version)}/'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    @action(detail=False, methods=['get'], url_path='bundle')
+    def offline_bundle(self, request):
+        """
+        The whole library (exercises, muscle groups, equipment, categories)
+        in one precompressed JSON document, for offline clients. Revalidated
+        on every use: send the ETag back in If-None-Match to get a 304 until
+        the library changes.
+        """
+        return self.bundle_response(request, catalog.get_catalog(), 'no-cache')
+
+    @action(detail=False, methods=['get'], url_path=r'bundle/(?P<version>[\w-]+)')
+    def bundle_version(self, request, version):
+        """
+        A specific version of the bundle (see `Content-Location` of
+        `bundle`). Never changes, so it may be cached for a year.
+        """
+        exercise_catalog = catalog.get_catalog()
+        if version != bundle.version_name(exercise_catalog.version):
+            raise Http404
+        return self.bundle_response(request, exercise_catalog, 'public, max-age=31536000, immutable')
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """
+        Look up several exercises at once: `?ids=1,2,3`. Not paginated; the
+        response maps each found id to its exercise, unknown ids are left out.
+        Served from the catalog, so only the version check hits the database.
+        """
+        raw = request.query_params.get('ids', '')
+        ids = [part.strip() for part in raw.split(',') if part.strip()]
+        if not all(part.isdigit() for part in ids):
+            raise ValidationError({'ids': 'Expected a comma-separated list of exercise IDs.'})
+        ids = list(dict.fromkeys(int(part) for part in ids))
+        limit = getattr(settings, 'EXERCISE_BATCH_MAX_IDS', 200)
+        if len(ids) > limit:
+            raise ValidationError({'ids': f'At most {limit} IDs can be requested at once.'})
+
+        def build(exercise_catalog):
+            by_id = exercise_catalog.by_id
+            return Response({str(pk): by_id[pk] for pk in ids if pk in by_id})
+        return self.catalog_response(build)
+
+class MuscleGroupListView(SerializerTimingMixin, CatalogMixin, generics.ListAPIView):
     """
     An API view for listing all muscle groups. Useful for frontend filters.
     """
@@ -49,7 +224,10 @@ class MuscleGroupListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     pagination_class = None  # Disable pagination for this endpoint
 
-class EquipmentListView(generics.ListAPIView):
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(lambda exercise_catalog: Response(exercise_catalog.muscle_groups))
+
+class EquipmentListView(SerializerTimingMixin, CatalogMixin, generics.ListAPIView):
     """
     An API view for listing all available equipment. Useful for frontend filters.
     """
@@ -58,7 +236,10 @@ class EquipmentListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     pagination_class = None  # Disable pagination for this endpoint
 
-class CategoryListView(generics.ListAPIView):
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(lambda exercise_catalog: Response(exercise_catalog.equipment))
+
+class CategoryListView(SerializerTimingMixin, CatalogMixin, generics.ListAPIView):
     """
     An API view for listing all exercise categories. Useful for frontend filters.
     """
@@ -66,3 +247,6 @@ class CategoryListView(generics.ListAPIView):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None  # Disable pagination for this endpoint
+
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(lambda exercise_catalog: Response(exercise_catalog.categories))
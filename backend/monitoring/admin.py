@@ -0,0 +1,51 @@
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import ProfileCapture
+from . import profiling
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    """Profiled requests, with their cProfile stats and SQL trace for download."""
+    list_display = ['created_at', 'user', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'downloads']
+    list_filter = ['method', 'status_code']
+    search_fields = ['id', 'path', 'user__username']
+    ordering = ['-created_at']
+    list_select_related = ['user']
+    readonly_fields = [field.name for field in ProfileCapture._meta.fields] + ['downloads']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Files')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">profile</a> | <a href="{}">SQL</a>',
+            reverse('admin:monitoring_profilecapture_download', args=[obj.pk, 'profile']),
+            reverse('admin:monitoring_profilecapture_download', args=[obj.pk, 'sql']),
+        )
+
+    def get_urls(self):
+        return [
+            path(
+                '<str:object_id>/download/<str:kind>/',
+                self.admin_site.admin_view(self.download),
+                name='monitoring_profilecapture_download',
+            ),
+        ] + super().get_urls()
+
+    def download(self, request, object_id, kind):
+        capture = self.get_object(request, object_id)
+        if capture is None or not self.has_view_permission(request, capture) or kind not in ('profile', 'sql'):
+            raise Http404
+        stats_path, sql_path = profiling.capture_paths(capture.pk)
+        file_path = stats_path if kind == 'profile' else sql_path
+        if not file_path.exists():
+            raise Http404
+        return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=file_path.name)
@@ -0,0 +1,96 @@
+"""
+In-process histograms in the Prometheus text exposition format.
+
+Each worker process keeps its own; Prometheus adds them up when every
+worker is scraped (or run a single worker per scrape target). Values are
+kept per (view, method), which is a bounded set: views are named by their
+URL pattern name, and requests that match no pattern share one label.
+"""
+import bisect
+import threading
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def count(self, labels):
+        """Observations for `labels` (used by tests)."""
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self, label_names):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for labels, values in series:
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {values[-1]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+LABELS = ('view', 'method')
+
+request_duration = Histogram(
+    'gym_request_duration_seconds', 'Total time spent handling requests.', SECONDS_BUCKETS,
+)
+db_duration = Histogram(
+    'gym_request_db_duration_seconds', 'Time spent executing database queries per request.', SECONDS_BUCKETS,
+)
+db_queries = Histogram(
+    'gym_request_db_queries', 'Database queries per request.', QUERY_BUCKETS,
+)
+serializer_duration = Histogram(
+    'gym_request_serializer_duration_seconds', 'Time spent in DRF serializers per request.', SECONDS_BUCKETS,
+)
+
+HISTOGRAMS = (request_duration, db_duration, db_queries, serializer_duration)
+
+
+def observe(labels, timings, total):
+    request_duration.observe(labels, total)
+    db_duration.observe(labels, timings.db_time)
+    db_queries.observe(labels, timings.db_queries)
+    serializer_duration.observe(labels, timings.serializer_time)
+
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render(LABELS))
+    return '\n'.join(lines) + '\n'
+
+
+def clear():
+    """Reset all histograms (used by tests)."""
+    for histogram in HISTOGRAMS:
+        histogram.clear()
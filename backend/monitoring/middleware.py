@@ -0,0 +1,68 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import histograms, profiling, timing
+
+
+class RequestMetricsMiddleware:
+    """
+    Time every request (database, serializers, total), record the timings
+    in this worker's per-view histograms served by /metrics and, when
+    SERVER_TIMING_HEADER is on (off by default), send them back in a
+    Server-Timing header.
+
+    Meant to be first in MIDDLEWARE, so the total covers all other
+    middleware as well.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = timing.start()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        total = timings.total()
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unmatched'
+        histograms.observe((view, request.method), timings, total)
+
+        if getattr(settings, 'SERVER_TIMING_HEADER', False):
+            response['Server-Timing'] = (
+                f'db;dur={timings.db_time * 1000:.1f};desc="{timings.db_queries} queries", '
+                f'serializer;dur={timings.serializer_time * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+            # Lets the frontend (another origin) read the timings in devtools
+            if getattr(settings, 'FRONTEND_URL', ''):
+                response['Timing-Allow-Origin'] = settings.FRONTEND_URL
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Profile requests of staff users that ask for it (see
+    monitoring/profiling.py). Goes after AuthenticationMiddleware, so
+    admin sessions are recognised as well as JWTs.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if profiling.requested(request):
+            user = profiling.staff_user(request)
+            if user is not None:
+                return profiling.profile(request, self.get_response, user)
+        return self.get_response(request)
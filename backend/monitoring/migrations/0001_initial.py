@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.CharField(help_text='Request id, also sent back in X-Profile-Id', max_length=64, primary_key=True, serialize=False)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=2000)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField()),
+                ('query_time_ms', models.FloatField()),
+                ('summary', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_captures', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
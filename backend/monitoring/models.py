@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import models
+
+
+class ProfileCapture(models.Model):
+    """
+    One profiled request (see monitoring/profiling.py). The cProfile stats
+    and the SQL trace are files in PROFILER_CAPTURE_DIR named after the id.
+    """
+    id = models.CharField(primary_key=True, max_length=64, help_text='Request id, also sent back in X-Profile-Id')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='profile_captures'
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_time_ms = models.FloatField()
+    # The slowest functions by cumulative time, as printed by pstats
+    summary = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,167 @@
+"""
+Opt-in profiling of single requests.
+
+A staff user adds `X-Profile: 1` (or `?_profile=1`) to a request that is
+slow for them; ProfilerMiddleware then runs it under cProfile and records
+every SQL query with its duration. The stats (`<id>.prof`, readable with
+pstats or snakeviz) and the SQL trace (`<id>.sql.json`) are written to
+PROFILER_CAPTURE_DIR, a ProfileCapture row lists them in the admin, and
+the response carries the id in `X-Profile-Id`.
+
+The id is the request's X-Request-ID when it has a usable one, so a
+capture can be matched with proxy logs. Only one request per process is
+profiled at a time; others asking meanwhile are served unprofiled.
+
+Requests without the flag only pay for a header and query string lookup;
+with PROFILER_ENABLED off the middleware removes itself at startup.
+"""
+import cProfile
+import io
+import json
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from .models import ProfileCapture
+
+FLAG_HEADER = 'HTTP_X_PROFILE'
+FLAG_PARAM = '_profile'
+MAX_QUERIES = 5000
+
+_request_id_re = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+_lock = threading.Lock()
+
+
+def capture_dir():
+    return Path(getattr(settings, 'PROFILER_CAPTURE_DIR', settings.BASE_DIR / 'profiler_captures'))
+
+
+def capture_paths(capture_id):
+    """(stats file, SQL trace file) of a capture."""
+    directory = capture_dir()
+    return directory / f'{capture_id}.prof', directory / f'{capture_id}.sql.json'
+
+
+def requested(request):
+    """Whether the request asks to be profiled (not whether it may be)."""
+    if request.META.get(FLAG_HEADER):
+        return True
+    # Checked on the raw string first, so other requests never parse it
+    return FLAG_PARAM in request.META.get('QUERY_STRING', '') and request.GET.get(FLAG_PARAM) not in (None, '', '0')
+
+
+def staff_user(request):
+    """The staff user making the request (admin session or JWT), or None."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_staff else None
+    from accounts.authentication import CachedJWTAuthentication
+    try:
+        result = CachedJWTAuthentication().authenticate(Request(request))
+    except APIException:
+        return None
+    if result is not None and result[0].is_staff:
+        return result[0]
+    return None
+
+
+def request_id(request):
+    value = request.headers.get('X-Request-ID', '')
+    if _request_id_re.match(value) and not ProfileCapture.objects.filter(pk=value).exists():
+        return value
+    return uuid.uuid4().hex
+
+
+class _SQLTrace:
+    """execute_wrapper hook keeping every query with its duration."""
+
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.time += duration
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'at_ms': round((start - self.started) * 1000, 3),
+                    'duration_ms': round(duration * 1000, 3),
+                    'sql': sql,
+                    'params': repr(params)[:1000],
+                    'many': many,
+                })
+
+
+def profile(request, get_response, user):
+    """
+    Handle the request under the profiler and store the capture. Returns
+    the response (unprofiled when another capture is running).
+    """
+    if not _lock.acquire(blocking=False):
+        return get_response(request)
+    try:
+        capture_id = request_id(request)
+        started = time.perf_counter()
+        trace = _SQLTrace(started)
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(trace))
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started
+    finally:
+        _lock.release()
+
+    stats_path, sql_path = capture_paths(capture_id)
+    stats_path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(stats_path)
+    sql_path.write_text(json.dumps({
+        'request_id': capture_id,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'query_count': trace.count,
+        'truncated': trace.count > len(trace.queries),
+        'queries': trace.queries,
+    }, indent=1))
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(40)
+    ProfileCapture.objects.create(
+        id=capture_id,
+        user=user,
+        method=request.method,
+        path=request.get_full_path()[:2000],
+        status_code=response.status_code,
+        duration_ms=duration * 1000,
+        query_count=trace.count,
+        query_time_ms=trace.time * 1000,
+        summary=summary.getvalue(),
+    )
+    response['X-Profile-Id'] = capture_id
+    return response
+
+
+def delete_files(capture_id):
+    for path in capture_paths(capture_id):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import ProfileCapture
+from . import profiling
+
+
+@receiver(post_delete, sender=ProfileCapture)
+def delete_capture_files(sender, instance, **kwargs):
+    profiling.delete_files(instance.pk)
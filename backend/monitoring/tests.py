@@ -0,0 +1,218 @@
+import json
+import pstats
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .middleware import ProfilerMiddleware
+from .models import ProfileCapture
+from . import histograms, profiling, timing
+
+User = get_user_model()
+
+
+class RequestMetricsTestCase(APITestCase):
+    """
+    Test suite for per-request instrumentation.
+
+    Tests cover:
+    - Server-Timing header with database, serializer and total time, when enabled
+    - Query counts match the queries actually executed
+    - Per-view histograms in the Prometheus text format
+    - /metrics requires the configured token
+    """
+
+    def setUp(self):
+        histograms.clear()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='SecurePass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def server_timing(self, response):
+        return dict(
+            (match[0], (float(match[1]), match[2]))
+            for match in re.findall(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response['Server-Timing'])
+        )
+
+    def test_server_timing_header(self):
+        """
+        With the header enabled, every response carries its timings; the
+        query count is exact. It's off by default.
+        """
+        response = self.client.get('/api/v1/workouts/sessions/')
+        self.assertNotIn('Server-Timing', response)
+
+        with self.settings(SERVER_TIMING_HEADER=True), CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/workouts/sessions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        metrics = self.server_timing(response)
+        self.assertEqual(set(metrics), {'db', 'serializer', 'total'})
+        self.assertEqual(metrics['db'][1], f'{len(queries)} queries')
+        self.assertLessEqual(metrics['db'][0], metrics['total'][0])
+
+    def test_serializer_time(self):
+        """
+        Timed serializers add their output and validation time only while
+        a request is being timed.
+        """
+        from accounts.serializers import UserSerializer
+
+        serializer_class = timing.timed_serializer_class(UserSerializer)
+        self.assertIs(timing.timed_serializer_class(UserSerializer), serializer_class)
+        self.assertTrue(issubclass(serializer_class, UserSerializer))
+        self.assertIsNone(timing.current())
+        self.assertEqual(serializer_class(self.user).data, UserSerializer(self.user).data)
+
+        timings, token = timing.start()
+        try:
+            self.assertIs(timing.current(), timings)
+            UserSerializer(self.user).data
+            self.assertEqual(timings.serializer_time, 0)
+            serializer_class([self.user, self.user], many=True).data
+            serializer_class(data={}).is_valid()
+        finally:
+            timing.stop(token)
+        self.assertIsNone(timing.current())
+        self.assertGreater(timings.serializer_time, 0)
+        self.assertFalse(timings._serializing)
+
+    @override_settings(MONITORING_METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        """
+        Requests are aggregated per view and method and rendered for
+        Prometheus; the endpoint requires the token.
+        """
+        self.client.get('/api/v1/workouts/sessions/')
+        self.client.get('/api/v1/workouts/sessions/')
+        self.client.get('/no-such-page/')
+        labels = ('workoutsession-list', 'GET')
+        self.assertEqual(histograms.request_duration.count(labels), 2)
+        self.assertEqual(histograms.request_duration.count(('unmatched', 'GET')), 1)
+
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE gym_request_duration_seconds histogram', text)
+        self.assertIn('gym_request_duration_seconds_count{view="workoutsession-list",method="GET"} 2', text)
+        self.assertIn('gym_request_db_queries_bucket{view="workoutsession-list",method="GET",le="+Inf"} 2', text)
+        self.assertIn('gym_request_serializer_duration_seconds_sum{view="workoutsession-list",method="GET"}', text)
+
+    @override_settings(MONITORING_METRICS_TOKEN='', DEBUG=False)
+    def test_metrics_hidden_without_token(self):
+        """
+        Without a token the endpoint doesn't exist outside DEBUG.
+        """
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProfilerTestCase(APITestCase):
+    """
+    Test suite for opt-in request profiling.
+
+    Tests cover:
+    - Staff requests with the header or query flag are captured
+    - Captures hold the cProfile stats and the full SQL trace
+    - Other users' flags and unflagged requests are ignored
+    - Admin downloads; deleting a capture deletes its files
+    - The middleware removes itself when disabled
+    """
+
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='SecurePass123', is_staff=True, is_superuser=True
+        )
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='SecurePass123'
+        )
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def test_capture(self):
+        """
+        A flagged staff request is profiled and its capture stored.
+        """
+        self.authenticate(self.staff)
+        response = self.client.get('/api/v1/workouts/sessions/', HTTP_X_PROFILE='1', HTTP_X_REQUEST_ID='req-12345678')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Profile-Id'], 'req-12345678')
+
+        capture = ProfileCapture.objects.get()
+        self.assertEqual(capture.pk, 'req-12345678')
+        self.assertEqual((capture.user, capture.method, capture.status_code), (self.staff, 'GET', 200))
+        self.assertIn('cumulative', capture.summary)
+
+        stats_path, sql_path = profiling.capture_paths(capture.pk)
+        self.assertGreater(pstats.Stats(str(stats_path)).total_calls, 0)
+        trace = json.loads(sql_path.read_text())
+        self.assertEqual(trace['query_count'], capture.query_count)
+        self.assertEqual(len(trace['queries']), capture.query_count)
+        self.assertTrue(any('workouts_workoutsession' in query['sql'] for query in trace['queries']))
+
+        # Query flag; a new id as the request has none
+        response = self.client.get('/api/v1/workouts/sessions/?_profile=1')
+        self.assertNotEqual(response['X-Profile-Id'], 'req-12345678')
+        self.assertEqual(ProfileCapture.objects.count(), 2)
+
+    def test_ignored(self):
+        """
+        Non-staff and anonymous flags and unflagged requests are served
+        without profiling.
+        """
+        self.authenticate(self.user)
+        response = self.client.get('/api/v1/workouts/sessions/?_profile=1', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', response)
+
+        self.client.credentials()
+        self.client.get('/api/v1/exercises/', HTTP_X_PROFILE='1')
+
+        self.authenticate(self.staff)
+        response = self.client.get('/api/v1/workouts/sessions/?_profile=0')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(ProfileCapture.objects.exists())
+
+        with self.settings(PROFILER_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilerMiddleware(lambda request: None)
+
+    def test_admin(self):
+        """
+        Staff list and download captures; deleting one removes its files.
+        """
+        self.authenticate(self.staff)
+        capture_id = self.client.get('/api/v1/workouts/sessions/', HTTP_X_PROFILE='1')['X-Profile-Id']
+
+        self.client.force_login(self.staff)
+        response = self.client.get('/admin/monitoring/profilecapture/')
+        self.assertContains(response, '/api/v1/workouts/sessions/')
+
+        response = self.client.get(f'/admin/monitoring/profilecapture/{capture_id}/download/sql/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['request_id'], capture_id)
+        response = self.client.get(f'/admin/monitoring/profilecapture/{capture_id}/download/profile/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response.close()
+        response = self.client.get(f'/admin/monitoring/profilecapture/{capture_id}/download/other/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_login(self.user)
+        response = self.client.get(f'/admin/monitoring/profilecapture/{capture_id}/download/sql/')
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+        ProfileCapture.objects.get(pk=capture_id).delete()
+        self.assertFalse(any(path.exists() for path in profiling.capture_paths(capture_id)))
@@ -0,0 +1,111 @@
+"""
+Per-request timings.
+
+RequestMetricsMiddleware starts a RequestTimings for every request and
+keeps it in a context variable while the request is handled:
+
+- Database: an execute_wrapper on each connection counts queries and adds
+  up the time spent executing them.
+- Serializers: views with SerializerTimingMixin get their serializers as
+  subclasses that add the time spent in to_representation and
+  run_validation. Queries made while serializing (e.g. an N+1 in a
+  SerializerMethodField) count towards both the serializer and the
+  database time. Serializers of third-party views (dj-rest-auth) and ones
+  built outside get_serializer aren't timed.
+
+Outside a request the timed methods do nothing extra but a context
+variable lookup.
+"""
+import time
+from contextvars import ContextVar
+
+from rest_framework.fields import empty
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('started', 'db_queries', 'db_time', 'serializer_time', '_serializing')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializing = False
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper hook: time one query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def start():
+    """Start timing the current request. Returns (timings, reset token)."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    """The RequestTimings of the request being handled, if any."""
+    return _current.get()
+
+
+def _timed(method, *args):
+    timings = _current.get()
+    # Only the outermost call is timed; nested serializers are part of it
+    if timings is None or timings._serializing:
+        return method(*args)
+    timings._serializing = True
+    start = time.perf_counter()
+    try:
+        return method(*args)
+    finally:
+        timings.serializer_time += time.perf_counter() - start
+        timings._serializing = False
+
+
+class TimedSerializer:
+    """
+    Serializer mixin timing output and validation. With many=True the
+    list's items are timed one by one.
+    """
+
+    def to_representation(self, instance):
+        return _timed(super().to_representation, instance)
+
+    def run_validation(self, data=empty):
+        return _timed(super().run_validation, data)
+
+
+_timed_classes = {}
+
+
+def timed_serializer_class(serializer_class):
+    """`serializer_class` with TimedSerializer mixed in (created once per class)."""
+    timed = _timed_classes.get(serializer_class)
+    if timed is None:
+        timed = _timed_classes[serializer_class] = type(serializer_class)(
+            serializer_class.__name__, (TimedSerializer, serializer_class), {'__module__': serializer_class.__module__},
+        )
+    return timed
+
+
+class SerializerTimingMixin:
+    """GenericAPIView mixin: the view's serializers count as serializer time."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = timed_serializer_class(self.get_serializer_class())
+        kwargs.setdefault('context', self.get_serializer_context())
+        return serializer_class(*args, **kwargs)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from . import histograms
+
+
+def metrics(request):
+    """
+    Request histograms of this worker in the Prometheus text format. Each
+    worker process answers with its own counts, so every worker has to be
+    scraped (see monitoring/histograms.py).
+
+    Requires `Authorization: Bearer <MONITORING_METRICS_TOKEN>`. Without a
+    token configured the endpoint is only served with DEBUG on.
+    """
+    token = getattr(settings, 'MONITORING_METRICS_TOKEN', '')
+    if token:
+        header = request.headers.get('Authorization', '')
+        if not constant_time_compare(header, f'Bearer {token}'):
+            return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(histograms.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,88 @@
+"""
+Downsampling of time series for charts.
+
+Both methods take a list of (x, y, ...) tuples sorted by x and return a
+subset of them, so every value drawn really was measured. Extra items
+(e.g. the index of the source row) are carried along untouched.
+
+- lttb: Largest-Triangle-Three-Buckets (Steinarsson, 2013). Keeps the first
+  and last point and, for each bucket in between, the point forming the
+  largest triangle with its neighbours. Preserves the visual shape.
+- minmax: splits the x range into equal-width buckets and keeps the lowest
+  and highest point of each. Preserves every extreme, at up to two points
+  per bucket.
+"""
+LTTB = 'lttb'
+MINMAX = 'minmax'
+METHODS = (LTTB, MINMAX)
+
+
+def lttb(points, threshold):
+    """
+    Reduce `points` to `threshold` points with Largest-Triangle-Three-Buckets.
+    Thresholds below 3 leave the points unchanged.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    # Every bucket but the first and last holds `every` points on average
+    every = (count - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        # Average of the next bucket, the third corner of the triangle
+        next_start = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        next_points = points[next_start:next_end]
+        avg_x = sum(point[0] for point in next_points) / len(next_points)
+        avg_y = sum(point[1] for point in next_points) / len(next_points)
+
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        ax, ay = points[previous][:2]
+        best_area = -1
+        for i in range(start, end):
+            x, y = points[i][:2]
+            # Twice the triangle's area; the factor doesn't change the maximum
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                previous = i
+        sampled.append(points[previous])
+    sampled.append(points[-1])
+    return sampled
+
+
+def minmax(points, threshold):
+    """Reduce `points` to at most `threshold` points, keeping each bucket's extremes."""
+    count = len(points)
+    if threshold >= count or threshold < 2:
+        return list(points)
+
+    buckets = threshold // 2
+    first, last = points[0][0], points[-1][0]
+    width = (last - first) / buckets or 1
+    sampled = []
+    low = high = None
+    current = 0
+    for point in points:
+        bucket = min(int((point[0] - first) / width), buckets - 1)
+        if bucket != current and low is not None:
+            sampled.extend(sorted({low, high}))
+            low = high = None
+        current = bucket
+        if low is None or point[1] < low[1]:
+            low = point
+        if high is None or point[1] > high[1]:
+            high = point
+    if low is not None:
+        sampled.extend(sorted({low, high}))
+    return sampled
+
+
+def downsample(points, threshold, method=LTTB):
+    """Downsample with the named method."""
+    if method == MINMAX:
+        return minmax(points, threshold)
+    return lttb(points, threshold)
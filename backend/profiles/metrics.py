@@ -0,0 +1,96 @@
+"""
+Body-metrics history.
+
+BodyMetric rows are the log; Profile.weight and body_fat_percentage mirror
+the latest logged value of each. Charts read the log through `series`,
+which downsamples any range to a bounded number of points, and leaderboards
+read it through `weight_at` (one set) or `BodyweightHistory` (many) to score
+a set with the bodyweight the lifter had when it was lifted.
+"""
+from bisect import bisect_right
+
+from .downsampling import LTTB, downsample
+from .models import BodyMetric, Profile
+
+FIELDS = ('weight', 'body_fat_percentage')
+
+
+def latest_values(user_id):
+    """{field: latest logged value or None} for a user."""
+    values = {}
+    for field in FIELDS:
+        values[field] = BodyMetric.objects.filter(
+            user_id=user_id, **{f'{field}__isnull': False}
+        ).order_by('-measured_at', '-id').values_list(field, flat=True).first()
+    return values
+
+
+def sync_profile(user_id):
+    """
+    Copy the latest logged values to the user's profile. A queryset update,
+    so Profile signals don't fire; callers refresh what depends on them.
+    Returns the values written.
+    """
+    values = latest_values(user_id)
+    Profile.objects.filter(user_id=user_id).update(**values)
+    return values
+
+
+def series(user_id, field, start=None, end=None, points=None, method=None):
+    """
+    The user's `field` history between `start` and `end` (inclusive) as
+    (count, [(measured_at, value)]), oldest first, downsampled to `points`
+    when given. `count` is the number of logged values in the range.
+    """
+    queryset = BodyMetric.objects.filter(user_id=user_id, **{f'{field}__isnull': False})
+    if start is not None:
+        queryset = queryset.filter(measured_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(measured_at__lte=end)
+    rows = list(queryset.order_by('measured_at', 'id').values_list('measured_at', field))
+    if not points or len(rows) <= points:
+        return len(rows), rows
+
+    # Downsample on (timestamp, float) and map the kept points back
+    numeric = [(measured_at.timestamp(), float(value), i) for i, (measured_at, value) in enumerate(rows)]
+    kept = downsample(numeric, points, method or LTTB)
+    return len(rows), [rows[i] for _, _, i in kept]
+
+
+def weight_at(user_id, when, default=None):
+    """
+    The user's last logged weight up to `when`, for scoring a single set
+    without loading the whole history. `default` when there is none.
+    """
+    if when is None:
+        return default
+    weight = BodyMetric.objects.filter(
+        user_id=user_id, weight__isnull=False, measured_at__lte=when
+    ).order_by('-measured_at', '-id').values_list('weight', flat=True).first()
+    return default if weight is None else weight
+
+
+class BodyweightHistory:
+    """Logged weights of a set of users, for lookups at points in time."""
+
+    def __init__(self, user_ids):
+        self._times = {}
+        self._weights = {}
+        rows = BodyMetric.objects.filter(
+            user_id__in=list(user_ids), weight__isnull=False
+        ).order_by('user_id', 'measured_at', 'id').values_list('user_id', 'measured_at', 'weight')
+        for user_id, measured_at, weight in rows.iterator():
+            self._times.setdefault(user_id, []).append(measured_at)
+            self._weights.setdefault(user_id, []).append(weight)
+
+    def at(self, user_id, when, default=None):
+        """
+        The user's weight at `when`: the last weigh-in up to then, else the
+        first one after. `default` when nothing was logged (or `when` is
+        unknown).
+        """
+        times = self._times.get(user_id)
+        if not times or when is None:
+            return default
+        position = bisect_right(times, when)
+        return self._weights[user_id][max(position - 1, 0)]
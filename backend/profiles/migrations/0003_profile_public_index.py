@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_profile_about_me'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['user'], name='profile_public_user_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_profile_public_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BodyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('measured_at', models.DateTimeField()),
+                ('weight', models.DecimalField(blank=True, decimal_places=2, help_text='Weight in kg', max_digits=5, null=True)),
+                ('body_fat_percentage', models.DecimalField(blank=True, decimal_places=2, help_text='Percent of body fat', max_digits=4, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='body_metrics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-measured_at', '-id'],
+                'indexes': [models.Index(fields=['user', 'measured_at'], name='body_metric_user_time_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('weight__isnull', False), ('body_fat_percentage__isnull', False), _connector='OR'), name='body_metric_has_value')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def backfill_body_metrics(apps, schema_editor):
+    """Start every user's log with the values stored on their profile."""
+    BodyMetric = apps.get_model('profiles', 'BodyMetric')
+    Profile = apps.get_model('profiles', 'Profile')
+
+    profiles = Profile.objects.filter(
+        Q(weight__isnull=False) | Q(body_fat_percentage__isnull=False)
+    ).values_list('user_id', 'updated_at', 'weight', 'body_fat_percentage')
+    BodyMetric.objects.bulk_create([
+        BodyMetric(user_id=user_id, measured_at=updated_at, weight=weight, body_fat_percentage=body_fat)
+        for user_id, updated_at, weight, body_fat in profiles.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_body_metric'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_body_metrics, migrations.RunPython.noop),
+    ]
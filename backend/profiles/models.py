@@ -25,6 +25,43 @@ class Profile(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     about_me = models.CharField(max_length=1000, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Public profiles are a small share of all profiles; the directory
+            # and public lookups only ever read those
+            models.Index(fields=['user'], condition=models.Q(is_public=True), name='profile_public_user_idx'),
+        ]
+
     def __str__(self):
         return f"Profile of {self.user.username}"
-    
\ No newline at end of file
+
+
+class BodyMetric(models.Model):
+    """
+    One weigh-in. Profile.weight and body_fat_percentage mirror the latest
+    logged values (see profiles/metrics.py).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='body_metrics'
+    )
+    measured_at = models.DateTimeField()
+    weight = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, help_text='Weight in kg')
+    body_fat_percentage = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, help_text='Percent of body fat')
+
+    class Meta:
+        ordering = ['-measured_at', '-id']
+        indexes = [
+            # Every read is one user's history over a time range
+            models.Index(fields=['user', 'measured_at'], name='body_metric_user_time_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(weight__isnull=False) | models.Q(body_fat_percentage__isnull=False),
+                name='body_metric_has_value',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} at {self.measured_at:%Y-%m-%d}"
@@ -1,5 +1,7 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Profile
+from .models import BodyMetric, Profile
+from .metrics import FIELDS as METRIC_FIELDS
 
 class PublicProfileSerializer(serializers.ModelSerializer):
     """Serializer for public profile view. Exposes non-sensitive data."""
@@ -31,14 +33,34 @@ class ProfileSerializer(serializers.ModelSerializer):
             'weight', 'height', 'body_fat_percentage', 'updated_at', 'date_joined', 'about_me'
         ]
 
+    def validate(self, attrs):
+        # The log can't record a cleared value, so clearing it here would
+        # only last until the next weigh-in syncs the profile again
+        for field in METRIC_FIELDS:
+            if field in attrs and attrs[field] is None and getattr(self.instance, field, None) is not None:
+                raise serializers.ValidationError({
+                    field: "This can't be cleared; delete the entries from your body-metrics log instead."
+                })
+        return attrs
+
     def update(self, instance, validated_data):
         # Handle nested User data
         user_data = validated_data.pop('user', {})
         first_name = user_data.get('first_name')
         last_name = user_data.get('last_name')
 
+        # New weight / body fat values go to the body-metrics log, which
+        # copies them back to the profile
+        logged = {
+            field: validated_data.pop(field) for field in METRIC_FIELDS
+            if validated_data.get(field) is not None and validated_data[field] != getattr(instance, field)
+        }
+
         # Update Profile instance
         instance = super().update(instance, validated_data)
+        if logged:
+            BodyMetric.objects.create(user=instance.user, measured_at=timezone.now(), **logged)
+            instance.refresh_from_db(fields=list(METRIC_FIELDS))
 
         # Update User instance
         user = instance.user
@@ -48,4 +70,21 @@ class ProfileSerializer(serializers.ModelSerializer):
             user.last_name = last_name
         user.save()
 
-        return instance
\ No newline at end of file
+        return instance
+
+class BodyMetricSerializer(serializers.ModelSerializer):
+    """Serializer for one weigh-in. `measured_at` defaults to now."""
+    measured_at = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = BodyMetric
+        fields = ['id', 'measured_at', 'weight', 'body_fat_percentage']
+
+    def validate(self, attrs):
+        merged = {field: getattr(self.instance, field, None) for field in METRIC_FIELDS}
+        merged.update({field: attrs[field] for field in METRIC_FIELDS if field in attrs})
+        if all(value is None for value in merged.values()):
+            raise serializers.ValidationError("Log a weight, a body fat percentage, or both.")
+        if self.instance is None:
+            attrs.setdefault('measured_at', timezone.now())
+        return attrs
@@ -1,10 +1,16 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Profile
+from .models import BodyMetric, Profile
+from . import metrics
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
-        
\ No newline at end of file
+
+@receiver(post_save, sender=BodyMetric)
+@receiver(post_delete, sender=BodyMetric)
+def sync_profile_body_metrics(sender, instance, raw=False, **kwargs):
+    if not raw:
+        metrics.sync_profile(instance.user_id)
@@ -1,3 +1,260 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from .downsampling import lttb, minmax
+from .models import BodyMetric, Profile
+
+User = get_user_model()
+
+
+class PublicProfileDirectoryTestCase(APITestCase):
+    """
+    Test suite for the public profile directory.
+
+    Tests cover:
+    - Only public profiles are listed, newest members first
+    - Cursor pagination across pages
+    - Case-insensitive username prefix search
+    - A constant number of queries per page
+    """
+
+    def setUp(self):
+        now = timezone.now()
+        self.users = []
+        for i, name in enumerate(['alice', 'Albert', 'bob', 'carol', 'dave']):
+            user = User.objects.create_user(
+                username=name, email=f'{name}@example.com', password='SecurePass123',
+                first_name=name.title(),
+            )
+            user.date_joined = now - timedelta(days=10 - i)
+            user.save(update_fields=['date_joined'])
+            self.users.append(user)
+        # Everyone but dave is public
+        Profile.objects.exclude(user__username='dave').update(is_public=True)
+
+    def usernames(self, response):
+        return [profile['username'] for profile in response.data['results']]
+
+    def test_lists_public_profiles_newest_first(self):
+        """
+        Private profiles are left out; the newest member comes first.
+        """
+        response = self.client.get('/api/v1/profiles/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.usernames(response), ['carol', 'bob', 'Albert', 'alice'])
+        self.assertEqual(response.data['results'][0]['first_name'], 'Carol')
+
+    def test_cursor_pagination(self):
+        """
+        Following `next` walks through every public profile exactly once.
+        """
+        seen = []
+        url = '/api/v1/profiles/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(self.usernames(response))
+            url = response.data['next']
+        self.assertEqual(seen, ['carol', 'bob', 'Albert', 'alice'])
+
+    def test_username_prefix_search(self):
+        """
+        `search` matches the start of usernames, ignoring case.
+        """
+        response = self.client.get('/api/v1/profiles/', {'search': 'AL'})
+        self.assertEqual(self.usernames(response), ['Albert', 'alice'])
+        response = self.client.get('/api/v1/profiles/', {'search': 'lice'})
+        self.assertEqual(self.usernames(response), [])
+        response = self.client.get('/api/v1/profiles/', {'search': 'dav'})
+        self.assertEqual(self.usernames(response), [])
+
+    def test_query_count(self):
+        """
+        A page is one query, regardless of how many profiles it holds.
+        """
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/profiles/')
+        for i in range(10):
+            user = User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='SecurePass123')
+            Profile.objects.filter(user=user).update(is_public=True)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/profiles/')
+        self.assertEqual(len(response.data['results']), 14)
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/profiles/alice/')
+
+
+class BodyMetricTestCase(APITestCase):
+    """
+    Test suite for the body-metrics log and its downsampled series.
+
+    Tests cover:
+    - Logging, correcting and deleting weigh-ins keeps the profile on the latest values
+    - Profile weight updates are logged, clearing them is rejected
+    - Weigh-ins are private to their owner
+    - LTTB and min/max downsampling
+    - The series endpoint: ranges, point budget, parameter validation
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='lifter', email='lifter@example.com', password='SecurePass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.url = '/api/v1/profiles/me/body-metrics/'
+
+    def profile_values(self):
+        profile = Profile.objects.get(user=self.user)
+        return profile.weight, profile.body_fat_percentage
+
+    def log_daily(self, days, start=None):
+        start = start or timezone.now() - timedelta(days=days)
+        BodyMetric.objects.bulk_create([
+            BodyMetric(user=self.user, measured_at=start + timedelta(days=i), weight=80 + (i % 10) / 10)
+            for i in range(days)
+        ])
+
+    def test_log_updates_profile(self):
+        """
+        The profile mirrors the latest logged weight and body fat.
+        """
+        now = timezone.now()
+        response = self.client.post(self.url, {'weight': '82.5', 'body_fat_percentage': '18'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.profile_values(), (Decimal('82.50'), Decimal('18.00')))
+
+        # Only weight logged: body fat stays at its last logged value
+        self.client.post(self.url, {'weight': '81'})
+        self.assertEqual(self.profile_values(), (Decimal('81.00'), Decimal('18.00')))
+
+        # A backdated weigh-in doesn't replace the latest value
+        old = self.client.post(self.url, {'weight': '90', 'measured_at': (now - timedelta(days=7)).isoformat()})
+        self.assertEqual(self.profile_values()[0], Decimal('81.00'))
+
+        response = self.client.get(self.url)
+        self.assertEqual([row['weight'] for row in response.data['results']], ['81.00', '82.50', '90.00'])
+
+        # Correcting and deleting entries follows the latest values
+        latest = response.data['results'][0]['id']
+        self.client.patch(f'{self.url}{latest}/', {'weight': '80.5'})
+        self.assertEqual(self.profile_values()[0], Decimal('80.50'))
+        self.client.delete(f'{self.url}{latest}/')
+        self.assertEqual(self.profile_values()[0], Decimal('82.50'))
+        self.client.delete(f'{self.url}{old.data["id"]}/')
+        self.assertEqual(self.profile_values()[0], Decimal('82.50'))
+
+    def test_empty_entry_rejected(self):
+        """
+        An entry needs at least one value.
+        """
+        response = self.client.post(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BodyMetric.objects.exists())
+
+    def test_profile_update_is_logged(self):
+        """
+        Changing weight on the profile logs a weigh-in; other edits don't.
+        """
+        self.client.patch('/api/v1/profiles/me/', {'weight': '77.7'})
+        self.client.patch('/api/v1/profiles/me/', {'about_me': 'Hi', 'weight': '77.7'})
+        response = self.client.patch('/api/v1/profiles/me/', {'body_fat_percentage': '15'})
+        self.assertEqual(response.data['weight'], '77.70')
+        self.assertEqual(response.data['body_fat_percentage'], '15.00')
+        self.assertEqual(
+            list(BodyMetric.objects.values_list('weight', 'body_fat_percentage')),
+            [(None, Decimal('15.00')), (Decimal('77.70'), None)],
+        )
+
+    def test_profile_metrics_cannot_be_cleared(self):
+        """
+        Clearing weight on the profile is rejected instead of leaving the
+        profile and the log out of sync.
+        """
+        self.client.patch('/api/v1/profiles/me/', {'weight': '77.7'})
+        response = self.client.patch('/api/v1/profiles/me/', {'weight': None}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('weight', response.data)
+        self.assertEqual(self.profile_values()[0], Decimal('77.70'))
+        # Nothing to clear yet is fine
+        response = self.client.patch('/api/v1/profiles/me/', {'body_fat_percentage': None}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_entries_are_private(self):
+        """
+        Users can't see or change someone else's weigh-ins.
+        """
+        other = User.objects.create_user(username='other', email='other@example.com', password='SecurePass123')
+        entry = BodyMetric.objects.create(user=other, measured_at=timezone.now(), weight=70)
+        self.assertEqual(self.client.get(self.url).data['count'], 0)
+        response = self.client.delete(f'{self.url}{entry.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(BodyMetric.objects.filter(pk=entry.pk).exists())
+
+    def test_downsampling(self):
+        """
+        Both methods return a subset of the input within the budget; LTTB
+        keeps the end points and min/max keeps every extreme.
+        """
+        points = [(i, (i * 7919) % 101) for i in range(1000)]
+        sampled = lttb(points, 50)
+        self.assertEqual(len(sampled), 50)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+        self.assertTrue(set(sampled) <= set(points))
+        self.assertEqual(sampled, sorted(sampled))
+
+        sampled = minmax(points, 50)
+        self.assertLessEqual(len(sampled), 50)
+        self.assertTrue(set(sampled) <= set(points))
+        self.assertEqual(min(y for _, y in sampled), 0)
+        self.assertEqual(max(y for _, y in sampled), 100)
+
+        # Nothing to reduce
+        self.assertEqual(lttb(points[:10], 50), points[:10])
+        self.assertEqual(minmax(points[:10], 50), points[:10])
+
+    def test_series(self):
+        """
+        Years of daily weigh-ins come back as the requested number of points.
+        """
+        self.log_daily(3 * 365)
+        url = f'{self.url}series/'
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'points': 200})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3 * 365)
+        self.assertEqual(len(response.data['points']), 200)
+        self.assertEqual(response.data['method'], 'lttb')
+
+        response = self.client.get(url, {'points': 200, 'method': 'minmax'})
+        values = [value for _, value in response.data['points']]
+        self.assertLessEqual(len(values), 200)
+        self.assertEqual((min(values), max(values)), (80.0, 80.9))
+
+        # A range small enough is returned as is
+        start = (timezone.now() - timedelta(days=10)).date().isoformat()
+        response = self.client.get(url, {'from': start})
+        self.assertEqual(response.data['count'], len(response.data['points']))
+        self.assertLessEqual(response.data['count'], 10)
+
+        response = self.client.get(url, {'metric': 'body_fat_percentage'})
+        self.assertEqual((response.data['count'], response.data['points']), (0, []))
+
+        for params in ({'points': 2}, {'points': 'many'}, {'metric': 'height'}, {'method': 'mean'}, {'to': 'yesterday'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_series_rejects_impossible_dates(self):
+        """
+        Well-formed dates that don't exist are a 400, not a server error.
+        """
+        url = f'{self.url}series/'
+        for params in ({'from': '2024-13-01'}, {'to': '2024-02-30'}, {'to': '2024-02-30T10:00:00'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn(next(iter(params)), response.data)
 
-# Create your tests here.
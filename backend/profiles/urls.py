@@ -1,8 +1,14 @@
 from django.urls import path
-from .views import ProfileDetailView, PublicProfileListView, PublicProfileDetailView
+from .views import (
+    BodyMetricDetailView, BodyMetricListCreateView, BodyMetricSeriesView,
+    ProfileDetailView, PublicProfileListView, PublicProfileDetailView,
+)
 
 urlpatterns = [
     path('me/', ProfileDetailView.as_view(), name='profile-me'),
+    path('me/body-metrics/', BodyMetricListCreateView.as_view(), name='body-metric-list'),
+    path('me/body-metrics/series/', BodyMetricSeriesView.as_view(), name='body-metric-series'),
+    path('me/body-metrics/<int:pk>/', BodyMetricDetailView.as_view(), name='body-metric-detail'),
     path('', PublicProfileListView.as_view(), name='profile-list-public'),
     path('<str:username>/', PublicProfileDetailView.as_view(), name='profile-detail-public'),
 ]
\ No newline at end of file
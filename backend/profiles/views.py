@@ -1,26 +1,137 @@
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import Profile
-from .serializers import PublicProfileSerializer, ProfileSerializer
+from rest_framework.response import Response
+from monitoring.timing import SerializerTimingMixin
+from .downsampling import LTTB, METHODS
+from .models import BodyMetric, Profile
+from .serializers import BodyMetricSerializer, PublicProfileSerializer, ProfileSerializer
+from . import metrics
 
-class ProfileDetailView(generics.RetrieveUpdateAPIView):
+class ProfileDetailView(SerializerTimingMixin, generics.RetrieveUpdateAPIView):
     """Retrieve or update the profile of the currently authenticated user."""
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
         return self.request.user.profile
-    
-class PublicProfileListView(generics.ListAPIView):
-    """List all profiles that are marked public."""
-    queryset = Profile.objects.filter(is_public=True)
+
+class PublicProfileCursorPagination(CursorPagination):
+    """
+    Newest members first. Cursors keep deep pages as cheap as the first one
+    and stay stable while new profiles are made public.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-date_joined', '-id')
+
+class PublicProfileListView(SerializerTimingMixin, generics.ListAPIView):
+    """
+    List all profiles that are marked public.
+    Query params: search (case-insensitive username prefix), cursor, page_size.
+    """
     serializer_class = PublicProfileSerializer
     permission_classes = [AllowAny]
+    pagination_class = PublicProfileCursorPagination
 
-class PublicProfileDetailView(generics.RetrieveAPIView):
+    def get_queryset(self):
+        queryset = Profile.objects.filter(is_public=True).select_related('user').annotate(
+            # Cursor position; the user's join date is the directory order
+            date_joined=F('user__date_joined'),
+        )
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            # LOWER(username) LIKE 'prefix%' matches the prefix index on PostgreSQL
+            queryset = queryset.annotate(username_lower=Lower('user__username')).filter(
+                username_lower__startswith=search.lower()
+            )
+        return queryset
+
+class PublicProfileDetailView(SerializerTimingMixin, generics.RetrieveAPIView):
     """Retrieve a specific public profile by username."""
-    queryset = Profile.objects.filter(is_public=True)
+    queryset = Profile.objects.filter(is_public=True).select_related('user')
     serializer_class = PublicProfileSerializer
     permission_classes = [AllowAny]
     lookup_field = 'user__username'
     lookup_url_kwarg = 'username'
+
+class BodyMetricListCreateView(SerializerTimingMixin, generics.ListCreateAPIView):
+    """List the current user's weigh-ins (newest first) or log a new one."""
+    serializer_class = BodyMetricSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return BodyMetric.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class BodyMetricDetailView(SerializerTimingMixin, generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, correct or delete one of the current user's weigh-ins."""
+    serializer_class = BodyMetricSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return BodyMetric.objects.filter(user=self.request.user)
+
+def _parse_moment(name, value, end=False):
+    """A datetime or date query param; a date covers the whole day."""
+    try:
+        # Both raise ValueError for well-formed but impossible values (2024-02-30)
+        moment = parse_datetime(value)
+        day = parse_date(value) if moment is None else None
+    except ValueError:
+        moment = day = None
+    if moment is None:
+        if day is None:
+            raise ValidationError({name: 'Expected an ISO 8601 date or datetime.'})
+        moment = datetime.combine(day, time.max if end else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+class BodyMetricSeriesView(SerializerTimingMixin, generics.GenericAPIView):
+    """
+    The current user's weight or body fat history, downsampled for charts.
+    Query params: metric (weight or body_fat_percentage; default weight),
+    from, to (ISO dates or datetimes, inclusive), points (default 300),
+    method (lttb or minmax; default lttb).
+
+    `count` is the number of logged values in the range, `points` the
+    [measured_at, value] pairs to draw, oldest first.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        metric = params.get('metric', 'weight')
+        if metric not in metrics.FIELDS:
+            raise ValidationError({'metric': f"Choose one of: {', '.join(metrics.FIELDS)}."})
+        method = params.get('method', LTTB)
+        if method not in METHODS:
+            raise ValidationError({'method': f"Choose one of: {', '.join(METHODS)}."})
+        try:
+            points = int(params.get('points', settings.BODY_METRIC_SERIES_DEFAULT_POINTS))
+        except ValueError:
+            raise ValidationError({'points': 'Expected a number.'})
+        if not 3 <= points <= settings.BODY_METRIC_SERIES_MAX_POINTS:
+            raise ValidationError({'points': f'Must be between 3 and {settings.BODY_METRIC_SERIES_MAX_POINTS}.'})
+        start = _parse_moment('from', params['from']) if params.get('from') else None
+        end = _parse_moment('to', params['to'], end=True) if params.get('to') else None
+
+        count, series = metrics.series(request.user.id, metric, start, end, points, method)
+        return Response({
+            'metric': metric,
+            'method': method,
+            'count': count,
+            'points': [[measured_at, float(value)] for measured_at, value in series],
+        })
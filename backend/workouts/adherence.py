@@ -0,0 +1,135 @@
+"""
+Plan adherence: how logged sets compare to the planned sets they came from.
+
+Live sessions are aggregated in SQL, grouped by session, using the parsed
+target_reps_min/target_reps_max columns of PlannedSet. Archived sessions
+no longer have LoggedSet rows, so their blobs are scored in Python with
+the same rules.
+"""
+from django.db.models import Count, F, Q
+
+from .models import LoggedSet, PlannedSet
+from . import archive
+
+COUNTERS = (
+    'sets_logged',
+    'rep_targets',
+    'reps_in_range',
+    'reps_below',
+    'reps_above',
+    'weight_targets',
+    'weight_met',
+)
+
+_HAS_REP_TARGET = Q(planned_set__target_reps_min__isnull=False)
+_REPS_BELOW = _HAS_REP_TARGET & Q(actual_reps__lt=F('planned_set__target_reps_min'))
+_REPS_ABOVE = Q(planned_set__target_reps_max__isnull=False) & Q(actual_reps__gt=F('planned_set__target_reps_max'))
+_HAS_WEIGHT_TARGET = Q(planned_set__target_weight__isnull=False)
+
+
+def _empty():
+    return dict.fromkeys(COUNTERS, 0)
+
+
+def _with_rates(counters):
+    counters['rep_adherence'] = (
+        round(counters['reps_in_range'] / counters['rep_targets'], 3) if counters['rep_targets'] else None
+    )
+    counters['weight_adherence'] = (
+        round(counters['weight_met'] / counters['weight_targets'], 3) if counters['weight_targets'] else None
+    )
+    return counters
+
+
+def _aggregate_live(session_ids):
+    """One grouped query over the planned LoggedSets of the given sessions."""
+    rows = LoggedSet.objects.filter(
+        session_id__in=session_ids, planned_set__isnull=False
+    ).order_by().values('session_id').annotate(
+        sets_logged=Count('id'),
+        rep_targets=Count('id', filter=_HAS_REP_TARGET),
+        reps_below=Count('id', filter=_REPS_BELOW),
+        reps_above=Count('id', filter=_REPS_ABOVE),
+        weight_targets=Count('id', filter=_HAS_WEIGHT_TARGET),
+        weight_met=Count('id', filter=_HAS_WEIGHT_TARGET & Q(actual_weight__gte=F('planned_set__target_weight'))),
+    )
+    results = {}
+    for row in rows:
+        session_id = row.pop('session_id')
+        row['reps_in_range'] = row['rep_targets'] - row['reps_below'] - row['reps_above']
+        results[session_id] = row
+    return results
+
+
+def _aggregate_archived(sessions):
+    """Score archived sessions from their blobs, with the same rules as SQL."""
+    rows_by_session = {
+        session.id: [row for row in archive.unpack_rows(session.archived_sets) if row['planned_set_id']]
+        for session in sessions
+    }
+    targets = {
+        planned_set['id']: planned_set
+        for planned_set in PlannedSet.objects.filter(
+            id__in={row['planned_set_id'] for rows in rows_by_session.values() for row in rows}
+        ).values('id', 'target_reps_min', 'target_reps_max', 'target_weight')
+    }
+
+    results = {}
+    for session_id, rows in rows_by_session.items():
+        counters = _empty()
+        for row in rows:
+            target = targets.get(row['planned_set_id'])
+            if target is None:
+                # Planned set was deleted; the live FK would be NULL too
+                continue
+            counters['sets_logged'] += 1
+            low, high = target['target_reps_min'], target['target_reps_max']
+            if low is not None:
+                counters['rep_targets'] += 1
+                if row['actual_reps'] < low:
+                    counters['reps_below'] += 1
+                elif high is not None and row['actual_reps'] > high:
+                    counters['reps_above'] += 1
+                else:
+                    counters['reps_in_range'] += 1
+            if target['target_weight'] is not None:
+                counters['weight_targets'] += 1
+                if row['actual_weight'] >= target['target_weight']:
+                    counters['weight_met'] += 1
+        results[session_id] = counters
+    return results
+
+
+def session_adherence(session):
+    """Adherence counters for a single session."""
+    if session.is_archived:
+        counters = _aggregate_archived([session]).get(session.id)
+    else:
+        counters = _aggregate_live([session.id]).get(session.id)
+    return _with_rates(counters or _empty())
+
+
+def plan_adherence(sessions):
+    """
+    Adherence for every given session of a plan plus the plan-wide totals,
+    summed from the per-session counters.
+    """
+    sessions = list(sessions)
+    live = [s.id for s in sessions if not s.is_archived]
+    archived = [s for s in sessions if s.is_archived]
+    per_session = _aggregate_live(live) if live else {}
+    if archived:
+        per_session.update(_aggregate_archived(archived))
+
+    totals = _empty()
+    breakdown = []
+    for session in sessions:
+        counters = per_session.get(session.id, _empty())
+        for key in COUNTERS:
+            totals[key] += counters[key]
+        breakdown.append({
+            'session': session.id,
+            'date_started': session.date_started,
+            **_with_rates(dict(counters)),
+        })
+    return {'summary': _with_rates(totals), 'sessions': breakdown}
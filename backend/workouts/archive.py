@@ -0,0 +1,239 @@
+"""
+Cold-history archival for workout sessions.
+
+Old completed sessions are read-only, so their LoggedSet rows can be packed
+into a single compressed blob stored on the WorkoutSession row. The blob is
+columnar: every LoggedSet field is stored as its own typed array, which
+compresses far better than row-per-set data.
+
+Blob layout:
+    <version: uint8><set count: uint32><zlib(column arrays)>
+
+The set count lives outside the compressed payload so list views can show
+it without decompressing anything.
+"""
+import array
+import struct
+import sys
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import WorkoutSession, LoggedSet, PlannedSet
+from exercises.models import Exercise
+
+ARCHIVE_FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<BI')
+
+# Set while archive_sessions() deletes the rows it packed (see is_archiving)
+_state = threading.local()
+
+# Column order inside the compressed payload. All columns are signed 64-bit
+# integers; nullable values use -1 as the "missing" marker.
+_COLUMNS = (
+    'id',
+    'exercise_id',
+    'planned_set_id',
+    'order',
+    'actual_reps',
+    'actual_weight',      # hundredths of a kg (DecimalField with 2 places)
+    'actual_rest_time',
+    'completed_at',       # microseconds since the epoch, UTC
+)
+
+# Columns stored as deltas from the previous value (monotonic-ish data)
+_DELTA_COLUMNS = {'id', 'completed_at'}
+
+_NULL = -1
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class ArchiveFormatError(ValueError):
+    """Raised when a blob can't be decoded by this version of the code."""
+
+
+def _to_micros(value):
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value):
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _encode_row(logged_set):
+    return (
+        logged_set.id,
+        logged_set.exercise_id,
+        logged_set.planned_set_id if logged_set.planned_set_id is not None else _NULL,
+        logged_set.order,
+        logged_set.actual_reps,
+        int(round(Decimal(str(logged_set.actual_weight)) * 100)),
+        logged_set.actual_rest_time if logged_set.actual_rest_time is not None else _NULL,
+        _to_micros(logged_set.completed_at),
+    )
+
+
+def pack_sets(logged_sets):
+    """
+    Pack an iterable of LoggedSet instances into an archive blob.
+    Sets are stored in the order given, so pass them sorted by 'order'.
+    """
+    rows = [_encode_row(s) for s in logged_sets]
+    payload = bytearray()
+    for index, name in enumerate(_COLUMNS):
+        column = array.array('q', (row[index] for row in rows))
+        if name in _DELTA_COLUMNS:
+            previous = 0
+            for i, value in enumerate(column):
+                column[i], previous = value - previous, value
+        if sys.byteorder == 'big':
+            column.byteswap()
+        payload += column.tobytes()
+    return _HEADER.pack(ARCHIVE_FORMAT_VERSION, len(rows)) + zlib.compress(bytes(payload), 9)
+
+
+def count_sets(blob):
+    """Return the number of sets in a blob by reading its header only."""
+    version, count = _HEADER.unpack_from(bytes(blob[:_HEADER.size]))
+    if version != ARCHIVE_FORMAT_VERSION:
+        raise ArchiveFormatError(f"Unsupported archive format version: {version}")
+    return count
+
+
+def unpack_rows(blob):
+    """
+    Decode an archive blob into a list of dicts keyed by LoggedSet attribute
+    names (exercise_id, planned_set_id, ...).
+    """
+    blob = bytes(blob)
+    count = count_sets(blob)
+    payload = zlib.decompress(blob[_HEADER.size:])
+    item_size = array.array('q').itemsize
+    if len(payload) != count * item_size * len(_COLUMNS):
+        raise ArchiveFormatError("Archive payload length does not match its header.")
+
+    columns = {}
+    for index, name in enumerate(_COLUMNS):
+        column = array.array('q')
+        start = index * count * item_size
+        column.frombytes(payload[start:start + count * item_size])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        if name in _DELTA_COLUMNS:
+            running = 0
+            for i, value in enumerate(column):
+                running += value
+                column[i] = running
+        columns[name] = column
+
+    rows = []
+    for i in range(count):
+        planned_set_id = columns['planned_set_id'][i]
+        rest = columns['actual_rest_time'][i]
+        rows.append({
+            'id': columns['id'][i],
+            'exercise_id': columns['exercise_id'][i],
+            'planned_set_id': None if planned_set_id == _NULL else planned_set_id,
+            'order': columns['order'][i],
+            'actual_reps': columns['actual_reps'][i],
+            'actual_weight': Decimal(columns['actual_weight'][i]).scaleb(-2),
+            'actual_rest_time': None if rest == _NULL else rest,
+            'completed_at': _from_micros(columns['completed_at'][i]),
+        })
+    return rows
+
+
+def unpack_logged_sets(session):
+    """
+    Rebuild unsaved LoggedSet instances from an archived session, so they can
+    go through LoggedSetSerializer exactly like live rows.
+    """
+    if session.archived_sets is None:
+        return []
+    return [
+        LoggedSet(session_id=session.id, **row)
+        for row in unpack_rows(session.archived_sets)
+    ]
+
+
+def archivable_sessions(cutoff):
+    """Completed, not yet archived sessions finished before `cutoff`."""
+    return WorkoutSession.objects.filter(
+        status='completed',
+        date_finished__lt=cutoff,
+        archived_at__isnull=True,
+    )
+
+
+@transaction.atomic
+def archive_sessions(sessions, now):
+    """
+    Pack the logged sets of the given sessions into their archive blobs and
+    delete the row-per-set data. Returns the number of sets archived.
+    """
+    sessions = list(sessions)
+    sets_by_session = {session.id: [] for session in sessions}
+    for logged_set in LoggedSet.objects.filter(session__in=sessions).order_by('session_id', 'order', 'id'):
+        sets_by_session[logged_set.session_id].append(logged_set)
+
+    archived = 0
+    for session in sessions:
+        session.archived_sets = pack_sets(sets_by_session[session.id])
+        session.archived_at = now
+        archived += len(sets_by_session[session.id])
+
+    WorkoutSession.objects.bulk_update(sessions, ['archived_sets', 'archived_at'])
+    # Archived sets keep their leaderboard entries and usage counts; the
+    # delete receivers check is_archiving() and leave them alone
+    _state.archiving = True
+    try:
+        LoggedSet.objects.filter(session__in=sessions).delete()
+    finally:
+        _state.archiving = False
+    return archived
+
+
+def is_archiving():
+    """True while archive_sessions() deletes the LoggedSet rows it packed."""
+    return getattr(_state, 'archiving', False)
+
+
+@transaction.atomic
+def restore_sessions(sessions):
+    """
+    Recreate LoggedSet rows from the archive blobs of the given sessions and
+    clear the blobs. Returns the number of sets restored.
+
+    Sets whose exercise no longer exists are dropped (matching the CASCADE on
+    LoggedSet.exercise); links to deleted planned sets are cleared (matching
+    SET_NULL on LoggedSet.planned_set).
+    """
+    sessions = [s for s in sessions if s.archived_sets is not None]
+    logged_sets = [ls for session in sessions for ls in unpack_logged_sets(session)]
+
+    exercise_ids = set(Exercise.objects.filter(
+        id__in={ls.exercise_id for ls in logged_sets}
+    ).values_list('id', flat=True))
+    planned_set_ids = set(PlannedSet.objects.filter(
+        id__in={ls.planned_set_id for ls in logged_sets if ls.planned_set_id}
+    ).values_list('id', flat=True))
+
+    restored = []
+    for logged_set in logged_sets:
+        if logged_set.exercise_id not in exercise_ids:
+            continue
+        if logged_set.planned_set_id not in planned_set_ids:
+            logged_set.planned_set_id = None
+        restored.append(logged_set)
+
+    LoggedSet.objects.bulk_create(restored)
+    for session in sessions:
+        session.archived_sets = None
+        session.archived_at = None
+    WorkoutSession.objects.bulk_update(sessions, ['archived_sets', 'archived_at'])
+    return len(restored)
@@ -0,0 +1,262 @@
+"""
+Synthetic users and training history, for reproducing production-scale data.
+
+`generate` creates users with verified emails, public or private profiles,
+weekly weigh-ins, a few plans each and up to several years of sessions
+built from those plans. Lifters train two to five times a week, progress
+quickly at first and then slowly, miss reps and skip sets now and then;
+some have a session in progress. Exercise popularity is skewed, so a few
+exercises appear in most histories and the long tail in few.
+
+Everything is written with bulk inserts, a batch of users per transaction.
+Bulk inserts send no signals, so the data they would maintain is rebuilt
+instead: exercise usage counters per batch, leaderboards at the end.
+Generate into a scratch database; `manage.py flush` resets it.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from profiles.models import BodyMetric, Profile
+from .models import ExerciseGroup, LoggedSet, PlannedSet, WorkoutPlan, WorkoutSession, parse_target_reps
+from . import leaderboards, usage
+
+USERNAME_PREFIX = 'fake_'
+PASSWORD = 'SecurePass123'
+
+PLAN_NAMES = ['Push Day', 'Pull Day', 'Leg Day', 'Upper Body', 'Lower Body', 'Full Body A', 'Full Body B', 'Arms']
+TARGET_REPS = ['5', '5', '8', '8-12', '8-12', '10', '12-15', '6-8', '10+', 'AMRAP']
+WEIGHT_STEP = Decimal('2.5')
+
+
+def _round_weight(value):
+    """Round to the nearest 2.5 kg plate step, at least one step."""
+    return max(WEIGHT_STEP, (Decimal(value) / WEIGHT_STEP).quantize(Decimal('1')) * WEIGHT_STEP)
+
+
+class _Lifter:
+    """Random traits of one fake user, drawn once."""
+
+    def __init__(self, rng, exercises, popularity, years, now):
+        self.rng = rng
+        self.gender = Profile.Gender.MALE if rng.random() < 0.65 else Profile.Gender.FEMALE
+        male = self.gender == Profile.Gender.MALE
+        self.height = round(rng.gauss(178 if male else 165, 7), 1)
+        self.bodyweight = max(45.0, rng.gauss(84 if male else 66, 11))
+        self.weight_trend = rng.gauss(0, 2.5)  # kg per year
+        self.body_fat = max(6.0, rng.gauss(18 if male else 26, 5)) if rng.random() < 0.4 else None
+        self.strength = rng.lognormvariate(0, 0.3) * (1 if male else 0.7)
+        self.sessions_per_week = rng.choice([2, 3, 3, 4, 4, 5])
+        self.joined = now - timedelta(days=rng.uniform(0.3, 1) * years * 365)
+        # Favourite exercises, skewed towards the popular ones
+        favourites = []
+        while len(favourites) < min(len(exercises), rng.randint(10, 20)):
+            exercise = rng.choices(exercises, weights=popularity)[0]
+            if exercise not in favourites:
+                favourites.append(exercise)
+        self.favourites = favourites
+        # Starting working weight per exercise
+        self.start_weight = {exercise.id: self.bodyweight * self.strength * rng.uniform(0.2, 1.0) for exercise in favourites}
+
+    def progress(self, exercise_id, share):
+        """Working weight after `share` (0..1) of the training history."""
+        gain = 0.35 * share ** 0.5 + self.rng.gauss(0, 0.03)
+        return self.start_weight[exercise_id] * (1 + gain)
+
+
+def _fake_user(index, password, lifter):
+    username = f'{USERNAME_PREFIX}{index:06d}'
+    return get_user_model()(
+        username=username,
+        email=f'{username}@example.com',
+        password=password,
+        first_name=f'Fake{index}',
+        date_joined=lifter.joined,
+        email_verified=True,
+    )
+
+
+def _plans(user, lifter):
+    """Plans with their groups and sets, as unsaved (plan, groups, sets) lists."""
+    rng = lifter.rng
+    plans, groups, planned_sets = [], [], []
+    for name in rng.sample(PLAN_NAMES, rng.randint(1, 4)):
+        plan = WorkoutPlan(owner=user, name=name)
+        plans.append(plan)
+        for order, exercise in enumerate(rng.sample(lifter.favourites, min(len(lifter.favourites), rng.randint(3, 6))), 1):
+            group = ExerciseGroup(workout_plan=plan, order=order)
+            groups.append(group)
+            target_reps = rng.choice(TARGET_REPS)
+            reps_min, reps_max = parse_target_reps(target_reps)
+            for set_order in range(1, rng.randint(2, 5) + 1):
+                planned_sets.append(PlannedSet(
+                    group=group, exercise=exercise, order=set_order,
+                    target_reps=target_reps, target_reps_min=reps_min, target_reps_max=reps_max,
+                    target_weight=_round_weight(lifter.start_weight[exercise.id] * 0.8),
+                    rest_time_after=rng.choice([60, 90, 90, 120, 180]),
+                ))
+    return plans, groups, planned_sets
+
+
+def _session_sets(lifter, session, planned, share, started):
+    """LoggedSets of one session: the plan's sets, or a freestyle workout."""
+    rng = lifter.rng
+    if not planned:
+        planned = [
+            (None, exercise, None, None)
+            for exercise in rng.sample(lifter.favourites, min(len(lifter.favourites), rng.randint(3, 5)))
+            for _ in range(rng.randint(2, 4))
+        ]
+    logged_sets = []
+    at = started
+    for planned_set, exercise, reps_min, reps_max in planned:
+        if rng.random() < 0.05:
+            continue  # skipped
+        if reps_min is None:
+            target = rng.randint(6, 15)
+        else:
+            target = rng.randint(reps_min, reps_max or reps_min + 5)
+        reps = max(1, target - (rng.randint(1, 3) if rng.random() < 0.2 else 0))
+        rest = rng.randint(45, 200)
+        at += timedelta(seconds=rest + rng.randint(20, 60))
+        logged_sets.append(LoggedSet(
+            session=session, exercise=exercise, planned_set=planned_set, order=len(logged_sets) + 1,
+            actual_reps=reps, actual_weight=_round_weight(lifter.progress(exercise.id, share)),
+            actual_rest_time=rest if logged_sets else None, completed_at=at,
+        ))
+    return logged_sets
+
+
+def _history(user, lifter, plans_with_sets, now):
+    """Sessions, logged sets and weigh-ins from the user's join date until now."""
+    rng = lifter.rng
+    sessions, logged_sets, body_metrics = [], [], []
+    span = (now - lifter.joined).total_seconds()
+    day = lifter.joined.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    weight, rotation = lifter.bodyweight, 0
+    while day < now - timedelta(days=1):
+        share = (day - lifter.joined).total_seconds() / span
+        if day.weekday() == 0 and rng.random() < 0.6:
+            weight = max(40.0, lifter.bodyweight + lifter.weight_trend * share * span / 31536000 + rng.gauss(0, 0.6))
+            body_metrics.append(BodyMetric(
+                user=user, measured_at=day + timedelta(hours=7),
+                weight=Decimal(f'{weight:.2f}'),
+                body_fat_percentage=Decimal(f'{lifter.body_fat + rng.gauss(0, 0.5):.2f}') if lifter.body_fat else None,
+            ))
+        if rng.random() < lifter.sessions_per_week / 7:
+            started = day + timedelta(hours=rng.randint(6, 21), minutes=rng.randint(0, 59))
+            plan, planned = None, []
+            if plans_with_sets and rng.random() < 0.85:
+                plan, planned = plans_with_sets[rotation % len(plans_with_sets)]
+                rotation += 1
+            session = WorkoutSession(owner=user, plan=plan, status='completed', date_started=started)
+            sets = _session_sets(lifter, session, planned, share, started)
+            session.date_finished = (sets[-1].completed_at if sets else started) + timedelta(minutes=rng.randint(2, 10))
+            sessions.append(session)
+            logged_sets.extend(sets)
+        day += timedelta(days=1)
+
+    if plans_with_sets and rng.random() < 0.2:
+        # Mid-workout right now
+        plan, planned = rng.choice(plans_with_sets)
+        started = now - timedelta(minutes=rng.randint(5, 60))
+        session = WorkoutSession(owner=user, plan=plan, status='in_progress', date_started=started)
+        sets = _session_sets(lifter, session, planned[:rng.randint(1, len(planned))], 1, started)
+        sets = [logged_set for logged_set in sets if logged_set.completed_at <= now]
+        sessions.append(session)
+        logged_sets.extend(sets)
+    return sessions, logged_sets, body_metrics, weight
+
+
+def generate(exercises, users=100, years=2, public_share=0.3, seed=0, batch_size=20, log=None):
+    """
+    Create `users` fake users (see the module docstring) training with
+    `exercises`. Returns a dict of row counts per model.
+    """
+    User = get_user_model()
+    rng = random.Random(seed)
+    now = timezone.now()
+    exercises = list(exercises)
+    # Zipf-like popularity over a shuffled catalog
+    ranked = exercises[:]
+    rng.shuffle(ranked)
+    popularity_rank = {exercise.id: rank for rank, exercise in enumerate(ranked, 1)}
+    popularity = [1 / popularity_rank[exercise.id] for exercise in exercises]
+
+    password = make_password(PASSWORD)
+    first = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+    counts = dict.fromkeys(['users', 'plans', 'planned_sets', 'sessions', 'logged_sets', 'body_metrics'], 0)
+    exercise_ids = set()
+
+    for batch_start in range(first, first + users, batch_size):
+        batch = range(batch_start, min(batch_start + batch_size, first + users))
+        lifters = [_Lifter(rng, exercises, popularity, years, now) for _ in batch]
+        with transaction.atomic():
+            batch_users = User.objects.bulk_create([
+                _fake_user(index, password, lifter) for index, lifter in zip(batch, lifters)
+            ])
+            EmailAddress.objects.bulk_create([
+                EmailAddress(user=user, email=user.email, verified=True, primary=True) for user in batch_users
+            ])
+
+            profiles, plans, groups, planned_sets = [], [], [], []
+            sessions, logged_sets, body_metrics = [], [], []
+            for user, lifter in zip(batch_users, lifters):
+                user_plans, user_groups, user_sets = _plans(user, lifter)
+                plans += user_plans
+                groups += user_groups
+                planned_sets += user_sets
+                plans_with_sets = [
+                    (plan, [
+                        (planned_set, planned_set.exercise, planned_set.target_reps_min, planned_set.target_reps_max)
+                        for planned_set in user_sets if planned_set.group.workout_plan is plan
+                    ])
+                    for plan in user_plans
+                ]
+                user_sessions, user_logged_sets, user_metrics, weight = _history(user, lifter, plans_with_sets, now)
+                sessions += user_sessions
+                logged_sets += user_logged_sets
+                body_metrics += user_metrics
+                profiles.append(Profile(
+                    user=user, is_public=rng.random() < public_share, gender=lifter.gender,
+                    height=Decimal(f'{lifter.height:.2f}'),
+                    weight=Decimal(f'{weight:.2f}') if user_metrics else None,
+                    body_fat_percentage=next(
+                        (metric.body_fat_percentage for metric in reversed(user_metrics) if metric.body_fat_percentage),
+                        None,
+                    ),
+                ))
+
+            Profile.objects.bulk_create(profiles)
+            BodyMetric.objects.bulk_create(body_metrics, batch_size=5000)
+            WorkoutPlan.objects.bulk_create(plans)
+            ExerciseGroup.objects.bulk_create(groups, batch_size=5000)
+            PlannedSet.objects.bulk_create(planned_sets, batch_size=5000)
+            started = [session.date_started for session in sessions]
+            WorkoutSession.objects.bulk_create(sessions, batch_size=5000)
+            # date_started is auto_now_add, which bulk_create fills in with now
+            for session, date_started in zip(sessions, started):
+                session.date_started = date_started
+            WorkoutSession.objects.bulk_update(sessions, ['date_started'], batch_size=1000)
+            LoggedSet.objects.bulk_create(logged_sets, batch_size=5000)
+            usage.rebuild([user.pk for user in batch_users])
+
+        exercise_ids.update(logged_set.exercise_id for logged_set in logged_sets)
+        counts['users'] += len(batch_users)
+        counts['plans'] += len(plans)
+        counts['planned_sets'] += len(planned_sets)
+        counts['sessions'] += len(sessions)
+        counts['logged_sets'] += len(logged_sets)
+        counts['body_metrics'] += len(body_metrics)
+        if log:
+            log(f"{counts['users']}/{users} users, {counts['sessions']} sessions, {counts['logged_sets']} sets")
+
+    for exercise_id in sorted(exercise_ids):
+        leaderboards.rebuild_board(exercise_id)
+    return counts
@@ -0,0 +1,445 @@
+"""
+Per-exercise leaderboards for public profiles.
+
+Each board (exercise + metric) is stored as a bounded top-K table in
+LeaderboardEntry, holding at most one entry (the best set) per user.
+Boards are maintained incrementally:
+
+- a new or edited LoggedSet is only written to the board when it can
+  enter the top K or beats the owner's current entry,
+- a profile turning public adds the user's best sets, turning private
+  removes them,
+- a weigh-in only rescores the user's existing DOTS and Wilks entries,
+- whenever an entry gets worse or disappears, the affected board is
+  rebuilt, because someone who was previously pushed out may now belong
+  in the top K again.
+
+Sets of archived sessions (workouts/archive.py) only exist inside their
+session's blob. Rebuilds keep the entries they back instead of unpacking
+every public user's archive; refreshing a single user reads that user's
+blobs. A user pushed out of the top K whose best set has since been
+archived comes back on their next refresh, not on a board rebuild.
+
+Scores are estimated one-rep maxes (Epley). Relative metrics multiply the
+estimate by the DOTS or Wilks bodyweight coefficient, using the lifter's
+logged bodyweight at the time of the set (see profiles/metrics.py) and
+their profile weight when nothing was logged.
+"""
+import uuid
+from functools import partial
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+from exercises.models import Exercise
+from profiles.metrics import BodyweightHistory, weight_at
+from profiles.models import Profile
+from .models import LeaderboardEntry, LeaderboardVersion, LoggedSet, WorkoutSession
+from . import archive
+
+ABSOLUTE = 'absolute'
+DOTS = 'dots'
+WILKS = 'wilks'
+METRICS = (ABSOLUTE, DOTS, WILKS)
+
+# Polynomial coefficients, lowest degree first, and bodyweight clamps (kg)
+_DOTS = {
+    'M': ((-307.75076, 24.0900756, -0.1918759221, 0.0007391293, -0.000001093), (40, 210)),
+    'F': ((-57.96288, 13.6175032, -0.1126655495, 0.0005158568, -0.0000010706), (40, 150)),
+}
+_WILKS = {
+    'M': ((-216.0475144, 16.2606339, -0.002388645, -0.00113732, 7.01863e-06, -1.291e-08), (40, 201.9)),
+    'F': ((594.31747775582, -27.23842536447, 0.82112226871, -0.00930733913, 4.731582e-05, -9.054e-08), (26.51, 154.53)),
+}
+
+_TWO_PLACES = Decimal('0.01')
+
+
+def leaderboard_size():
+    return getattr(settings, 'LEADERBOARD_SIZE', 100)
+
+
+def _polynomial(coefficients, x):
+    return sum(c * x ** power for power, c in enumerate(coefficients))
+
+
+def _coefficient(table, bodyweight, gender):
+    if bodyweight is None or gender not in table:
+        return None
+    coefficients, (low, high) = table[gender]
+    bodyweight = min(max(float(bodyweight), low), high)
+    return 500 / _polynomial(coefficients, bodyweight)
+
+
+def dots_coefficient(bodyweight, gender):
+    """DOTS multiplier for a lifter, or None when bodyweight/gender is unknown."""
+    return _coefficient(_DOTS, bodyweight, gender)
+
+
+def wilks_coefficient(bodyweight, gender):
+    """Wilks multiplier for a lifter, or None when bodyweight/gender is unknown."""
+    return _coefficient(_WILKS, bodyweight, gender)
+
+
+def estimate_one_rep_max(weight, reps):
+    """Epley estimate. A single is its own one-rep max."""
+    weight = float(weight)
+    if reps <= 1:
+        return weight
+    return weight * (1 + reps / 30)
+
+
+def _quantize(value):
+    return Decimal(str(value)).quantize(_TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def score_set(weight, reps, bodyweight, gender):
+    """
+    Return {metric: (score, estimated_1rm)} for a set. Relative metrics are
+    omitted when the lifter's bodyweight or gender is unknown.
+    """
+    if reps < 1 or weight <= 0:
+        return {}
+    one_rep_max = estimate_one_rep_max(weight, reps)
+    scores = {ABSOLUTE: one_rep_max}
+    for metric, coefficient in ((DOTS, dots_coefficient), (WILKS, wilks_coefficient)):
+        value = coefficient(bodyweight, gender)
+        if value is not None:
+            scores[metric] = one_rep_max * value
+    return {metric: (_quantize(score), _quantize(one_rep_max)) for metric, score in scores.items()}
+
+
+# --- Caching -----------------------------------------------------------------
+
+def board_version(exercise_id):
+    """Opaque token that changes whenever any board of the exercise changes."""
+    return LeaderboardVersion.objects.filter(exercise_id=exercise_id).values_list('version', flat=True).first() or ''
+
+
+def _bump_versions(exercise_ids):
+    LeaderboardVersion.objects.bulk_create(
+        [LeaderboardVersion(exercise_id=exercise_id, version=uuid.uuid4().hex) for exercise_id in exercise_ids],
+        update_conflicts=True, unique_fields=['exercise'], update_fields=['version'],
+    )
+
+
+def _bump_version(exercise_id):
+    _bump_versions([exercise_id])
+
+
+def board_cache_key(exercise_id, metric):
+    return f'leaderboard:{exercise_id}:{metric}:{board_version(exercise_id)}'
+
+
+# --- Maintenance -------------------------------------------------------------
+
+def _candidate(user_id, logged_set_id, weight, reps, achieved_at, bodyweight, gender):
+    return {
+        metric: {
+            'user_id': user_id,
+            'logged_set_id': logged_set_id,
+            'score': score,
+            'estimated_one_rep_max': one_rep_max,
+            'actual_weight': weight,
+            'actual_reps': reps,
+            'bodyweight': bodyweight if metric != ABSOLUTE else None,
+            'achieved_at': achieved_at,
+        }
+        for metric, (score, one_rep_max) in score_set(weight, reps, bodyweight, gender).items()
+    }
+
+
+def _trim(exercise_id, metric):
+    """Drop everything ranked below the top K on a board."""
+    overflow = LeaderboardEntry.objects.filter(
+        exercise_id=exercise_id, metric=metric
+    ).order_by('-score', 'achieved_at').values_list('id', flat=True)[leaderboard_size():]
+    overflow = list(overflow)
+    if overflow:
+        LeaderboardEntry.objects.filter(id__in=overflow).delete()
+
+
+def _offer(candidates, current):
+    """
+    Write the candidate entries, keyed by (exercise_id, metric), that beat
+    the user's current entry (`current` holds its scores) and can enter
+    the top K, with a single upsert. Returns the exercise ids of the boards
+    that changed.
+    """
+    offers = {
+        key: candidate for key, candidate in candidates.items()
+        if current.get(key) is None or candidate['score'] > current[key]
+    }
+    new = {key for key in offers if current.get(key) is None}
+    full = set()
+    if new:
+        # Boards hold at most K entries, so a full board's lowest score is
+        # the one to beat
+        boards = LeaderboardEntry.objects.filter(
+            exercise_id__in={exercise_id for exercise_id, _ in new}, metric__in={metric for _, metric in new},
+        ).order_by().values('exercise_id', 'metric').annotate(count=Count('id'), lowest=Min('score'))
+        for board in boards:
+            key = (board['exercise_id'], board['metric'])
+            if key not in new or board['count'] < leaderboard_size():
+                continue
+            if offers[key]['score'] <= board['lowest']:
+                del offers[key]
+            else:
+                full.add(key)
+    if not offers:
+        return set()
+
+    LeaderboardEntry.objects.bulk_create(
+        [
+            LeaderboardEntry(exercise_id=exercise_id, metric=metric, **candidate)
+            for (exercise_id, metric), candidate in offers.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['exercise', 'metric', 'user'],
+        update_fields=[
+            'score', 'logged_set_id', 'estimated_one_rep_max', 'actual_weight', 'actual_reps', 'bodyweight',
+            'achieved_at',
+        ],
+    )
+    for exercise_id, metric in full:
+        _trim(exercise_id, metric)
+    return {exercise_id for exercise_id, _ in offers}
+
+
+def _loaded_profile(session):
+    """The session owner's profile, if it was loaded along with the session."""
+    if WorkoutSession.owner.is_cached(session):
+        owner = session.owner
+        if type(owner).profile.is_cached(owner):
+            return getattr(owner, 'profile', None)
+    return None
+
+
+def record_set(logged_set, profile=None):
+    """
+    Offer a freshly saved LoggedSet to the boards of its exercise.
+    Cheap exit for private profiles and sets that can't enter the top K.
+    """
+    owner_id = logged_set.session.owner_id
+    if profile is None:
+        profile = _loaded_profile(logged_set.session)
+    if profile is None:
+        profile = Profile.objects.filter(user_id=owner_id).only('is_public', 'weight', 'gender').first()
+    if profile is None or not profile.is_public:
+        return
+    _record_public_set(logged_set, owner_id, profile)
+
+
+@transaction.atomic
+def _record_public_set(logged_set, owner_id, profile):
+    exercise_id = logged_set.exercise_id
+    current = {
+        (exercise_id, metric): score
+        for metric, score in LeaderboardEntry.objects.filter(
+            exercise_id=exercise_id, user_id=owner_id
+        ).values_list('metric', 'score')
+    }
+    bodyweight = weight_at(owner_id, logged_set.completed_at, profile.weight)
+    candidates = _candidate(
+        owner_id, logged_set.id, Decimal(str(logged_set.actual_weight)), logged_set.actual_reps,
+        logged_set.completed_at, bodyweight, profile.gender,
+    )
+    if _offer({(exercise_id, metric): candidate for metric, candidate in candidates.items()}, current):
+        _bump_version(exercise_id)
+
+
+@transaction.atomic
+def rebuild_board(exercise_id):
+    """
+    Recompute all boards of an exercise from public users' live sets.
+
+    Existing entries stay in the running as candidates: they may point to
+    sets that have since been archived (see workouts/archive.py) and no
+    longer exist as LoggedSet rows. Callers remove stale entries first.
+    """
+    if not Exercise.objects.filter(pk=exercise_id).exists():
+        return
+    best = {metric: {} for metric in METRICS}
+
+    def consider(metric, candidate):
+        current = best[metric].get(candidate['user_id'])
+        if current is None or candidate['score'] > current['score']:
+            best[metric][candidate['user_id']] = candidate
+
+    for entry in LeaderboardEntry.objects.filter(exercise_id=exercise_id).values(
+        'metric', 'user_id', 'logged_set_id', 'score', 'estimated_one_rep_max',
+        'actual_weight', 'actual_reps', 'bodyweight', 'achieved_at'
+    ):
+        consider(entry.pop('metric'), entry)
+
+    rows = LoggedSet.objects.filter(
+        exercise_id=exercise_id,
+        session__owner__profile__is_public=True,
+    ).values_list(
+        'id', 'session__owner_id', 'actual_weight', 'actual_reps', 'completed_at',
+        'session__owner__profile__weight', 'session__owner__profile__gender',
+    )
+    rows = list(rows)
+    history = BodyweightHistory({row[1] for row in rows})
+    for set_id, user_id, weight, reps, completed_at, profile_weight, gender in rows:
+        bodyweight = history.at(user_id, completed_at, profile_weight)
+        for metric, candidate in _candidate(user_id, set_id, weight, reps, completed_at, bodyweight, gender).items():
+            consider(metric, candidate)
+
+    LeaderboardEntry.objects.filter(exercise_id=exercise_id).delete()
+    entries = []
+    for metric, by_user in best.items():
+        ranked = sorted(by_user.values(), key=lambda c: (-c['score'], c['achieved_at']))
+        entries.extend(
+            LeaderboardEntry(exercise_id=exercise_id, metric=metric, **candidate)
+            for candidate in ranked[:leaderboard_size()]
+        )
+    LeaderboardEntry.objects.bulk_create(entries)
+    _bump_version(exercise_id)
+
+
+def _schedule_rebuild(exercise_id):
+    # Rebuilds run after commit, so they see the final state of cascading
+    # deletes instead of a half-deleted session or user.
+    transaction.on_commit(partial(rebuild_board, exercise_id))
+
+
+def discard_sets(logged_set_ids):
+    """
+    Handle deleted (or worsened) sets. Entries backed by them are dropped
+    and the affected boards are rebuilt.
+    """
+    entries = LeaderboardEntry.objects.filter(logged_set_id__in=logged_set_ids)
+    exercise_ids = set(entries.values_list('exercise_id', flat=True))
+    if not exercise_ids:
+        return
+    entries.delete()
+    _bump_versions(exercise_ids)
+    for exercise_id in exercise_ids:
+        _schedule_rebuild(exercise_id)
+
+
+def remove_user(user_id):
+    """Take a user off every board (profile turned private)."""
+    entries = LeaderboardEntry.objects.filter(user_id=user_id)
+    exercise_ids = set(entries.values_list('exercise_id', flat=True))
+    entries.delete()
+    _bump_versions(exercise_ids)
+    for exercise_id in exercise_ids:
+        _schedule_rebuild(exercise_id)
+
+
+def _user_sets(user_id):
+    """
+    (id, exercise_id, weight, reps, completed_at) of every set of a user,
+    live and archived.
+    """
+    yield from LoggedSet.objects.filter(session__owner_id=user_id).values_list(
+        'id', 'exercise_id', 'actual_weight', 'actual_reps', 'completed_at'
+    ).iterator()
+    blobs = WorkoutSession.objects.filter(owner_id=user_id, archived_sets__isnull=False).values_list(
+        'archived_sets', flat=True
+    )
+    for blob in blobs.iterator():
+        for row in archive.unpack_rows(blob):
+            yield row['id'], row['exercise_id'], row['actual_weight'], row['actual_reps'], row['completed_at']
+
+
+@transaction.atomic
+def refresh_user(profile):
+    """
+    Re-offer a public user's best sets, archived ones included, to every
+    board, e.g. after the profile turned public or the user's gender
+    changed.
+    """
+    user_id = profile.user_id
+    history = BodyweightHistory([user_id])
+    best = {}
+    for set_id, exercise_id, weight, reps, completed_at in _user_sets(user_id):
+        bodyweight = history.at(user_id, completed_at, profile.weight)
+        for metric, candidate in _candidate(user_id, set_id, weight, reps, completed_at, bodyweight, profile.gender).items():
+            current = best.get((exercise_id, metric))
+            if current is None or candidate['score'] > current['score']:
+                best[(exercise_id, metric)] = candidate
+
+    # Entries that get worse are replaced by the user's new best (which may
+    # be archived, so the rebuild couldn't find it) and their boards are
+    # rebuilt. Entries without any set left are dropped.
+    existing = {
+        (exercise_id, metric): score
+        for exercise_id, metric, score in LeaderboardEntry.objects.filter(user_id=user_id).values_list(
+            'exercise_id', 'metric', 'score'
+        )
+    }
+    worse = {
+        key for key, score in existing.items()
+        if key not in best or best[key]['score'] < score
+    }
+    for exercise_id, metric in worse:
+        entries = LeaderboardEntry.objects.filter(user_id=user_id, exercise_id=exercise_id, metric=metric)
+        if (exercise_id, metric) in best:
+            candidate = best.pop((exercise_id, metric))
+            entries.update(**{k: v for k, v in candidate.items() if k != 'user_id'})
+        else:
+            entries.delete()
+    to_rebuild = {exercise_id for exercise_id, _ in worse}
+
+    changed = to_rebuild | _offer(best, existing)
+    _bump_versions(changed)
+    for exercise_id in to_rebuild:
+        _schedule_rebuild(exercise_id)
+
+
+@transaction.atomic
+def refresh_bodyweight(profile):
+    """
+    Rescore a public user's relative (DOTS, Wilks) entries after their
+    logged bodyweight changed, with the bodyweight in effect when each
+    entry was achieved. Only the user's existing entries are recomputed:
+    their sets aren't rescanned, so another set that now scores higher is
+    only picked up by the next refresh_user or rebuild.
+    """
+    user_id = profile.user_id
+    entries = list(LeaderboardEntry.objects.filter(user_id=user_id, metric__in=(DOTS, WILKS)))
+    if not entries:
+        # Without relative entries the user may have had no bodyweight
+        # before, in which case none of their sets was scored yet
+        if LeaderboardEntry.objects.filter(user_id=user_id).exists():
+            refresh_user(profile)
+        return
+    history = BodyweightHistory([user_id])
+    changed, worse, dropped = [], set(), []
+    for entry in entries:
+        bodyweight = history.at(user_id, entry.achieved_at, profile.weight)
+        scores = score_set(entry.actual_weight, entry.actual_reps, bodyweight, profile.gender)
+        if entry.metric not in scores:
+            dropped.append(entry.pk)
+            worse.add((entry.exercise_id, entry.metric))
+            continue
+        score = scores[entry.metric][0]
+        if score == entry.score and bodyweight == entry.bodyweight:
+            continue
+        if score < entry.score:
+            worse.add((entry.exercise_id, entry.metric))
+        entry.score, entry.bodyweight = score, bodyweight
+        changed.append(entry)
+
+    # A lower score can only let someone back in if the board was full,
+    # and so may have pushed them out
+    full = set()
+    if worse:
+        counts = LeaderboardEntry.objects.filter(
+            exercise_id__in={exercise_id for exercise_id, _ in worse}, metric__in=(DOTS, WILKS)
+        ).order_by().values_list('exercise_id', 'metric').annotate(count=Count('id'))
+        full = {(exercise_id, metric) for exercise_id, metric, count in counts if count >= leaderboard_size()}
+
+    LeaderboardEntry.objects.filter(pk__in=dropped).delete()
+    LeaderboardEntry.objects.bulk_update(changed, ['score', 'bodyweight'])
+    for entry in changed:
+        if (entry.exercise_id, entry.metric) not in worse:
+            _trim(entry.exercise_id, entry.metric)
+    _bump_versions({entry.exercise_id for entry in changed} | {exercise_id for exercise_id, _ in worse})
+    for exercise_id in {exercise_id for exercise_id, _ in worse & full}:
+        _schedule_rebuild(exercise_id)
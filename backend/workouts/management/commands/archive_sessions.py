@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from workouts import archive
+from workouts.models import WorkoutSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Pack the logged sets of old completed sessions into compact per-session "
+        "blobs, or restore them back into LoggedSet rows with --restore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=settings.WORKOUT_ARCHIVE_AFTER_DAYS,
+            help="Archive sessions finished more than this many days ago.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help="Number of sessions processed per transaction.",
+        )
+        parser.add_argument(
+            '--restore', action='store_true',
+            help="Restore archived sessions back into LoggedSet rows.",
+        )
+        parser.add_argument(
+            '--session', type=int, action='append', dest='session_ids',
+            help="Only process the given session id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['restore']:
+            queryset = WorkoutSession.objects.filter(archived_at__isnull=False)
+        else:
+            cutoff = timezone.now() - timedelta(days=options['older_than'])
+            queryset = archive.archivable_sessions(cutoff)
+        if options['session_ids']:
+            queryset = queryset.filter(id__in=options['session_ids'])
+
+        sessions_done = 0
+        sets_done = 0
+        last_id = 0
+        # Walk the sessions by primary key, one transaction per batch, so
+        # locks are short and an interrupted run can simply be restarted.
+        while True:
+            batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            if options['restore']:
+                sets_done += archive.restore_sessions(batch)
+            else:
+                sets_done += archive.archive_sessions(batch, timezone.now())
+            sessions_done += len(batch)
+            self.stdout.write(f"Processed {sessions_done} sessions...")
+
+        verb = "Restored" if options['restore'] else "Archived"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {sets_done} sets from {sessions_done} sessions."
+        ))
@@ -0,0 +1,202 @@
+import json
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from workouts.models import LoggedSet, WorkoutPlan, WorkoutSession
+
+
+def _percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot API endpoints (session list/detail/active, set logging, plan update, "
+        "exercise search) through the full middleware stack, as one user with a large history "
+        "(see generate_fake_data). Results are saved as JSON in BENCHMARK_RESULTS_DIR and can be "
+        "compared with an earlier run. Writes are rolled back; rate limits are off while timing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100, help='Requests per endpoint (default: 100).')
+        parser.add_argument(
+            '--username', type=str, default=None,
+            help='User to benchmark as (default: the user with the most sessions).',
+        )
+        parser.add_argument('--label', type=str, default='', help='Free-text label stored with the results.')
+        parser.add_argument(
+            '--compare', type=str, default=None, metavar='FILE',
+            help="Results file to compare with, or 'latest' for the most recent run.",
+        )
+        parser.add_argument('--no-save', action='store_true', help="Don't write a results file.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(is_active=True)
+        if options['username']:
+            user = users.filter(username=options['username']).first()
+        else:
+            user = users.annotate(session_count=Count('sessions')).order_by('-session_count', 'pk').first()
+        if user is None:
+            raise CommandError("No user to benchmark as; run generate_fake_data first.")
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be positive.")
+
+        results_dir = Path(getattr(settings, 'BENCHMARK_RESULTS_DIR', settings.BASE_DIR / 'benchmarks'))
+        baseline = self.load_baseline(options['compare'], results_dir)
+
+        rates = dict.fromkeys(settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}))
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            with transaction.atomic():
+                endpoints = self.run(user, options['iterations'])
+                transaction.set_rollback(True)
+
+        result = {
+            'created_at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'label': options['label'],
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'user': user.username,
+            'data': {
+                'users': User.objects.count(),
+                'sessions': WorkoutSession.objects.count(),
+                'logged_sets': LoggedSet.objects.count(),
+                'user_sessions': WorkoutSession.objects.filter(owner=user).count(),
+            },
+            'endpoints': endpoints,
+        }
+        self.report(result, baseline)
+
+        if not options['no_save']:
+            results_dir.mkdir(parents=True, exist_ok=True)
+            path = results_dir / f"{datetime.now():%Y%m%d-%H%M%S}-{result['commit'] or 'nogit'}.json"
+            path.write_text(json.dumps(result, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Saved {path}"))
+
+    def load_baseline(self, compare, results_dir):
+        if not compare:
+            return None
+        if compare == 'latest':
+            files = sorted(results_dir.glob('*.json'))
+            if not files:
+                raise CommandError(f"No earlier results in {results_dir}.")
+            path = files[-1]
+        else:
+            path = Path(compare)
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Can't read {path}: {e}")
+
+    def requests(self, user):
+        """(name, method, path, payload factory) of every benchmarked request."""
+        sessions = WorkoutSession.objects.filter(owner=user)
+        detail = sessions.annotate(set_count=Count('logged_sets')).order_by('-set_count', '-pk').first()
+        plan = WorkoutPlan.objects.filter(owner=user).order_by('-pk').first()
+        active = sessions.filter(status='in_progress').first()
+        if active is None:
+            active = WorkoutSession.objects.create(owner=user, plan=plan)
+        next_order = iter(range((active.logged_sets.order_by('-order').values_list('order', flat=True).first() or 0) + 1, 10 ** 9))
+        exercise_id = (
+            active.logged_sets.values_list('exercise_id', flat=True).first()
+            or LoggedSet.objects.filter(session__owner=user).values_list('exercise_id', flat=True).first()
+        )
+
+        requests = [
+            ('sessions: list', 'get', '/api/v1/workouts/sessions/', None),
+            ('sessions: active', 'get', '/api/v1/workouts/sessions/active/', None),
+        ]
+        if detail is not None:
+            requests.append(('sessions: detail', 'get', f'/api/v1/workouts/sessions/{detail.pk}/', None))
+        if exercise_id is not None:
+            requests.append(('logged sets: create', 'post', '/api/v1/workouts/logged-sets/', lambda: {
+                'session_id': active.pk, 'exercise': exercise_id, 'order': next(next_order),
+                'actual_reps': 8, 'actual_weight': '60.00',
+            }))
+        if plan is not None:
+            plan_data = self.client.get(f'/api/v1/workouts/plans/{plan.pk}/').json()
+            requests.append(('plans: update', 'put', f'/api/v1/workouts/plans/{plan.pk}/', lambda: plan_data))
+        requests += [
+            ('exercises: search', 'get', '/api/v1/exercises/?search=press', None),
+            ('exercises: autocomplete', 'get', '/api/v1/exercises/autocomplete/?q=ben', None),
+        ]
+        return requests
+
+    def run(self, user, iterations):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        self.stdout.write(f"{iterations} requests per endpoint as {user.username}")
+
+        endpoints = {}
+        for name, method, path, payload in self.requests(user):
+            send = getattr(self.client, method)
+
+            def request():
+                if payload is None:
+                    return send(path)
+                return send(path, payload(), format='json')
+
+            response = request()  # warm-up
+            if response.status_code >= 400:
+                raise CommandError(f"{name}: {method.upper()} {path} returned {response.status_code}")
+            timings = []
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(iterations):
+                    start = time.perf_counter_ns()
+                    request()
+                    timings.append((time.perf_counter_ns() - start) / 1e6)
+            timings.sort()
+            endpoints[name] = {
+                'method': method.upper(),
+                'path': path,
+                'mean_ms': round(statistics.fmean(timings), 3),
+                'p50_ms': round(_percentile(timings, 0.5), 3),
+                'p95_ms': round(_percentile(timings, 0.95), 3),
+                'p99_ms': round(_percentile(timings, 0.99), 3),
+                'queries': round(len(queries) / iterations, 2),
+            }
+        return endpoints
+
+    def report(self, result, baseline):
+        data = result['data']
+        self.stdout.write(
+            f"{result['database']}: {data['users']} users, {data['sessions']} sessions, "
+            f"{data['logged_sets']} logged sets ({data['user_sessions']} sessions for {result['user']})"
+        )
+        if baseline:
+            self.stdout.write(
+                f"Compared with {baseline.get('commit') or 'unknown commit'} ({baseline.get('created_at', '?')})"
+            )
+        for name, stats in result['endpoints'].items():
+            line = (
+                f"{name}: mean {stats['mean_ms']:.2f} ms, p50 {stats['p50_ms']:.2f} ms, "
+                f"p95 {stats['p95_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, {stats['queries']:g} queries"
+            )
+            before = (baseline or {}).get('endpoints', {}).get(name)
+            if before:
+                change = (stats['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+                line += f" (p50 {change:+.1f}%, queries {stats['queries'] - before['queries']:+g})"
+            self.stdout.write(line)
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exercises.models import Exercise
+from workouts import fake_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate fake users with profiles, weigh-ins, plans and years of workout history "
+        f"(usernames '{fake_data.USERNAME_PREFIX}NNNNNN', password '{fake_data.PASSWORD}'). "
+        "Meant for a scratch database, e.g. to run bench_api against production-sized data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Users to create (default: 100).')
+        parser.add_argument('--years', type=float, default=2, help='Longest training history in years (default: 2).')
+        parser.add_argument(
+            '--public-share', type=float, default=0.3,
+            help='Share of users with a public profile (default: 0.3).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data (default: 0).')
+        parser.add_argument(
+            '--batch-size', type=int, default=20,
+            help='Users generated and inserted per transaction (default: 20).',
+        )
+
+    def handle(self, *args, **options):
+        exercises = list(Exercise.objects.order_by('id'))
+        if not exercises:
+            raise CommandError("The exercise library is empty; run load_exercises first.")
+        if options['users'] < 1 or options['years'] <= 0:
+            raise CommandError("--users and --years must be positive.")
+
+        log = self.stdout.write if options['verbosity'] >= 2 else None
+        start = time.perf_counter()
+        counts = fake_data.generate(
+            exercises, users=options['users'], years=options['years'], public_share=options['public_share'],
+            seed=options['seed'], batch_size=max(options['batch_size'], 1), log=log,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['plans']} plans ({counts['planned_sets']} planned sets), "
+            f"{counts['sessions']} sessions, {counts['logged_sets']} logged sets and "
+            f"{counts['body_metrics']} weigh-ins in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from workouts import usage
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-user exercise usage counters from live sets, "
+        "archived sets and plans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='Only rebuild this user id (can be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        rows = usage.rebuild(options['users'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} exercise usage rows."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from exercises.models import Exercise
+from workouts import leaderboards
+
+
+class Command(BaseCommand):
+    help = "Recompute exercise leaderboards from scratch (all exercises by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exercise', type=int, action='append', dest='exercise_ids',
+            help="Only rebuild the boards of the given exercise id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        exercise_ids = options['exercise_ids'] or Exercise.objects.filter(
+            logged_sets__isnull=False
+        ).values_list('id', flat=True).distinct()
+        count = 0
+        for exercise_id in exercise_ids:
+            leaderboards.rebuild_board(exercise_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt leaderboards for {count} exercises."))
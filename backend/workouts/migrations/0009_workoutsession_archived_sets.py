@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0008_workoutsession_unique_in_progress_session_for_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutsession',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workoutsession',
+            name='archived_sets',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercises', '0001_initial'),
+        ('workouts', '0009_workoutsession_archived_sets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('absolute', 'Absolute'), ('dots', 'DOTS'), ('wilks', 'Wilks')], max_length=10)),
+                ('score', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('logged_set_id', models.PositiveBigIntegerField(blank=True, db_index=True, null=True)),
+                ('estimated_one_rep_max', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('actual_weight', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('actual_reps', models.PositiveIntegerField()),
+                ('bodyweight', models.DecimalField(blank=True, decimal_places=2, help_text='Bodyweight in kg used for relative metrics', max_digits=5, null=True)),
+                ('achieved_at', models.DateTimeField()),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='exercises.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-score', 'achieved_at'],
+                'indexes': [models.Index(fields=['exercise', 'metric', '-score'], name='leaderboard_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('exercise', 'metric', 'user'), name='unique_leaderboard_entry_per_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0010_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plannedset',
+            name='target_reps_max',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='plannedset',
+            name='target_reps_min',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+import re
+
+from django.db import migrations
+
+# Frozen copy of workouts.models.parse_target_reps, so this migration keeps
+# working even if the parser changes later.
+_REP_RANGE_RE = re.compile(r'^(\d+)\s*(?:-|–|—|to)\s*(\d+)$', re.IGNORECASE)
+_REP_MIN_RE = re.compile(r'^(\d+)\s*\+$')
+_REP_EXACT_RE = re.compile(r'^(\d+)$')
+MAX_TARGET_REPS = 1000
+
+
+def parse_target_reps(value):
+    value = (value or '').strip()
+    low = high = None
+    match = _REP_RANGE_RE.match(value)
+    if match:
+        low, high = sorted(int(group) for group in match.groups())
+    elif match := _REP_MIN_RE.match(value):
+        low = int(match.group(1))
+    elif match := _REP_EXACT_RE.match(value):
+        low = high = int(match.group(1))
+    if max(low or 0, high or 0) > MAX_TARGET_REPS:
+        return None, None
+    return low, high
+
+
+def backfill_target_reps_range(apps, schema_editor):
+    PlannedSet = apps.get_model('workouts', 'PlannedSet')
+    batch = []
+    for planned_set in PlannedSet.objects.exclude(target_reps__isnull=True).only('id', 'target_reps').iterator(chunk_size=2000):
+        planned_set.target_reps_min, planned_set.target_reps_max = parse_target_reps(planned_set.target_reps)
+        batch.append(planned_set)
+        if len(batch) >= 2000:
+            PlannedSet.objects.bulk_update(batch, ['target_reps_min', 'target_reps_max'])
+            batch = []
+    if batch:
+        PlannedSet.objects.bulk_update(batch, ['target_reps_min', 'target_reps_max'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0011_plannedset_target_reps_range'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_target_reps_range, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercises', '0005_exercise_content_hash'),
+        ('workouts', '0012_backfill_plannedset_target_reps_range'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('logged_sets', models.PositiveIntegerField(default=0)),
+                ('planned_sets', models.PositiveIntegerField(default=0)),
+                ('use_count', models.PositiveIntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='exercises.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_used_at'], name='exercise_usage_recent_idx'), models.Index(fields=['user', '-use_count'], name='exercise_usage_frequent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'exercise'), name='unique_exercise_usage_per_user')],
+            },
+        ),
+    ]
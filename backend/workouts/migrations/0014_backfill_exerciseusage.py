@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def backfill_exercise_usage(apps, schema_editor):
+    """
+    Count live logged sets and planned sets. Sets already moved into
+    archive blobs are not decoded here; run `rebuild_exercise_usage`
+    afterwards to include them.
+    """
+    ExerciseUsage = apps.get_model('workouts', 'ExerciseUsage')
+    LoggedSet = apps.get_model('workouts', 'LoggedSet')
+    PlannedSet = apps.get_model('workouts', 'PlannedSet')
+
+    counters = {}
+    for row in LoggedSet.objects.order_by().values('session__owner_id', 'exercise_id').annotate(
+        count=Count('id'), last=Max('completed_at')
+    ):
+        counters[(row['session__owner_id'], row['exercise_id'])] = [row['count'], 0, row['last']]
+    for row in PlannedSet.objects.order_by().values('group__workout_plan__owner_id', 'exercise_id').annotate(
+        count=Count('id'), last=Max('group__workout_plan__updated_at')
+    ):
+        entry = counters.setdefault((row['group__workout_plan__owner_id'], row['exercise_id']), [0, 0, None])
+        entry[1] = row['count']
+        if entry[2] is None or (row['last'] and row['last'] > entry[2]):
+            entry[2] = row['last']
+
+    ExerciseUsage.objects.bulk_create([
+        ExerciseUsage(
+            user_id=user_id, exercise_id=exercise_id, logged_sets=logged, planned_sets=planned,
+            use_count=logged + planned, last_used_at=last,
+        )
+        for (user_id, exercise_id), (logged, planned, last) in counters.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0013_exerciseusage'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_exercise_usage, migrations.RunPython.noop),
+    ]
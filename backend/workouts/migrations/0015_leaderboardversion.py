@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercises', '0005_exercise_content_hash'),
+        ('workouts', '0014_backfill_exerciseusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardVersion',
+            fields=[
+                ('exercise', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_version', serialize=False, to='exercises.exercise')),
+                ('version', models.CharField(max_length=32)),
+            ],
+        ),
+    ]
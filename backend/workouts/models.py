@@ -2,10 +2,40 @@ from django.db import models
 from django.conf import settings
 from exercises.models import Exercise
 from django.utils import timezone
+import re
 
 # Get the user model defined in 'accounts' app
 User = settings.AUTH_USER_MODEL
 
+_REP_RANGE_RE = re.compile(r'^(\d+)\s*(?:-|–|—|to)\s*(\d+)$', re.IGNORECASE)
+_REP_MIN_RE = re.compile(r'^(\d+)\s*\+$')
+_REP_EXACT_RE = re.compile(r'^(\d+)$')
+
+# Larger numbers are typos (and would overflow the integer columns); such
+# targets are kept as text but not parsed
+MAX_TARGET_REPS = 1000
+
+
+def parse_target_reps(value):
+    """
+    Parse a free-text rep target into (min, max).
+    '8' -> (8, 8), '8-12' -> (8, 12), '10+' -> (10, None),
+    anything else (blank, 'AMRAP', '99999', ...) -> (None, None).
+    """
+    value = (value or '').strip()
+    low = high = None
+    match = _REP_RANGE_RE.match(value)
+    if match:
+        low, high = sorted(int(group) for group in match.groups())
+    elif match := _REP_MIN_RE.match(value):
+        low = int(match.group(1))
+    elif match := _REP_EXACT_RE.match(value):
+        low = high = int(match.group(1))
+    if max(low or 0, high or 0) > MAX_TARGET_REPS:
+        return None, None
+    return low, high
+
+
 class WorkoutPlan(models.Model):
     """
     The routine, whole workout e.g., "Push Day A"
@@ -50,6 +80,9 @@ class PlannedSet(models.Model):
 
     # Target (Plan) Fields
     target_reps = models.CharField(max_length=20, blank=True, null=True, help_text="e.g., '8' or '8-12'")
+    # Parsed from target_reps on save, so target vs. actual can be compared in SQL
+    target_reps_min = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    target_reps_max = models.PositiveIntegerField(null=True, blank=True, editable=False)
     target_weight = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
     
     # Custom Rest Time
@@ -61,6 +94,16 @@ class PlannedSet(models.Model):
     class Meta:
         ordering = ['order']
 
+    def save(self, *args, **kwargs):
+        """
+        Keep the parsed rep range in sync with target_reps.
+        """
+        self.target_reps_min, self.target_reps_max = parse_target_reps(self.target_reps)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'target_reps' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'target_reps_min', 'target_reps_max'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Set {self.order}: {self.exercise.name} ({self.target_reps} reps)"
     
@@ -88,6 +131,12 @@ class WorkoutSession(models.Model):
     date_finished = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
 
+    # Cold-history archival (see workouts/archive.py)
+    # When set, the session's LoggedSet rows have been packed into this blob
+    # and deleted from the LoggedSet table.
+    archived_sets = models.BinaryField(null=True, blank=True, editable=False)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['-date_started']
         constraints = [
@@ -98,6 +147,10 @@ class WorkoutSession(models.Model):
             )
         ]
 
+    @property
+    def is_archived(self):
+        return self.archived_sets is not None
+
     def __str__(self):
         return f"Session for {self.owner.username} on {self.date_started.strftime('%Y-%m-%d')}"
     
@@ -126,6 +179,14 @@ class LoggedSet(models.Model):
     class Meta:
         ordering = ['order']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the usage counters notice a changed exercise without a query
+        # (see count_logged_set in workouts/signals.py)
+        instance._saved_exercise_id = instance.__dict__.get('exercise_id')
+        return instance
+
     def save(self, *args, **kwargs):
         """
         Auto-calculate rest time from the previous set if not provided.
@@ -143,4 +204,86 @@ class LoggedSet(models.Model):
                 self.actual_rest_time = int(time_diff.total_seconds())
         
         super().save(*args, **kwargs)
-        
\ No newline at end of file
+        
+
+class LeaderboardEntry(models.Model):
+    """
+    One user's best set on a per-exercise leaderboard.
+    Boards are bounded to the top K entries per (exercise, metric), see
+    workouts/leaderboards.py for how they are maintained.
+    """
+    METRIC_CHOICES = [
+        ('absolute', 'Absolute'),
+        ('dots', 'DOTS'),
+        ('wilks', 'Wilks'),
+    ]
+
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES)
+    score = models.DecimalField(max_digits=9, decimal_places=2)
+
+    # The set the score comes from. Not a ForeignKey on purpose: the set may
+    # be archived (and its row deleted) while the entry stays on the board.
+    logged_set_id = models.PositiveBigIntegerField(null=True, blank=True, db_index=True)
+    estimated_one_rep_max = models.DecimalField(max_digits=8, decimal_places=2)
+    actual_weight = models.DecimalField(max_digits=6, decimal_places=2)
+    actual_reps = models.PositiveIntegerField()
+    bodyweight = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, help_text='Bodyweight in kg used for relative metrics')
+    achieved_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score', 'achieved_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['exercise', 'metric', 'user'],
+                name='unique_leaderboard_entry_per_user'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['exercise', 'metric', '-score'], name='leaderboard_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.exercise_id} ({self.metric}): {self.score}"
+
+
+class LeaderboardVersion(models.Model):
+    """
+    Current version of the boards of an exercise. Every change to a board
+    stores a new random version in the same transaction, so rendered
+    boards cached under the old version (see LeaderboardView) are never
+    served again, by any worker.
+    """
+    exercise = models.OneToOneField(Exercise, on_delete=models.CASCADE, primary_key=True, related_name='leaderboard_version')
+    version = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.exercise_id}: {self.version}"
+
+
+class ExerciseUsage(models.Model):
+    """
+    How often and how recently a user used an exercise, counting logged
+    and planned sets. Maintained incrementally on writes (see
+    workouts/usage.py), so recent/frequent lists are a single indexed read.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exercise_usage')
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='usage')
+    logged_sets = models.PositiveIntegerField(default=0)
+    planned_sets = models.PositiveIntegerField(default=0)
+    # logged_sets + planned_sets, stored so "frequent" can use an index
+    use_count = models.PositiveIntegerField(default=0)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exercise'], name='unique_exercise_usage_per_user')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_used_at'], name='exercise_usage_recent_idx'),
+            models.Index(fields=['user', '-use_count'], name='exercise_usage_frequent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} used {self.exercise_id} {self.use_count} times"
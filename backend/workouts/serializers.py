@@ -1,17 +1,83 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
 from rest_framework import serializers
-from .models import WorkoutPlan, ExerciseGroup, PlannedSet, WorkoutSession, LoggedSet
+from .models import (
+    MAX_TARGET_REPS, WorkoutPlan, ExerciseGroup, PlannedSet, WorkoutSession, LoggedSet, LeaderboardEntry, ExerciseUsage,
+    parse_target_reps,
+)
+from exercises import catalog
+from exercises.models import Exercise
 from exercises.serializers import ExerciseSerializer
+from . import archive, usage
+
+
+class CatalogExerciseField(serializers.PrimaryKeyRelatedField):
+    """
+    Exercise id checked against the in-memory exercise catalog (see
+    exercises/catalog.py) instead of with a query per set. The catalog is
+    fetched once per request body, so a plan validates in constant queries.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(queryset=Exercise.objects.all(), **kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if 'exercise_catalog' not in self.context:
+            self.context['exercise_catalog'] = catalog.get_catalog()
+        if pk not in self.context['exercise_catalog'].by_id:
+            self.fail('does_not_exist', pk_value=data)
+        self.context.setdefault('exercise_ids', set()).add(pk)
+        # Only the id is needed to save the set
+        return Exercise(pk=pk)
+
+
+class CatalogExerciseSaveMixin:
+    """
+    Saves in a transaction of its own. The catalog CatalogExerciseField
+    checks against can be a few seconds old, so an exercise deleted since
+    only fails the foreign key check (at commit, the constraints are
+    deferred); that becomes a validation error instead of a server error.
+    """
+
+    def save(self, **kwargs):
+        try:
+            # No savepoint: the check only happens when this is the outermost block
+            with transaction.atomic(savepoint=False):
+                return super().save(**kwargs)
+        except IntegrityError:
+            ids = self.context.get('exercise_ids', set())
+            missing = ids - set(Exercise.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            if not missing:
+                raise
+            message = CatalogExerciseField.default_error_messages['does_not_exist']
+            raise serializers.ValidationError({'exercise': [message.format(pk_value=pk) for pk in sorted(missing)]})
+
 
 class PlannedSetSerializer(serializers.ModelSerializer):
     """
     Serializer for a single planned set.
     """
-   
+    exercise = CatalogExerciseField()
+
     class Meta:
         model = PlannedSet
         # Specify 'exercise' directly. The frontend will send the exercise ID.
         fields = ['id', 'exercise', 'order', 'target_reps', 'target_weight', 'rest_time_after']
 
+    def validate_target_reps(self, value):
+        if any(int(number) > MAX_TARGET_REPS for number in re.findall(r'\d+', value or '')):
+            raise serializers.ValidationError(f"Rep targets can't be higher than {MAX_TARGET_REPS}.")
+        return value
+
 
 class ExerciseGroupSerializer(serializers.ModelSerializer):
     """
@@ -25,7 +91,7 @@ class ExerciseGroupSerializer(serializers.ModelSerializer):
         fields = ['id', 'order', 'name', 'sets']
 
 
-class WorkoutPlanSerializer(serializers.ModelSerializer):
+class WorkoutPlanSerializer(CatalogExerciseSaveMixin, serializers.ModelSerializer):
     """
     Serializer for the full Workout Plan.
     It nests groups, which in turn nest sets.
@@ -45,17 +111,8 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
         groups_data = validated_data.pop('groups')
         # Create the plan instance
         workout_plan = WorkoutPlan.objects.create(**validated_data)
-        
-        # Loop through each group's data
-        for group_data in groups_data:
-            sets_data = group_data.pop('sets')
-            # Create the group instance, linking it to the plan
-            group = ExerciseGroup.objects.create(workout_plan=workout_plan, **group_data)
-            
-            # Loop through each set's data
-            for set_data in sets_data:
-                # Create the set instance, linking it to the group
-                PlannedSet.objects.create(group=group, **set_data)
+        exercise_ids = self.create_groups(workout_plan, groups_data)
+        usage.record_changes(workout_plan.owner_id, after=exercise_ids, used_at=timezone.now())
         return workout_plan
 
     def update(self, instance, validated_data):
@@ -64,6 +121,8 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
         This is the "simple" way: delete all old children and recreate.
         """
         groups_data = validated_data.pop('groups')
+        # Prefetched by WorkoutPlanViewSet
+        before = [s.exercise_id for group in instance.groups.all() for s in group.sets.all()]
 
         # Update the plan's top-level fields
         instance.name = validated_data.get('name', instance.name)
@@ -74,19 +133,44 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
         instance.groups.all().delete()
 
         # Re-create the groups and sets from the new data (just like in create)
-        for group_data in groups_data:
-            sets_data = group_data.pop('sets')
-            group = ExerciseGroup.objects.create(workout_plan=instance, **group_data)
-            for set_data in sets_data:
-                PlannedSet.objects.create(group=group, **set_data)
-        
+        exercise_ids = self.create_groups(instance, groups_data)
+        usage.record_changes(instance.owner_id, before=before, after=exercise_ids, used_at=timezone.now())
         return instance
 
+    def create_groups(self, workout_plan, groups_data):
+        """
+        Create the groups and sets of a plan with one INSERT each, however
+        big the plan is. Returns the exercise ids of the new sets.
+        """
+        groups = ExerciseGroup.objects.bulk_create([
+            ExerciseGroup(workout_plan=workout_plan, **{k: v for k, v in group_data.items() if k != 'sets'})
+            for group_data in groups_data
+        ])
+        planned_sets = []
+        for group, group_data in zip(groups, groups_data):
+            for set_data in group_data['sets']:
+                planned_set = PlannedSet(group=group, **set_data)
+                # bulk_create skips PlannedSet.save(), which parses the target
+                planned_set.target_reps_min, planned_set.target_reps_max = parse_target_reps(planned_set.target_reps)
+                planned_sets.append(planned_set)
+        PlannedSet.objects.bulk_create(planned_sets)
+        return [planned_set.exercise_id for planned_set in planned_sets]
+
+    def to_representation(self, instance):
+        # Plans that were just written (DRF also drops the prefetch cache
+        # after an update) load their groups and sets in two queries
+        # instead of one per group.
+        if 'groups' not in getattr(instance, '_prefetched_objects_cache', {}):
+            prefetch_related_objects([instance], 'groups__sets')
+        return super().to_representation(instance)
+
 
-class LoggedSetSerializer(serializers.ModelSerializer):
+class LoggedSetSerializer(CatalogExerciseSaveMixin, serializers.ModelSerializer):
     """
     Serializer for logging a single set.
     """
+    exercise = CatalogExerciseField()
+
     class Meta:
         model = LoggedSet
         fields = ['id', 'session', 'exercise', 'planned_set', 'order', 'actual_reps', 
@@ -114,6 +198,23 @@ class WorkoutSessionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['owner', 'date_started']
 
+    def validate_status(self, value):
+        # Sets logged into a reopened archived session would be hidden by
+        # its blob; archived sessions have to be restored first.
+        if self.instance is not None and self.instance.is_archived and value != self.instance.status:
+            raise serializers.ValidationError("Archived sessions can't change status.")
+        return value
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Archived sessions keep their sets in a packed blob instead of
+        # LoggedSet rows; decode them so clients can't tell the difference.
+        if instance.is_archived:
+            data['logged_sets'] = LoggedSetSerializer(
+                archive.unpack_logged_sets(instance), many=True
+            ).data
+        return data
+
 
 class WorkoutSessionListSerializer(serializers.ModelSerializer):
     """
@@ -124,6 +225,11 @@ class WorkoutSessionListSerializer(serializers.ModelSerializer):
     plan_name = serializers.CharField(source='plan.name', read_only=True)
 
     def get_set_count(self, obj):
+        if obj.is_archived:
+            return archive.count_sets(obj.archived_sets)
+        # Annotated by the list views (see workouts/views.py)
+        if getattr(obj, 'set_count', None) is not None:
+            return obj.set_count
         return obj.logged_sets.count()
 
     class Meta:
@@ -132,4 +238,39 @@ class WorkoutSessionListSerializer(serializers.ModelSerializer):
             'id', 'owner_username', 'plan', 'status', 'plan_name',
             'date_started', 'date_finished', 'set_count'
         ]
-        
\ No newline at end of file
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """
+    Serializer for a single leaderboard row.
+    """
+    username = serializers.ReadOnlyField(source='user.username')
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = [
+            'username', 'score', 'estimated_one_rep_max', 'actual_weight',
+            'actual_reps', 'bodyweight', 'achieved_at'
+        ]
+
+
+class ExerciseSummarySerializer(serializers.ModelSerializer):
+    """
+    Minimal exercise representation, same shape as exercise autocomplete entries.
+    """
+    equipment = serializers.StringRelatedField()
+
+    class Meta:
+        model = Exercise
+        fields = ['id', 'name', 'equipment']
+
+
+class ExerciseUsageSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a user's usage counters of one exercise.
+    """
+    exercise = ExerciseSummarySerializer(read_only=True)
+
+    class Meta:
+        model = ExerciseUsage
+        fields = ['exercise', 'logged_sets', 'planned_sets', 'use_count', 'last_used_at']
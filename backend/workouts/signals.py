@@ -0,0 +1,134 @@
+from collections import Counter
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from profiles.models import BodyMetric, Profile
+from .models import ExerciseGroup, LoggedSet, PlannedSet, WorkoutPlan, WorkoutSession
+from . import archive, leaderboards, usage
+
+
+@receiver(post_save, sender=LoggedSet)
+def update_leaderboards_on_set_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        # An edited set may have become worse than the entry it backs
+        leaderboards.discard_sets([instance.id])
+    leaderboards.record_set(instance)
+
+
+def _deleted_directly(origin):
+    """
+    Whether a LoggedSet post_delete comes from deleting the set itself (an
+    instance or a LoggedSet queryset). Sets deleted with their session are
+    handled once per session by forget_session_sets; sets deleted by
+    archival live on in the session's blob.
+    """
+    if archive.is_archiving():
+        return False
+    if isinstance(origin, QuerySet):
+        return origin.model is LoggedSet
+    return isinstance(origin, LoggedSet)
+
+
+@receiver(post_delete, sender=LoggedSet)
+def update_leaderboards_on_set_delete(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin):
+        leaderboards.discard_sets([instance.id])
+
+
+@receiver(pre_delete, sender=WorkoutSession)
+def forget_session_sets(sender, instance, **kwargs):
+    # The leaderboard entries and usage counters of a deleted session's
+    # sets (live or archived) are adjusted here, once per session; the
+    # LoggedSet delete receivers skip sets deleted with their session.
+    if instance.is_archived:
+        rows = [(row['id'], row['exercise_id']) for row in archive.unpack_rows(instance.archived_sets)]
+    else:
+        rows = list(LoggedSet.objects.filter(session_id=instance.pk).values_list('id', 'exercise_id'))
+    if not rows:
+        return
+    leaderboards.discard_sets([set_id for set_id, _ in rows])
+    for exercise_id, count in Counter(exercise_id for _, exercise_id in rows).items():
+        usage.record(instance.owner_id, exercise_id, logged=-count)
+
+
+@receiver(pre_save, sender=Profile)
+def remember_leaderboard_fields(sender, instance, **kwargs):
+    instance._previous_leaderboard_state = (
+        Profile.objects.filter(pk=instance.pk).values_list('is_public', 'weight', 'gender').first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Profile)
+def update_leaderboards_on_profile_save(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_leaderboard_state', None)
+    if raw or previous is None:
+        return
+    was_public = previous[0]
+    if was_public and not instance.is_public:
+        leaderboards.remove_user(instance.user_id)
+    elif instance.is_public and (not was_public or previous[2] != instance.gender):
+        leaderboards.refresh_user(instance)
+    elif instance.is_public and previous[1] != instance.weight:
+        leaderboards.refresh_bodyweight(instance)
+
+
+@receiver(post_save, sender=BodyMetric)
+@receiver(post_delete, sender=BodyMetric)
+def update_leaderboards_on_body_metric_change(sender, instance, raw=False, **kwargs):
+    # Relative scores use the bodyweight logged at the time of each set
+    # Entries without a weight only matter when an edit removed one
+    if raw or (instance.weight is None and kwargs.get('created', True)):
+        return
+    profile = Profile.objects.filter(user_id=instance.user_id).only('user_id', 'is_public', 'weight', 'gender').first()
+    if profile is not None and profile.is_public:
+        leaderboards.refresh_bodyweight(profile)
+
+
+# --- Exercise usage counters (workouts/usage.py) ------------------------------
+
+@receiver(post_save, sender=LoggedSet)
+def count_logged_set(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # The exercise the set had when it was loaded (LoggedSet.from_db) or
+    # last saved; unknown for unsaved instances given a pk by hand
+    previous = getattr(instance, '_saved_exercise_id', None)
+    instance._saved_exercise_id = instance.exercise_id
+    if not created and previous in (None, instance.exercise_id):
+        return
+    owner_id = instance.session.owner_id
+    if not created:
+        usage.record(owner_id, previous, logged=-1)
+    usage.record(owner_id, instance.exercise_id, logged=1, used_at=instance.completed_at)
+
+
+@receiver(post_delete, sender=LoggedSet)
+def uncount_logged_set(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin):
+        usage.record(instance.session.owner_id, instance.exercise_id, logged=-1)
+
+
+@receiver(pre_delete, sender=WorkoutPlan)
+def uncount_plan_sets(sender, instance, **kwargs):
+    # Once per plan; uncount_planned_set skips sets deleted with their plan
+    exercise_ids = PlannedSet.objects.filter(group__workout_plan=instance).values_list('exercise_id', flat=True)
+    usage.record_changes(instance.owner_id, before=list(exercise_ids))
+
+
+@receiver(post_delete, sender=PlannedSet)
+def uncount_planned_set(sender, instance, origin=None, **kwargs):
+    # Planned sets deleted on their own or with a single group (admin,
+    # shell). WorkoutPlanSerializer replaces groups with a queryset delete
+    # and applies the difference itself.
+    if isinstance(origin, QuerySet):
+        if origin.model is not PlannedSet:
+            return
+    elif not isinstance(origin, (PlannedSet, ExerciseGroup)):
+        return
+    owner_id = WorkoutPlan.objects.filter(groups=instance.group_id).values_list('owner_id', flat=True).first()
+    if owner_id is not None:
+        usage.record(owner_id, instance.exercise_id, planned=-1)
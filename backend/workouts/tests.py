@@ -1,3 +1,780 @@
-from django.test import TestCase
+import json
+import tempfile
+from pathlib import Path
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, models
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework import status
+
+from exercises import catalog
+from exercises.models import Exercise
+from profiles.models import BodyMetric, Profile
+from .models import (
+    WorkoutPlan, ExerciseGroup, PlannedSet, WorkoutSession, LoggedSet, LeaderboardEntry, ExerciseUsage,
+    parse_target_reps,
+)
+from . import archive, fake_data, leaderboards, usage
+
+User = get_user_model()
+
+
+def create_exercise(name='Bench Press', **kwargs):
+    defaults = {'source_id': name.replace(' ', '_'), 'level': 'beginner', 'category': 'strength'}
+    defaults.update(kwargs)
+    return Exercise.objects.create(name=name, **defaults)
+
+
+class SessionArchiveTestCase(APITestCase):
+    """
+    Test suite for cold-history archival of workout sessions.
+
+    Tests cover:
+    - Round-tripping sets through the packed blob
+    - Transparent reads through the session serializers
+    - The archive_sessions command (archive and restore)
+    - Archived sessions staying closed
+    - Archival deleting sets without per-set queries
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='lifter', email='lifter@example.com', password='SecurePass123'
+        )
+        self.exercise = create_exercise()
+        plan = WorkoutPlan.objects.create(owner=self.user, name='Push Day')
+        group = ExerciseGroup.objects.create(workout_plan=plan, order=1)
+        self.planned_set = PlannedSet.objects.create(
+            group=group, exercise=self.exercise, order=1, target_reps='8-12'
+        )
+
+        finished = timezone.now() - timedelta(days=200)
+        self.session = WorkoutSession.objects.create(
+            owner=self.user, plan=plan, status='completed', date_finished=finished
+        )
+        for order in range(1, 4):
+            LoggedSet.objects.create(
+                session=self.session,
+                exercise=self.exercise,
+                planned_set=self.planned_set if order == 1 else None,
+                order=order,
+                actual_reps=10 - order,
+                actual_weight=Decimal('82.50') + order,
+                completed_at=finished - timedelta(minutes=10 - order * 2),
+            )
+        self.client.force_authenticate(self.user)
+
+    def test_pack_and_unpack_round_trip(self):
+        """
+        Packed sets decode to the exact same field values.
+        """
+        original = list(self.session.logged_sets.order_by('order'))
+        blob = archive.pack_sets(original)
+
+        self.assertEqual(archive.count_sets(blob), 3)
+        rows = archive.unpack_rows(blob)
+        for logged_set, row in zip(original, rows):
+            for field, value in row.items():
+                self.assertEqual(getattr(logged_set, field), value, field)
+
+    def test_serializer_reads_archived_sets_transparently(self):
+        """
+        Session detail and list responses are identical before and after archival.
+        """
+        detail_url = f'/api/v1/workouts/sessions/{self.session.id}/'
+        before_detail = self.client.get(detail_url).data
+        before_list = self.client.get('/api/v1/workouts/sessions/').data
+
+        archive.archive_sessions([self.session], timezone.now())
+
+        self.assertFalse(LoggedSet.objects.filter(session=self.session).exists())
+        self.assertEqual(self.client.get(detail_url).data['logged_sets'], before_detail['logged_sets'])
+        after_list = self.client.get('/api/v1/workouts/sessions/').data
+        self.assertEqual(after_list['results'][0]['set_count'], before_list['results'][0]['set_count'])
+
+    def test_command_archives_and_restores(self):
+        """
+        archive_sessions packs old completed sessions and --restore brings the rows back.
+        """
+        recent = WorkoutSession.objects.create(
+            owner=self.user, status='completed', date_finished=timezone.now()
+        )
+        LoggedSet.objects.create(
+            session=recent, exercise=self.exercise, order=1, actual_reps=5, actual_weight=100
+        )
+        original = list(LoggedSet.objects.filter(session=self.session).values().order_by('order'))
+
+        call_command('archive_sessions', '--batch-size', '1', stdout=StringIO())
+
+        self.session.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertTrue(self.session.is_archived)
+        self.assertFalse(recent.is_archived)
+        self.assertEqual(LoggedSet.objects.count(), 1)
+
+        call_command('archive_sessions', '--restore', stdout=StringIO())
+
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.is_archived)
+        restored = list(LoggedSet.objects.filter(session=self.session).values().order_by('order'))
+        self.assertEqual(restored, original)
+
+    def test_archived_session_status_is_read_only(self):
+        """
+        An archived session can't be reopened through the API.
+        """
+        archive.archive_sessions([self.session], timezone.now())
+        url = f'/api/v1/workouts/sessions/{self.session.id}/'
+        response = self.client.patch(url, {'status': 'in_progress'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('status', response.data)
+
+        response = self.client.patch(url, {'notes': 'Felt strong'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'completed')
+
+    def test_archival_query_count_does_not_depend_on_sets(self):
+        """
+        Archival deletes the sets without per-set queries.
+        """
+        small = WorkoutSession.objects.create(
+            owner=self.user, status='completed', date_finished=timezone.now() - timedelta(days=200)
+        )
+        LoggedSet.objects.create(session=small, exercise=self.exercise, order=1, actual_reps=5, actual_weight=100)
+
+        with CaptureQueriesContext(connection) as one:
+            archive.archive_sessions([small], timezone.now())
+        with CaptureQueriesContext(connection) as three:
+            archive.archive_sessions([self.session], timezone.now())
+        self.assertEqual(len(three), len(one))
+        self.assertEqual(self.client.get('/api/v1/workouts/exercises/frequent/').data[0]['use_count'], 4)
+
+
+@override_settings(LEADERBOARD_SIZE=2)
+class LeaderboardTestCase(APITestCase):
+    """
+    Test suite for the bounded per-exercise leaderboards.
+
+    Tests cover:
+    - Scoring (Epley estimate, DOTS/Wilks coefficients)
+    - Incremental top-K maintenance on set logging and deletes
+    - Profiles turning public/private
+    - Relative scores using the bodyweight logged at the time of the set
+    - Weigh-ins rescoring only the user's relative entries
+    - The paginated leaderboard endpoint
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.exercise = create_exercise()
+        self.users = []
+        for i, (weight, gender) in enumerate([(80, 'M'), (60, 'F'), (100, 'M')]):
+            user = User.objects.create_user(
+                username=f'lifter{i}', email=f'lifter{i}@example.com', password='SecurePass123'
+            )
+            user.profile.is_public = True
+            user.profile.weight = weight
+            user.profile.gender = gender
+            user.profile.save()
+            self.users.append(user)
+        self.client.force_authenticate(self.users[0])
+
+    def log_set(self, user, weight, reps=1, **kwargs):
+        session, _ = WorkoutSession.objects.get_or_create(owner=user, status='in_progress')
+        order = session.logged_sets.count() + 1
+        return LoggedSet.objects.create(
+            session=session, exercise=self.exercise, order=order,
+            actual_reps=reps, actual_weight=weight, **kwargs
+        )
+
+    def board(self, metric='absolute'):
+        return list(LeaderboardEntry.objects.filter(
+            exercise=self.exercise, metric=metric
+        ).values_list('user__username', 'score'))
+
+    def test_scoring(self):
+        """
+        Epley estimate and the relative coefficients match published values.
+        """
+        self.assertEqual(leaderboards.estimate_one_rep_max(100, 1), 100)
+        self.assertAlmostEqual(leaderboards.estimate_one_rep_max(100, 5), 116.67, places=2)
+        self.assertAlmostEqual(leaderboards.dots_coefficient(80, 'M'), 0.6895, places=3)
+        self.assertAlmostEqual(leaderboards.wilks_coefficient(80, 'M'), 0.6827, places=3)
+        self.assertIsNone(leaderboards.dots_coefficient(None, 'M'))
+        self.assertEqual(set(leaderboards.score_set(100, 1, None, None)), {'absolute'})
+
+    def test_board_keeps_top_k_and_best_set_per_user(self):
+        """
+        Only the best set per user is kept, and only the top K users.
+        """
+        self.log_set(self.users[0], 100)
+        self.log_set(self.users[0], 90)
+        self.log_set(self.users[1], 70)
+        self.log_set(self.users[2], 120)
+
+        self.assertEqual(self.board(), [('lifter2', Decimal('120.00')), ('lifter0', Decimal('100.00'))])
+        # The lighter female lifter wins on bodyweight-relative scoring
+        self.assertEqual(self.board('dots')[0][0], 'lifter1')
+
+    def test_private_profile_leaves_board_and_board_refills(self):
+        """
+        Turning private removes the user; the next best public user moves up.
+        """
+        self.log_set(self.users[0], 100)
+        self.log_set(self.users[1], 70)
+        self.log_set(self.users[2], 120)
+
+        profile = self.users[2].profile
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.is_public = False
+            profile.save()
+        self.assertEqual([u for u, _ in self.board()], ['lifter0', 'lifter1'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.is_public = True
+            profile.save()
+        self.assertEqual([u for u, _ in self.board()], ['lifter2', 'lifter0'])
+
+    def test_deleting_best_set_falls_back_to_next_best(self):
+        """
+        Deleting the set behind an entry rebuilds the board.
+        """
+        best = self.log_set(self.users[0], 100)
+        self.log_set(self.users[0], 80)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/v1/workouts/logged-sets/{best.pk}/')
+        self.assertEqual(self.board(), [('lifter0', Decimal('80.00'))])
+
+    def test_sets_deleted_outside_the_api_leave_the_board(self):
+        """
+        Sets deleted directly (admin, shell, queryset deletes) drop their
+        entries too.
+        """
+        best = self.log_set(self.users[0], 100)
+        self.log_set(self.users[0], 80)
+        other = self.log_set(self.users[2], 120)
+        with self.captureOnCommitCallbacks(execute=True):
+            LoggedSet.objects.filter(pk=best.pk).delete()
+        self.assertEqual(self.board(), [('lifter2', Decimal('120.00')), ('lifter0', Decimal('80.00'))])
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(self.board(), [('lifter0', Decimal('80.00'))])
+
+    def test_relative_scores_use_bodyweight_at_time_of_set(self):
+        """
+        A set is scored with the last weigh-in before it, not the current
+        profile weight, and backdated weigh-ins rescore it.
+        """
+        user = self.users[0]
+        now = timezone.now()
+        BodyMetric.objects.create(user=user, measured_at=now - timedelta(days=30), weight=90)
+        self.log_set(user, 100, completed_at=now - timedelta(days=20))
+        with self.captureOnCommitCallbacks(execute=True):
+            leaderboards.rebuild_board(self.exercise.id)
+        entry = LeaderboardEntry.objects.get(exercise=self.exercise, metric='dots', user=user)
+        self.assertEqual(entry.bodyweight, Decimal('90.00'))
+
+        # A later weigh-in changes the profile but not the old set's score
+        BodyMetric.objects.create(user=user, measured_at=now, weight=70)
+        user.profile.refresh_from_db()
+        self.assertEqual(user.profile.weight, Decimal('70.00'))
+        entry.refresh_from_db()
+        self.assertEqual(entry.bodyweight, Decimal('90.00'))
+
+        # A weigh-in between the two is the one in effect for the set
+        BodyMetric.objects.create(user=user, measured_at=now - timedelta(days=25), weight=85)
+        entry.refresh_from_db()
+        self.assertEqual(entry.bodyweight, Decimal('85.00'))
+        self.assertEqual(entry.score, leaderboards.score_set(100, 1, 85, 'M')['dots'][0])
+
+    def test_logging_a_set_reads_one_weigh_in(self):
+        """
+        Scoring a newly logged set reads only the weigh-in in effect, however
+        long the user's history is.
+        """
+        user = self.users[0]
+        now = timezone.now()
+        BodyMetric.objects.bulk_create([
+            BodyMetric(user=user, measured_at=now - timedelta(days=i + 1), weight=90 + i % 5) for i in range(100)
+        ])
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.log_set(user, 100)
+        weigh_ins = [query['sql'] for query in queries if 'profiles_bodymetric' in query['sql']]
+        self.assertEqual(len(weigh_ins), 1)
+        self.assertIn('LIMIT 1', weigh_ins[0])
+        entry = LeaderboardEntry.objects.get(exercise=self.exercise, metric='dots', user=user)
+        self.assertEqual(entry.bodyweight, Decimal('90.00'))
+
+    def test_weigh_ins_only_rescore_relative_entries(self):
+        """
+        A weigh-in rescores the user's DOTS and Wilks entries without
+        reading their set history.
+        """
+        user = self.users[0]
+        for weight in (90, 100, 80):
+            self.log_set(user, weight)
+        absolute = LeaderboardEntry.objects.get(exercise=self.exercise, metric='absolute', user=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            BodyMetric.objects.create(user=user, measured_at=timezone.now() - timedelta(days=1), weight=90)
+        self.assertFalse([q['sql'] for q in queries if 'workouts_loggedset' in q['sql']])
+        entry = LeaderboardEntry.objects.get(exercise=self.exercise, metric='dots', user=user)
+        self.assertEqual(entry.bodyweight, Decimal('90.00'))
+        self.assertEqual(entry.score, leaderboards.score_set(100, 1, 90, 'M')['dots'][0])
+        absolute_after = LeaderboardEntry.objects.get(exercise=self.exercise, metric='absolute', user=user)
+        self.assertEqual((absolute_after.score, absolute_after.bodyweight), (absolute.score, None))
+
+    def test_archived_sets_stay_on_board(self):
+        """
+        Entries backed by archived sets survive weigh-ins and profiles
+        turning private and public again.
+        """
+        user = self.users[0]
+        logged_set = self.log_set(user, 200)
+        session = logged_set.session
+        session.status = 'completed'
+        session.save()
+        archive.archive_sessions([session], timezone.now())
+        self.assertEqual(self.board(), [('lifter0', Decimal('200.00'))])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BodyMetric.objects.create(user=user, measured_at=timezone.now() - timedelta(days=1), weight=90)
+        self.assertEqual(self.board(), [('lifter0', Decimal('200.00'))])
+        entry = LeaderboardEntry.objects.get(exercise=self.exercise, metric='dots', user=user)
+        self.assertEqual(entry.score, leaderboards.score_set(200, 1, 90, 'M')['dots'][0])
+
+        profile = Profile.objects.get(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.is_public = False
+            profile.save()
+        self.assertEqual(self.board(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.is_public = True
+            profile.save()
+        self.assertEqual(self.board(), [('lifter0', Decimal('200.00'))])
+        self.assertEqual(LeaderboardEntry.objects.get(
+            exercise=self.exercise, metric='absolute', user=user
+        ).logged_set_id, logged_set.id)
+
+    def test_leaderboard_endpoint(self):
+        """
+        The endpoint returns ranked, paginated rows and reflects new sets.
+        """
+        url = f'/api/v1/workouts/leaderboards/{self.exercise.id}/'
+        self.log_set(self.users[0], 100)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['rank'], 1)
+
+        self.log_set(self.users[2], 120)
+        response = self.client.get(url)
+        self.assertEqual([r['username'] for r in response.data['results']], ['lifter2', 'lifter0'])
+
+        response = self.client.get(url, {'metric': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PlanAdherenceTestCase(APITestCase):
+    """
+    Test suite for parsed rep targets and the adherence endpoints.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='lifter', email='lifter@example.com', password='SecurePass123'
+        )
+        self.exercise = create_exercise()
+        self.plan = WorkoutPlan.objects.create(owner=self.user, name='Push Day')
+        group = ExerciseGroup.objects.create(workout_plan=self.plan, order=1)
+        self.ranged = PlannedSet.objects.create(
+            group=group, exercise=self.exercise, order=1, target_reps='8-12', target_weight=100
+        )
+        self.exact = PlannedSet.objects.create(group=group, exercise=self.exercise, order=2, target_reps='5')
+        self.session = WorkoutSession.objects.create(owner=self.user, plan=self.plan, status='completed')
+        for order, (planned_set, reps, weight) in enumerate([
+            (self.ranged, 10, 100),  # in range, weight met
+            (self.ranged, 6, 90),    # below, weight missed
+            (self.exact, 7, 50),     # above
+            (None, 10, 50),          # unplanned, ignored
+        ], start=1):
+            LoggedSet.objects.create(
+                session=self.session, exercise=self.exercise, planned_set=planned_set,
+                order=order, actual_reps=reps, actual_weight=weight
+            )
+        self.client.force_authenticate(self.user)
+
+    def test_parse_target_reps(self):
+        """
+        Free-text targets parse into (min, max) ranges.
+        """
+        self.assertEqual(parse_target_reps('8'), (8, 8))
+        self.assertEqual(parse_target_reps(' 12 - 8 '), (8, 12))
+        self.assertEqual(parse_target_reps('10+'), (10, None))
+        self.assertEqual(parse_target_reps('AMRAP'), (None, None))
+        self.assertEqual(parse_target_reps(None), (None, None))
+        self.assertEqual(parse_target_reps('99999999999'), (None, None))
+        self.assertEqual(parse_target_reps('8-99999999999'), (None, None))
+
+    def test_oversized_rep_targets_are_rejected(self):
+        """
+        Rep targets too large for the parsed columns are a 400, not a 500.
+        """
+        response = self.client.post('/api/v1/workouts/plans/', {
+            'name': 'Typo Day',
+            'groups': [{'order': 1, 'sets': [
+                {'exercise': self.exercise.id, 'order': 1, 'target_reps': '99999999999'},
+            ]}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('target_reps', response.data['groups'][0]['sets'][0])
+
+    def test_range_kept_in_sync_on_save(self):
+        """
+        Saving a planned set updates the parsed columns.
+        """
+        self.assertEqual((self.ranged.target_reps_min, self.ranged.target_reps_max), (8, 12))
+        self.ranged.target_reps = '3'
+        self.ranged.save(update_fields=['target_reps'])
+        self.ranged.refresh_from_db()
+        self.assertEqual((self.ranged.target_reps_min, self.ranged.target_reps_max), (3, 3))
+
+    def test_session_adherence(self):
+        """
+        The session endpoint classifies planned sets in one aggregation.
+        """
+        url = f'/api/v1/workouts/sessions/{self.session.id}/adherence/'
+        with self.assertNumQueries(2):  # session lookup, aggregation (IsOwner compares ids)
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sets_logged'], 3)
+        self.assertEqual(response.data['reps_in_range'], 1)
+        self.assertEqual(response.data['reps_below'], 1)
+        self.assertEqual(response.data['reps_above'], 1)
+        self.assertEqual(response.data['weight_targets'], 2)
+        self.assertEqual(response.data['weight_met'], 1)
+
+        # Archived sessions are scored from their blob with the same result
+        archive.archive_sessions([self.session], timezone.now())
+        self.assertEqual(self.client.get(url).data, response.data)
+
+    def test_plan_adherence(self):
+        """
+        The plan endpoint sums per-session counters.
+        """
+        response = self.client.get(f'/api/v1/workouts/plans/{self.plan.id}/adherence/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['sessions']), 1)
+        self.assertEqual(response.data['summary']['rep_targets'], 3)
+        self.assertEqual(response.data['summary']['rep_adherence'], 0.333)
+
+
+class ExerciseUsageTestCase(APITestCase):
+    """
+    Test suite for the per-user exercise usage counters.
+
+    Tests cover:
+    - Incremental updates on logged and planned set writes and deletes
+    - Plan edits only touching the exercises they add or remove
+    - Deletes outside the API
+    - Archived sets staying counted until their session is deleted
+    - The recent and frequent lists
+    - Rebuilding from scratch
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='lifter', email='lifter@example.com', password='SecurePass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.bench = create_exercise('Bench Press')
+        self.squat = create_exercise('Squat')
+        self.row = create_exercise('Barbell Row')
+        self.session = WorkoutSession.objects.create(owner=self.user, status='completed')
+        self.now = timezone.now()
+
+    def log(self, exercise, order, days_ago=0):
+        return LoggedSet.objects.create(
+            session=self.session, exercise=exercise, order=order, actual_reps=5, actual_weight=100,
+            completed_at=self.now - timedelta(days=days_ago),
+        )
+
+    def counters(self, exercise):
+        return ExerciseUsage.objects.filter(user=self.user, exercise=exercise).values_list(
+            'logged_sets', 'planned_sets', 'use_count'
+        ).first()
+
+    def test_logged_sets_are_counted(self):
+        """
+        Creating, moving and deleting sets adjusts the counters.
+        """
+        first = self.log(self.bench, 1)
+        self.log(self.bench, 2)
+        self.assertEqual(self.counters(self.bench), (2, 0, 2))
+
+        first.exercise = self.squat
+        first.save()
+        self.assertEqual(self.counters(self.bench), (1, 0, 1))
+        self.assertEqual(self.counters(self.squat), (1, 0, 1))
+
+        self.client.delete(f'/api/v1/workouts/logged-sets/{first.pk}/')
+        self.assertEqual(self.counters(self.squat), (0, 0, 0))
+
+    def test_planned_sets_are_counted(self):
+        """
+        Sets in the user's plans count too, including plans edited through the API.
+        """
+        response = self.client.post('/api/v1/workouts/plans/', {
+            'name': 'Push Day',
+            'groups': [{'order': 1, 'sets': [
+                {'exercise': self.bench.id, 'order': 1, 'target_reps': '5'},
+                {'exercise': self.bench.id, 'order': 2, 'target_reps': '5'},
+            ]}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.counters(self.bench), (0, 2, 2))
+
+        self.client.delete(f"/api/v1/workouts/plans/{response.data['id']}/")
+        self.assertEqual(self.counters(self.bench), (0, 0, 0))
+
+    def test_deletes_outside_the_api_are_counted(self):
+        """
+        Sets and plans deleted directly (admin, shell, queryset deletes)
+        adjust the counters too.
+        """
+        first = self.log(self.bench, 1)
+        self.log(self.bench, 2)
+        LoggedSet.objects.filter(pk=first.pk).delete()
+        self.assertEqual(self.counters(self.bench), (1, 0, 1))
+
+        response = self.client.post('/api/v1/workouts/plans/', {
+            'name': 'Leg Day',
+            'groups': [{'order': 1, 'sets': [
+                {'exercise': self.squat.id, 'order': order, 'target_reps': '5'} for order in (1, 2, 3)
+            ]}],
+        }, format='json')
+        self.assertEqual(self.counters(self.squat), (0, 3, 3))
+        PlannedSet.objects.filter(exercise=self.squat, order=1).delete()
+        self.assertEqual(self.counters(self.squat), (0, 2, 2))
+        WorkoutPlan.objects.get(pk=response.data['id']).delete()
+        self.assertEqual(self.counters(self.squat), (0, 0, 0))
+
+    def test_plan_edits_only_touch_changed_exercises(self):
+        """
+        Saving a plan applies the difference to the counters; exercises
+        that kept their sets aren't marked as used again.
+        """
+        def plan(*exercises):
+            return {'name': 'Push Day', 'groups': [{'order': 1, 'sets': [
+                {'exercise': exercise.id, 'order': order, 'target_reps': '5'}
+                for order, exercise in enumerate(exercises, start=1)
+            ]}]}
+
+        response = self.client.post('/api/v1/workouts/plans/', plan(self.bench, self.bench, self.squat), format='json')
+        url = f"/api/v1/workouts/plans/{response.data['id']}/"
+        ExerciseUsage.objects.update(last_used_at=self.now - timedelta(days=7))
+
+        response = self.client.put(url, plan(self.bench, self.bench, self.row), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['groups'][0]['sets']), 3)
+        self.assertEqual(self.counters(self.bench), (0, 2, 2))
+        self.assertEqual(self.counters(self.squat), (0, 0, 0))
+        self.assertEqual(self.counters(self.row), (0, 1, 1))
+        last_used = dict(ExerciseUsage.objects.values_list('exercise_id', 'last_used_at'))
+        self.assertEqual(last_used[self.bench.id], self.now - timedelta(days=7))
+        self.assertGreater(last_used[self.row.id], self.now)
+        self.assertEqual(PlannedSet.objects.get(exercise=self.row).target_reps_max, 5)
+
+    def test_archived_sets_stay_counted(self):
+        """
+        Archival doesn't change the counters; deleting the session does.
+        """
+        self.log(self.bench, 1)
+        self.log(self.bench, 2)
+        archive.archive_sessions([self.session], timezone.now())
+        self.assertEqual(self.counters(self.bench), (2, 0, 2))
+        self.assertEqual(usage.rebuild([self.user.id]), 1)
+        self.assertEqual(self.counters(self.bench), (2, 0, 2))
+
+        WorkoutSession.objects.get(pk=self.session.pk).delete()
+        self.assertEqual(self.counters(self.bench), (0, 0, 0))
+
+    def test_recent_and_frequent_lists(self):
+        """
+        Both lists are a single query, ordered by last use or by count.
+        """
+        self.log(self.squat, 1, days_ago=3)
+        self.log(self.squat, 2, days_ago=3)
+        self.log(self.row, 3, days_ago=2)
+        self.log(self.bench, 4, days_ago=1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/workouts/exercises/recent/')
+        self.assertEqual([e['exercise']['name'] for e in response.data], ['Bench Press', 'Barbell Row', 'Squat'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/workouts/exercises/frequent/', {'limit': 2})
+        self.assertEqual([e['exercise']['name'] for e in response.data], ['Squat', 'Bench Press'])
+        self.assertEqual(response.data[0]['use_count'], 2)
+
+    def test_rebuild_matches_incremental_counters(self):
+        """
+        A full rebuild produces the same counters as the incremental updates.
+        """
+        self.log(self.squat, 1)
+        self.log(self.row, 2)
+        self.client.delete(f'/api/v1/workouts/logged-sets/{self.log(self.row, 3).pk}/')
+        expected = sorted(ExerciseUsage.objects.filter(use_count__gt=0).values_list(
+            'exercise_id', 'logged_sets', 'planned_sets', 'use_count'
+        ))
+        call_command('rebuild_exercise_usage', stdout=StringIO())
+        self.assertEqual(sorted(ExerciseUsage.objects.values_list(
+            'exercise_id', 'logged_sets', 'planned_sets', 'use_count'
+        )), expected)
+
+
+class StaleCatalogTestCase(APITransactionTestCase):
+    """
+    Test suite for writes naming an exercise deleted after this worker's
+    exercise catalog was built. A transaction test case, since the foreign
+    keys are only checked on commit.
+
+    Tests cover:
+    - Plans and logged sets are rejected with a 400 and nothing is saved
+    """
+
+    def test_deleted_exercise_is_a_validation_error(self):
+        """
+        The stale catalog accepts the id; the failed foreign key check turns
+        into a validation error.
+        """
+        user = User.objects.create_user(username='lifter', email='lifter@example.com', password='SecurePass123')
+        self.client.force_authenticate(user)
+        squat = create_exercise('Squat')
+        deleted = create_exercise('Bench Press')
+        stale = catalog.get_catalog()
+        Exercise.objects.filter(pk=deleted.pk).delete()
+        session = WorkoutSession.objects.create(owner=user)
+
+        with mock.patch('exercises.catalog.get_catalog', return_value=stale):
+            response = self.client.post('/api/v1/workouts/plans/', {
+                'name': 'Push Day',
+                'groups': [{'order': 1, 'sets': [
+                    {'exercise': squat.pk, 'order': 1, 'target_reps': '5'},
+                    {'exercise': deleted.pk, 'order': 2, 'target_reps': '5'},
+                ]}],
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(str(deleted.pk), response.data['exercise'][0])
+
+            response = self.client.post('/api/v1/workouts/logged-sets/', {
+                'session_id': session.pk, 'exercise': deleted.pk, 'order': 1, 'actual_reps': 5, 'actual_weight': '100.00',
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(WorkoutPlan.objects.exists())
+        self.assertFalse(LoggedSet.objects.exists())
+        self.assertFalse(ExerciseUsage.objects.exists())
+
+
+class FakeDataBenchmarkTestCase(APITestCase):
+    """
+    Test suite for generate_fake_data and bench_api.
+
+    Tests cover:
+    - Generated users have profiles, plans, weigh-ins and history
+    - At most one session in progress per user, sets in order
+    - Derived data (usage counters, leaderboards) is rebuilt
+    - The same seed generates the same data
+    - Benchmark results are saved and compared
+    """
+
+    def setUp(self):
+        for name in ['Bench Press', 'Squat', 'Deadlift', 'Overhead Press', 'Barbell Row', 'Pull Up']:
+            create_exercise(name)
+
+    def generate(self, **options):
+        options = {'users': 4, 'years': 0.3, 'public_share': 0.5, 'seed': 1, 'stdout': StringIO(), **options}
+        call_command('generate_fake_data', **options)
+
+    def test_generate(self):
+        """
+        Users come with a full, consistent history and derived data.
+        """
+        self.generate()
+        users = User.objects.filter(username__startswith=fake_data.USERNAME_PREFIX)
+        self.assertEqual(users.count(), 4)
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 4)
+        self.assertTrue(all(user.email_verified for user in users))
+        self.assertTrue(WorkoutPlan.objects.filter(owner__in=users).exists())
+        self.assertTrue(BodyMetric.objects.filter(user__in=users).exists())
+
+        sessions = WorkoutSession.objects.filter(owner__in=users)
+        self.assertGreater(sessions.count(), 4)
+        self.assertLess(sessions.order_by('date_started').first().date_started, timezone.now() - timedelta(days=30))
+        for user in users:
+            self.assertLessEqual(sessions.filter(owner=user, status='in_progress').count(), 1)
+        session = sessions.filter(status='completed').annotate(n=models.Count('logged_sets')).filter(n__gt=1).first()
+        orders = list(session.logged_sets.values_list('order', flat=True))
+        self.assertEqual(orders, list(range(1, len(orders) + 1)))
+
+        logged = LoggedSet.objects.filter(session__owner__in=users).count()
+        self.assertEqual(
+            sum(ExerciseUsage.objects.filter(user__in=users).values_list('logged_sets', flat=True)), logged
+        )
+        public = set(Profile.objects.filter(user__in=users, is_public=True).values_list('user_id', flat=True))
+        entries = set(LeaderboardEntry.objects.values_list('user_id', flat=True))
+        self.assertTrue(entries)
+        self.assertLessEqual(entries, public)
+
+        # Another run adds users after the existing ones
+        self.generate(users=1)
+        self.assertTrue(users.filter(username=f'{fake_data.USERNAME_PREFIX}000004').exists())
+
+    def test_seed(self):
+        """
+        The seed alone determines the generated data.
+        """
+        def snapshot():
+            return list(LoggedSet.objects.order_by('id').values_list('exercise__name', 'actual_reps', 'actual_weight'))
+
+        self.generate(users=2)
+        first = snapshot()
+        User.objects.filter(username__startswith=fake_data.USERNAME_PREFIX).delete()
+        self.generate(users=2)
+        self.assertEqual(snapshot(), first)
+
+    def test_bench_api(self):
+        """
+        Every endpoint is timed; writes are rolled back; results are
+        saved and compared with the latest run.
+        """
+        self.generate(users=2)
+        sets = LoggedSet.objects.count()
+        with tempfile.TemporaryDirectory() as results_dir, override_settings(BENCHMARK_RESULTS_DIR=results_dir):
+            call_command('bench_api', iterations=2, label='first', stdout=StringIO())
+            output = StringIO()
+            call_command('bench_api', iterations=2, compare='latest', stdout=output)
+            files = sorted(Path(results_dir).glob('*.json'))
+            self.assertGreaterEqual(len(files), 1)
+            result = json.loads(files[0].read_text())
+
+        self.assertEqual(LoggedSet.objects.count(), sets)
+        self.assertEqual(result['iterations'], 2)
+        self.assertEqual(
+            set(result['endpoints']),
+            {'sessions: list', 'sessions: active', 'sessions: detail', 'logged sets: create',
+             'plans: update', 'exercises: search', 'exercises: autocomplete'},
+        )
+        self.assertIn('p95_ms', result['endpoints']['sessions: list'])
+        self.assertIn('Compared with', output.getvalue())
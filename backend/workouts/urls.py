@@ -9,5 +9,8 @@ router.register(r'sessions', views.WorkoutSessionViewSet, basename='workoutsessi
 router.register(r'logged-sets', views.LoggedSetViewSet, basename='loggedset')
 
 urlpatterns = [
+    path('leaderboards/<int:exercise_id>/', views.LeaderboardView.as_view(), name='leaderboard'),
+    path('exercises/recent/', views.ExerciseUsageView.as_view(ordering='recent'), name='exercise-usage-recent'),
+    path('exercises/frequent/', views.ExerciseUsageView.as_view(ordering='frequent'), name='exercise-usage-frequent'),
     path('', include(router.urls)),
 ]
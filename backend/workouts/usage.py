@@ -0,0 +1,149 @@
+"""
+Per-user exercise usage counters (ExerciseUsage).
+
+The counters are adjusted once per write, so the "recent" and "frequent"
+exercise lists never aggregate over workout history:
+
+- a saved LoggedSet adds one use (a post_save receiver, see
+  workouts/signals.py), a deleted one is subtracted by LoggedSetViewSet
+  and a deleted session subtracts all of its sets at once,
+- plan writes apply the difference between the plan's sets before and
+  after the write (`record_changes`, see WorkoutPlanSerializer), so
+  editing a plan only touches the exercises that were added or removed.
+
+Decrements don't move last_used_at back.
+
+Sets moved into an archive blob (workouts/archive.py) keep counting; they
+are only subtracted when their session is deleted. `rebuild` recomputes
+everything from scratch, including archived sets.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from exercises import autocomplete
+from exercises.models import Exercise
+from .models import ExerciseUsage, LoggedSet, PlannedSet, WorkoutSession
+from . import archive
+
+
+def record(user_id, exercise_id, logged=0, planned=0, used_at=None):
+    """Add (or with negative numbers, subtract) uses of an exercise."""
+    _record(user_id, exercise_id, logged, planned, used_at)
+    autocomplete.forget_usage(user_id)
+
+
+def record_changes(user_id, before=(), after=(), kind='planned', used_at=None):
+    """
+    Apply the difference between the exercise ids of a user's sets before
+    and after a write (`kind` is 'planned' or 'logged'), with one update
+    per exercise whose count changed. Only exercises that gained sets are
+    marked as used at `used_at`.
+    """
+    delta = Counter(after)
+    delta.subtract(Counter(before))
+    changed = {exercise_id: count for exercise_id, count in delta.items() if count}
+    for exercise_id, count in changed.items():
+        _record(user_id, exercise_id, used_at=used_at if count > 0 else None, **{kind: count})
+    if changed:
+        autocomplete.forget_usage(user_id)
+
+
+def _record(user_id, exercise_id, logged=0, planned=0, used_at=None):
+    updates = {
+        'logged_sets': Greatest(F('logged_sets') + logged, Value(0)),
+        'planned_sets': Greatest(F('planned_sets') + planned, Value(0)),
+        'use_count': Greatest(F('logged_sets') + F('planned_sets') + logged + planned, Value(0)),
+    }
+    if used_at is not None:
+        updates['last_used_at'] = Greatest(Coalesce('last_used_at', Value(used_at)), Value(used_at))
+
+    usage = ExerciseUsage.objects.filter(user_id=user_id, exercise_id=exercise_id)
+    if not usage.update(**updates) and logged + planned > 0:
+        try:
+            with transaction.atomic():
+                ExerciseUsage.objects.create(
+                    user_id=user_id, exercise_id=exercise_id, logged_sets=logged,
+                    planned_sets=planned, use_count=logged + planned, last_used_at=used_at,
+                )
+        except IntegrityError:
+            # Created concurrently; add to that row instead
+            usage.update(**updates)
+
+
+def recent(user, limit):
+    """The user's most recently used exercises."""
+    return ExerciseUsage.objects.filter(
+        user=user, last_used_at__isnull=False
+    ).select_related('exercise__equipment').order_by('-last_used_at')[:limit]
+
+
+def frequent(user, limit):
+    """The user's most used exercises."""
+    return ExerciseUsage.objects.filter(
+        user=user, use_count__gt=0
+    ).select_related('exercise__equipment').order_by('-use_count', '-last_used_at')[:limit]
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """
+    Recompute the counters of the given users (or everyone) from live
+    sets, archived sets and plans. Returns the number of rows written.
+    """
+    counters = defaultdict(lambda: {'logged_sets': 0, 'planned_sets': 0, 'last_used_at': None})
+
+    def touch(key, used_at):
+        current = counters[key]['last_used_at']
+        if used_at is not None and (current is None or used_at > current):
+            counters[key]['last_used_at'] = used_at
+
+    logged = LoggedSet.objects.all()
+    planned = PlannedSet.objects.all()
+    sessions = WorkoutSession.objects.filter(archived_sets__isnull=False)
+    usage = ExerciseUsage.objects.all()
+    if user_ids is not None:
+        logged = logged.filter(session__owner_id__in=user_ids)
+        planned = planned.filter(group__workout_plan__owner_id__in=user_ids)
+        sessions = sessions.filter(owner_id__in=user_ids)
+        usage = usage.filter(user_id__in=user_ids)
+
+    for row in logged.order_by().values('session__owner_id', 'exercise_id').annotate(
+        count=Count('id'), last=Max('completed_at')
+    ):
+        key = (row['session__owner_id'], row['exercise_id'])
+        counters[key]['logged_sets'] += row['count']
+        touch(key, row['last'])
+
+    for row in planned.order_by().values('group__workout_plan__owner_id', 'exercise_id').annotate(
+        count=Count('id'), last=Max('group__workout_plan__updated_at')
+    ):
+        key = (row['group__workout_plan__owner_id'], row['exercise_id'])
+        counters[key]['planned_sets'] += row['count']
+        touch(key, row['last'])
+
+    for session in sessions.only('owner_id', 'archived_sets').iterator():
+        for row in archive.unpack_rows(session.archived_sets):
+            key = (session.owner_id, row['exercise_id'])
+            counters[key]['logged_sets'] += 1
+            touch(key, row['completed_at'])
+
+    # Archived sets may reference exercises deleted since
+    existing = set(Exercise.objects.filter(id__in={key[1] for key in counters}).values_list('id', flat=True))
+
+    usage.delete()
+    rows = [
+        ExerciseUsage(
+            user_id=user_id, exercise_id=exercise_id, use_count=values['logged_sets'] + values['planned_sets'],
+            **values,
+        )
+        for (user_id, exercise_id), values in counters.items()
+        if exercise_id in existing
+    ]
+    ExerciseUsage.objects.bulk_create(rows, batch_size=1000)
+    for user_id in {user_id for user_id, _ in counters}:
+        autocomplete.forget_usage(user_id)
+    return len(rows)
@@ -3,17 +3,24 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
 from django.db import transaction, IntegrityError
+from django.db.models import Count
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework.exceptions import ValidationError
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import WorkoutPlan, ExerciseGroup, PlannedSet, WorkoutSession, LoggedSet
+from monitoring.timing import SerializerTimingMixin
+from .models import WorkoutPlan, ExerciseGroup, PlannedSet, WorkoutSession, LoggedSet, LeaderboardEntry
 from .serializers import (
     WorkoutPlanSerializer, 
     WorkoutSessionSerializer,
     WorkoutSessionListSerializer,
-    LoggedSetSerializer
+    LoggedSetSerializer,
+    LeaderboardEntrySerializer,
+    ExerciseUsageSerializer
 )
+from . import adherence, leaderboards, usage
 
 User = get_user_model()
 
@@ -23,14 +30,25 @@ class IsOwner(permissions.BasePermission):
     Custom permission to only allow owners of an object to view or edit it.
     """
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'owner'):
-            return obj.owner == request.user
+        # Compare ids, so checking doesn't load the owner
+        if hasattr(obj, 'owner_id'):
+            return obj.owner_id == request.user.id
         if hasattr(obj, 'session'):
-            return obj.session.owner == request.user
+            return obj.session.owner_id == request.user.id
         return False
 
+
+def with_session_details(queryset):
+    """Load everything WorkoutSessionSerializer reads, in a fixed number of queries."""
+    return queryset.select_related('owner', 'plan__owner').prefetch_related('logged_sets', 'plan__groups__sets')
+
+
+def with_session_summary(queryset):
+    """Load everything WorkoutSessionListSerializer reads, in one query."""
+    return queryset.select_related('owner', 'plan').annotate(set_count=Count('logged_sets'))
+
 # Workout Plan ViewSet
-class WorkoutPlanViewSet(viewsets.ModelViewSet):
+class WorkoutPlanViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows users to create, view, edit, and delete
     their personal workout plans.
@@ -39,15 +57,30 @@ class WorkoutPlanViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
     def get_queryset(self):
-        return WorkoutPlan.objects.filter(owner=self.request.user).prefetch_related(
-            'groups__sets'
-        )
+        queryset = WorkoutPlan.objects.filter(owner=self.request.user)
+        if self.action == 'adherence':
+            return queryset
+        return queryset.select_related('owner').prefetch_related('groups__sets')
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def adherence(self, request, pk=None):
+        """
+        Compare logged sets to their planned targets across all sessions
+        of this plan (cancelled sessions are ignored).
+        """
+        plan = self.get_object()
+        sessions = WorkoutSession.objects.filter(
+            owner=request.user, plan=plan
+        ).exclude(status='cancelled').only(
+            'id', 'date_started', 'archived_sets', 'archived_at'
+        ).order_by('-date_started')
+        return Response(adherence.plan_adherence(sessions))
+
 # Workout Session ViewSet
-class WorkoutSessionViewSet(viewsets.ModelViewSet):
+class WorkoutSessionViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """
     API endpoint for workout sessions with active session support.
     """
@@ -69,10 +102,12 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         return WorkoutSessionSerializer
     
     def get_queryset(self):
-        return WorkoutSession.objects.filter(owner=self.request.user).prefetch_related(
-            'logged_sets__exercise',
-            'plan__groups__sets__exercise'
-        ).order_by('-date_started')
+        queryset = WorkoutSession.objects.filter(owner=self.request.user)
+        if self.action == 'adherence':
+            return queryset
+        if self.action == 'list':
+            return with_session_summary(queryset).order_by('-date_started')
+        return with_session_details(queryset).order_by('-date_started')
 
     def perform_create(self, serializer):
         """
@@ -110,13 +145,10 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         Get the current active (in_progress) session for the user.
         Returns 404 if no active session exists.
         """
-        active_session = WorkoutSession.objects.filter(
+        active_session = with_session_details(WorkoutSession.objects.filter(
             owner=request.user,
             status='in_progress'
-        ).prefetch_related(
-            'logged_sets__exercise',
-            'plan__groups__sets__exercise'
-        ).first()
+        )).first()
         
         if not active_session:
             return Response(
@@ -132,8 +164,8 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         """
         Get completed workout sessions for a specific user (only if their profile is public).
         """
-        # Use case-insensitive lookup for username
-        user = get_object_or_404(User, username__iexact=username)
+        # Case-insensitive lookup for username, served by its LOWER() index
+        user = get_object_or_404(User.objects.filter_username(username).select_related('profile'))
 
         # Check if the user's profile is public
         if not hasattr(user, 'profile') or not user.profile.is_public:
@@ -143,12 +175,9 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
             )
         
         # Build a new queryset from scratch, ignoring the default get_queryset()
-        queryset = WorkoutSession.objects.filter(
+        queryset = with_session_summary(WorkoutSession.objects.filter(
             owner=user,
-        ).prefetch_related(
-            'logged_sets__exercise',
-            'plan__groups__sets__exercise'
-        ).order_by('-date_started')
+        )).order_by('-date_started')
 
         
         # Paginate the results
@@ -166,10 +195,7 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         Get the details of a single workout session, if the owner's profile is public.
         """
         session = get_object_or_404(
-            WorkoutSession.objects.prefetch_related(
-                'logged_sets__exercise',
-                'plan__groups__sets__exercise'
-            ),
+            with_session_details(WorkoutSession.objects.select_related('owner__profile')),
             pk=pk
         )
 
@@ -183,6 +209,14 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(session)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def adherence(self, request, pk=None):
+        """
+        Compare the session's logged sets to their planned targets.
+        """
+        session = self.get_object()
+        return Response({'session': session.id, **adherence.session_adherence(session)})
+
     @action(detail=True, methods=['patch'])
     def update_progress(self, request, pk=None):
         """
@@ -250,15 +284,16 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class LoggedSetViewSet(viewsets.ModelViewSet):
+class LoggedSetViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """
     API endpoint for logging individual sets.
     """
     serializer_class = LoggedSetSerializer
+    throttle_scope = 'logged_sets'
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
     def get_queryset(self):
-        return LoggedSet.objects.filter(session__owner=self.request.user)
+        return LoggedSet.objects.filter(session__owner=self.request.user).select_related('session')
 
     def create(self, request, *args, **kwargs):
         """
@@ -270,7 +305,8 @@ class LoggedSetViewSet(viewsets.ModelViewSet):
         # Find the session
         session_id = request.data.get('session_id')
         try:
-            session = WorkoutSession.objects.get(
+            # The owner's profile decides whether the set goes to the leaderboards
+            session = WorkoutSession.objects.select_related('owner__profile').get(
                 id=session_id,
                 owner=request.user,
                 status='in_progress'
@@ -295,4 +331,59 @@ class LoggedSetViewSet(viewsets.ModelViewSet):
         session.save()
         
         headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class LeaderboardView(SerializerTimingMixin, generics.GenericAPIView):
+    """
+    Top-K leaderboard of an exercise among public profiles.
+    Query params: metric (absolute, dots or wilks; default absolute), page.
+    """
+    serializer_class = LeaderboardEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, exercise_id):
+        metric = request.query_params.get('metric', leaderboards.ABSOLUTE)
+        if metric not in leaderboards.METRICS:
+            return Response(
+                {'error': f"Unknown metric. Choose one of: {', '.join(leaderboards.METRICS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Boards are bounded to K rows, so the whole ranked board is rendered
+        # once per board version and paginated from the cached list.
+        cache_key = leaderboards.board_cache_key(exercise_id, metric)
+        board = cache.get(cache_key)
+        if board is None:
+            entries = LeaderboardEntry.objects.filter(
+                exercise_id=exercise_id, metric=metric
+            ).select_related('user').order_by('-score', 'achieved_at')
+            board = [
+                {'rank': rank, **row}
+                for rank, row in enumerate(self.get_serializer(entries, many=True).data, start=1)
+            ]
+            cache.set(cache_key, board, settings.LEADERBOARD_CACHE_TIMEOUT)
+
+        page = self.paginate_queryset(board)
+        return self.get_paginated_response(page)
+
+
+class ExerciseUsageView(SerializerTimingMixin, generics.ListAPIView):
+    """
+    The current user's exercises, either most recently used (`recent`) or
+    most used (`frequent`), counting logged and planned sets.
+    Query params: limit (default 30).
+    """
+    serializer_class = ExerciseUsageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+    ordering = 'recent'
+
+    def get_queryset(self):
+        try:
+            limit = int(self.request.query_params.get('limit', 30))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected a number.'})
+        limit = min(max(limit, 1), settings.EXERCISE_USAGE_LIST_MAX)
+        lookup = usage.recent if self.ordering == 'recent' else usage.frequent
+        return lookup(self.request.user, limit)
@@ -52,14 +52,100 @@ export const getExerciseById = (id: string): Promise<Exercise> => {
         .then((response: AxiosResponse<Exercise>) => response.data);
 };
 
+// Maximum number of ids the batch endpoint accepts per request
+const BATCH_SIZE = 200;
+
 /**
  * Fetches multiple exercises by their IDs.
+ * Uses the unpaginated batch endpoint, split into chunks of BATCH_SIZE ids.
+ * Unknown IDs are skipped; the result keeps the order of `ids`.
  * @param ids Array of exercise IDs to fetch.
  */
-export const getExercisesByIds = (ids: number[]): Promise<Exercise[]> => {
-    if (ids.length === 0) return Promise.resolve([]);
+export const getExercisesByIds = async (ids: number[]): Promise<Exercise[]> => {
+    const uniqueIds = Array.from(new Set(ids));
+    if (uniqueIds.length === 0) return [];
+
+    const chunks: number[][] = [];
+    for (let i = 0; i < uniqueIds.length; i += BATCH_SIZE) {
+        chunks.push(uniqueIds.slice(i, i + BATCH_SIZE));
+    }
+    const responses = await Promise.all(
+        chunks.map(chunk =>
+            apiClient.get<Record<string, Exercise>>(`/exercises/batch/?ids=${chunk.join(',')}`)
+        )
+    );
+    const byId: Record<string, Exercise> = Object.assign({}, ...responses.map(response => response.data));
+    return uniqueIds
+        .map(id => byId[id])
+        .filter((exercise): exercise is Exercise => exercise !== undefined);
+};
+
+// Counts per facet value; the total is under `count`
+export interface ExerciseFacets {
+    count: number;
+    category: Record<string, number>;
+    equipment: Record<string, number>;
+    level: Record<string, number>;
+    force: Record<string, number>;
+    mechanic: Record<string, number>;
+    primary_muscles: Record<string, number>;
+}
+
+/**
+ * Fetches facet counts for the given filters (same filters as getExercises).
+ * Each facet is counted without its own filter applied.
+ * @param filters Optional filters object.
+ */
+export const getExerciseFacets = (
+    filters?: { [key: string]: string | undefined }
+): Promise<ExerciseFacets> => {
+    const params = new URLSearchParams();
+    if (filters) {
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value) params.append(key, value);
+        });
+    }
+    return apiClient.get<ExerciseFacets>(`/exercises/facets/?${params.toString()}`)
+        .then((response: AxiosResponse<ExerciseFacets>) => response.data);
+};
+
+// An alternative exercise with its similarity to the original (0-1)
+export interface ExerciseAlternative extends Exercise {
+    similarity: number;
+}
+
+/**
+ * Fetches substitutes for an exercise, most similar first.
+ * @param id The ID of the exercise to replace.
+ * @param k Number of alternatives to return.
+ * @param equipment Optional list of available equipment names.
+ */
+export const getExerciseAlternatives = (
+    id: number,
+    k = 10,
+    equipment?: string[]
+): Promise<ExerciseAlternative[]> => {
+    const params = new URLSearchParams({ k: k.toString() });
+    if (equipment) params.append('equipment', equipment.join(','));
+    return apiClient.get<ExerciseAlternative[]>(`/exercises/${id}/alternatives/?${params.toString()}`)
+        .then((response: AxiosResponse<ExerciseAlternative[]>) => response.data);
+};
 
-    const idString = ids.join(',');
-    return apiClient.get<PaginatedResponse<Exercise>>(`/exercises/?id_in=${idString}&page_size=1000`)
-        .then((response: AxiosResponse<PaginatedResponse<Exercise>>) => response.data.results);
-};
\ No newline at end of file
+// Minimal exercise entry returned by the autocomplete endpoint
+export interface ExerciseSuggestion {
+    id: number;
+    name: string;
+    equipment: string | null;
+}
+
+/**
+ * Fetches exercises whose name starts with the given text, the user's most
+ * used exercises first.
+ * @param query The text typed so far.
+ * @param limit Maximum number of suggestions.
+ */
+export const getExerciseSuggestions = (query: string, limit = 10): Promise<ExerciseSuggestion[]> => {
+    const params = new URLSearchParams({ q: query, limit: limit.toString() });
+    return apiClient.get<ExerciseSuggestion[]>(`/exercises/autocomplete/?${params.toString()}`)
+        .then((response: AxiosResponse<ExerciseSuggestion[]>) => response.data);
+};
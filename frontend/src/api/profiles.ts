@@ -35,8 +35,78 @@ export const updateMyProfile = (data: Partial<Profile>): Promise<Profile> => {
     return apiClient.patch('/profiles/me/', data).then(res => res.data);
 };
 
-export const getPublicProfiles = (): Promise<PublicProfile[]> => {
-    return apiClient.get('/profiles/').then(res => res.data);
+// One weigh-in of the current user; the profile mirrors the latest values
+export interface BodyMetric {
+    id: number;
+    measured_at: string;
+    weight: string | null;
+    body_fat_percentage: string | null;
+}
+
+export interface BodyMetricPage {
+    count: number;
+    next: string | null;
+    previous: string | null;
+    results: BodyMetric[];
+}
+
+export const getBodyMetrics = (page: number = 1): Promise<BodyMetricPage> => {
+    return apiClient.get('/profiles/me/body-metrics/', { params: { page } }).then(res => res.data);
+};
+
+export const logBodyMetric = (
+    data: Partial<Pick<BodyMetric, 'measured_at' | 'weight' | 'body_fat_percentage'>>
+): Promise<BodyMetric> => {
+    return apiClient.post('/profiles/me/body-metrics/', data).then(res => res.data);
+};
+
+export const deleteBodyMetric = (id: number): Promise<void> => {
+    return apiClient.delete(`/profiles/me/body-metrics/${id}/`);
+};
+
+// Downsampled history for charts: `count` logged values, `points` to draw
+export interface BodyMetricSeries {
+    metric: 'weight' | 'body_fat_percentage';
+    method: 'lttb' | 'minmax';
+    count: number;
+    points: [string, number][];
+}
+
+/**
+ * Fetches the current user's weight or body fat history over a range,
+ * reduced on the server to at most `points` points.
+ * @param from Optional start (ISO date or datetime, inclusive).
+ * @param to Optional end (ISO date or datetime, inclusive).
+ */
+export const getBodyMetricSeries = (
+    metric: BodyMetricSeries['metric'] = 'weight',
+    { from, to, points = 300, method = 'lttb' }: {
+        from?: string; to?: string; points?: number; method?: BodyMetricSeries['method'];
+    } = {}
+): Promise<BodyMetricSeries> => {
+    const params: Record<string, string | number> = { metric, points, method };
+    if (from) params.from = from;
+    if (to) params.to = to;
+    return apiClient.get('/profiles/me/body-metrics/series/', { params }).then(res => res.data);
+};
+
+// Cursor-paginated page of the public profile directory
+export interface PublicProfilePage {
+    next: string | null;
+    previous: string | null;
+    results: PublicProfile[];
+}
+
+/**
+ * Fetches a page of public profiles, newest members first.
+ * @param search Optional username prefix.
+ * @param cursorUrl The `next` URL of a previous page, to continue from it.
+ */
+export const getPublicProfiles = (search?: string, cursorUrl?: string | null): Promise<PublicProfilePage> => {
+    if (cursorUrl) {
+        return apiClient.get(cursorUrl).then(res => res.data);
+    }
+    return apiClient.get('/profiles/', { params: search ? { search } : {} }).then(res => res.data);
 };
 
 export const getPublicProfileByUsername = (username: string): Promise<PublicProfile> => {
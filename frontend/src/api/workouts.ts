@@ -168,4 +168,21 @@ export const updateLoggedSet = (
 
 export const deleteLoggedSet = (setId: number): Promise<void> => {
     return apiClient.delete(`${API_URL}logged-sets/${setId}/`).then(res => res.data);
-};
\ No newline at end of file
+};
+// --- Exercise usage ---
+
+export interface ExerciseUsage {
+    exercise: { id: number; name: string; equipment: string | null };
+    logged_sets: number;
+    planned_sets: number;
+    use_count: number;
+    last_used_at: string | null;
+}
+
+export const getRecentExercises = (limit = 30): Promise<ExerciseUsage[]> => {
+    return apiClient.get(`${API_URL}exercises/recent/`, { params: { limit } }).then(res => res.data);
+};
+
+export const getFrequentExercises = (limit = 30): Promise<ExerciseUsage[]> => {
+    return apiClient.get(`${API_URL}exercises/frequent/`, { params: { limit } }).then(res => res.data);
+};
@@ -1,8 +1,9 @@
 // frontend/src/components/workouts/ExerciseSelector.tsx
 
 import { useState, useEffect } from 'react';
-import type { Exercise } from '@/api/exercises';
-import { getExercises } from '@/api/exercises';
+import type { Exercise, ExerciseSuggestion } from '@/api/exercises';
+import { getExerciseById, getExerciseSuggestions } from '@/api/exercises';
+import { getRecentExercises } from '@/api/workouts';
 import { Spinner } from '@/components/common/Spinner';
 
 interface ExerciseSelectorProps {
@@ -10,30 +11,35 @@ interface ExerciseSelectorProps {
 }
 
 export function ExerciseSelector({ onSelect }: ExerciseSelectorProps) {
-    const [exercises, setExercises] = useState<Exercise[]>([]);
+    const [suggestions, setSuggestions] = useState<ExerciseSuggestion[]>([]);
     const [isLoading, setIsLoading] = useState(false);
     const [error, setError] = useState('');
     const [searchTerm, setSearchTerm] = useState('');
-    const [currentPage, setCurrentPage] = useState(1);
-    const [totalPages, setTotalPages] = useState(0);
     const [hasSearched, setHasSearched] = useState(false);
+    const [recent, setRecent] = useState<ExerciseSuggestion[]>([]);
 
-    // Debounced search function
+    // Recently used exercises, shown until the user starts typing
+    useEffect(() => {
+        getRecentExercises(10)
+            .then(data => setRecent(data.map(usage => usage.exercise)))
+            .catch(() => setRecent([]));
+    }, []);
+
+    // Debounced autocomplete; the endpoint is cheap, so a short delay is enough
     useEffect(() => {
         // Don't search on mount, only when user types
         if (!hasSearched && searchTerm === '') return;
 
         const timeoutId = setTimeout(() => {
             performSearch();
-        }, 500); // Wait 500ms after user stops typing
+        }, 150);
 
         return () => clearTimeout(timeoutId);
-    }, [searchTerm, currentPage]);
+    }, [searchTerm]);
 
     const performSearch = async () => {
         if (searchTerm.trim().length < 2) {
-            setExercises([]);
-            setTotalPages(0);
+            setSuggestions([]);
             return;
         }
 
@@ -42,13 +48,7 @@ export function ExerciseSelector({ onSelect }: ExerciseSelectorProps) {
         setHasSearched(true);
 
         try {
-            const filters: { [key: string]: string } = {
-                name: searchTerm.trim()
-            };
-
-            const data = await getExercises(currentPage, filters);
-            setExercises(data.results);
-            setTotalPages(Math.ceil(data.count / 10)); // Assuming 10 per page
+            setSuggestions(await getExerciseSuggestions(searchTerm.trim(), 20));
         } catch (err) {
             console.error('Failed to search exercises:', err);
             setError('Failed to search exercises');
@@ -59,12 +59,16 @@ export function ExerciseSelector({ onSelect }: ExerciseSelectorProps) {
 
     const handleSearchChange = (e: React.ChangeEvent<HTMLInputElement>) => {
         setSearchTerm(e.target.value);
-        setCurrentPage(1); // Reset to page 1 on new search
     };
 
-    const handlePageChange = (newPage: number) => {
-        if (newPage < 1 || newPage > totalPages) return;
-        setCurrentPage(newPage);
+    // Suggestions are minimal; load the full exercise once one is picked
+    const handleSelect = async (suggestion: ExerciseSuggestion) => {
+        try {
+            onSelect(await getExerciseById(suggestion.id.toString()));
+        } catch (err) {
+            console.error('Failed to load exercise:', err);
+            setError('Failed to load exercise');
+        }
     };
 
     return (
@@ -86,7 +90,28 @@ export function ExerciseSelector({ onSelect }: ExerciseSelectorProps) {
 
             {/* Results Area */}
             <div className="min-h-[300px] max-h-[400px] overflow-y-auto">
-                {!hasSearched && searchTerm.length < 2 && (
+                {searchTerm.length < 2 && recent.length > 0 && (
+                    <div>
+                        <p className="px-3 pt-3 text-xs font-semibold text-gray-500 uppercase">Recently used</p>
+                        <ul>
+                            {recent.map(ex => (
+                                <li key={ex.id} className="border-b border-gray-100 last:border-b-0">
+                                    <button
+                                        onClick={() => handleSelect(ex)}
+                                        className="w-full text-left p-3 hover:bg-indigo-50 transition-colors"
+                                    >
+                                        <div className="font-medium text-gray-900">{ex.name}</div>
+                                        {ex.equipment && (
+                                            <div className="text-xs text-gray-500 mt-1 capitalize">{ex.equipment}</div>
+                                        )}
+                                    </button>
+                                </li>
+                            ))}
+                        </ul>
+                    </div>
+                )}
+
+                {!hasSearched && searchTerm.length < 2 && recent.length === 0 && (
                     <div className="p-8 text-center text-gray-500">
                         <p>Enter at least 2 characters to search for exercises</p>
                     </div>
@@ -111,66 +136,31 @@ export function ExerciseSelector({ onSelect }: ExerciseSelectorProps) {
                     </div>
                 )}
 
-                {!isLoading && hasSearched && exercises.length === 0 && searchTerm.length >= 2 && (
+                {!isLoading && hasSearched && suggestions.length === 0 && searchTerm.length >= 2 && (
                     <div className="p-8 text-center text-gray-500">
                         <p>No exercises found matching "{searchTerm}"</p>
                         <p className="text-sm mt-2">Try a different search term</p>
                     </div>
                 )}
 
-                {!isLoading && exercises.length > 0 && (
+                {!isLoading && suggestions.length > 0 && (
                     <ul>
-                        {exercises.map(ex => (
+                        {suggestions.map(ex => (
                             <li key={ex.id} className="border-b border-gray-100 last:border-b-0">
                                 <button
-                                    onClick={() => onSelect(ex)}
+                                    onClick={() => handleSelect(ex)}
                                     className="w-full text-left p-3 hover:bg-indigo-50 transition-colors"
                                 >
                                     <div className="font-medium text-gray-900">{ex.name}</div>
-                                    <div className="text-xs text-gray-500 mt-1 flex flex-wrap gap-1">
-                                        <span className="capitalize">{ex.category}</span>
-                                        {ex.primary_muscles.length > 0 && (
-                                            <>
-                                                <span>•</span>
-                                                {ex.primary_muscles.map(m => (
-                                                    <span key={m} className="bg-indigo-100 px-2 py-0.5 rounded capitalize">
-                                                        {m}
-                                                    </span>
-                                                ))}
-                                            </>
-                                        )}
-                                    </div>
+                                    {ex.equipment && (
+                                        <div className="text-xs text-gray-500 mt-1 capitalize">{ex.equipment}</div>
+                                    )}
                                 </button>
                             </li>
                         ))}
                     </ul>
                 )}
             </div>
-
-            {/* Pagination */}
-            {totalPages > 1 && (
-                <div className="p-3 border-t bg-gray-50 flex justify-between items-center">
-                    <button
-                        type="button"
-                        onClick={() => handlePageChange(currentPage - 1)}
-                        disabled={currentPage === 1}
-                        className="px-3 py-1 bg-white border border-gray-300 rounded-md text-sm disabled:opacity-50 disabled:cursor-not-allowed hover:bg-gray-50"
-                    >
-                        Previous
-                    </button>
-                    <span className="text-sm text-gray-600">
-                        Page {currentPage} of {totalPages}
-                    </span>
-                    <button
-                        type="button"
-                        onClick={() => handlePageChange(currentPage + 1)}
-                        disabled={currentPage === totalPages}
-                        className="px-3 py-1 bg-white border border-gray-300 rounded-md text-sm disabled:opacity-50 disabled:cursor-not-allowed hover:bg-gray-50"
-                    >
-                        Next
-                    </button>
-                </div>
-            )}
         </div>
     );
 }
\ No newline at end of file
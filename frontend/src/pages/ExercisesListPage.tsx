@@ -1,9 +1,9 @@
 import { useState, useEffect } from 'react';
 import { Link, useSearchParams } from 'react-router-dom';
-import { getExercises } from '@/api/exercises';
+import { getExercises, getExerciseFacets } from '@/api/exercises';
 import { getMuscleGroups } from '@/api/muscleGroups';
 import { getCategory } from '@/api/category';
-import type { Exercise } from '@/api/exercises';
+import type { Exercise, ExerciseFacets } from '@/api/exercises';
 // You might want to add an icon library, e.g., react-icons
 // import { FiFilter } from 'react-icons/fi';
 
@@ -19,6 +19,7 @@ function ExercisesListPage() {
     const [categories, setCategories] = useState<string[]>([]);
     const [primaryMuscles, setPrimaryMuscles] = useState('');
     const [muscleGroups, setMuscleGroups] = useState<string[]>([]);
+    const [facets, setFacets] = useState<ExerciseFacets | null>(null);
     
     // --- New state for mobile filter dropdown ---
     const [isFilterOpen, setIsFilterOpen] = useState(false);
@@ -64,6 +65,17 @@ function ExercisesListPage() {
             .finally(() => setIsLoading(false));
     }, [currentPage, appliedFilters]);
 
+    // Facet counts only depend on the filters, not on the page
+    useEffect(() => {
+        getExerciseFacets(appliedFilters)
+            .then(setFacets)
+            .catch(() => setFacets(null));
+    }, [appliedFilters]);
+
+    // Option label with its result count, once the counts are loaded
+    const withCount = (label: string, counts?: Record<string, number>) =>
+        counts && label in counts ? `${label} (${counts[label]})` : label;
+
     // (Omitted handlePageChange - no changes)
     const handlePageChange = (newPage: number) => {
         if (newPage < 1 || newPage > totalPages) return;
@@ -149,7 +161,7 @@ function ExercisesListPage() {
                                     >
                                         <option value="">All</option>
                                         {categories.map(cat => (
-                                            <option key={cat} value={cat}>{cat}</option>
+                                            <option key={cat} value={cat}>{withCount(cat, facets?.category)}</option>
                                         ))}
                                     </select>
                                 </div>
@@ -163,7 +175,7 @@ function ExercisesListPage() {
                                     >
                                         <option value="">All</option>
                                         {muscleGroups.map(group => (
-                                            <option key={group} value={group}>{group}</option>
+                                            <option key={group} value={group}>{withCount(group, facets?.primary_muscles)}</option>
                                         ))}
                                     </select>
                                 </div>
@@ -201,7 +213,7 @@ function ExercisesListPage() {
                             >
                                 <option value="">All</option>
                                 {categories.map(cat => (
-                                    <option key={cat} value={cat}>{cat}</option>
+                                    <option key={cat} value={cat}>{withCount(cat, facets?.category)}</option>
                                 ))}
                             </select>
                         </div>
@@ -215,7 +227,7 @@ function ExercisesListPage() {
                             >
                                 <option value="">All</option>
                                 {muscleGroups.map(group => (
-                                    <option key={group} value={group}>{group}</option>
+                                    <option key={group} value={group}>{withCount(group, facets?.primary_muscles)}</option>
                                 ))}
                             </select>
                         </div>
@@ -3,42 +3,83 @@ import { Link } from 'react-router-dom';
 import { getPublicProfiles } from '../api/profiles';
 import type { PublicProfile } from '../api/profiles';
 
-// If your API returns { results: PublicProfile[] }
-type ProfilesApiResponse = PublicProfile[] | { results: PublicProfile[] };
-
 function ProfilesListPage() {
     const [profiles, setProfiles] = useState<PublicProfile[]>([]);
+    const [nextUrl, setNextUrl] = useState<string | null>(null);
+    const [search, setSearch] = useState('');
     const [isLoading, setIsLoading] = useState(true);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
 
+    // Reload the first page whenever the (debounced) search changes
     useEffect(() => {
-        getPublicProfiles()
-            .then((data: ProfilesApiResponse) => {
-                if (Array.isArray(data)) {
-                    setProfiles(data);
-                } else if (data && Array.isArray((data as { results: PublicProfile[] }).results)) {
-                    setProfiles((data as { results: PublicProfile[] }).results);
-                } else {
+        const timeoutId = setTimeout(() => {
+            setIsLoading(true);
+            getPublicProfiles(search.trim() || undefined)
+                .then(page => {
+                    setProfiles(page.results);
+                    setNextUrl(page.next);
+                })
+                .catch(() => {
                     setProfiles([]);
-                }
-            })
-            .finally(() => setIsLoading(false));
-    }, []);
+                    setNextUrl(null);
+                })
+                .finally(() => setIsLoading(false));
+        }, 250);
+        return () => clearTimeout(timeoutId);
+    }, [search]);
 
-    if (isLoading) return <div className="text-center p-8">Loading profiles...</div>;
+    const loadMore = () => {
+        if (!nextUrl) return;
+        setIsLoadingMore(true);
+        getPublicProfiles(undefined, nextUrl)
+            .then(page => {
+                setProfiles(current => [...current, ...page.results]);
+                setNextUrl(page.next);
+            })
+            .finally(() => setIsLoadingMore(false));
+    };
 
     return (
         <div className="max-w-4xl mx-auto mt-10 p-8">
             <h1 className="text-3xl font-bold mb-6">Public Profiles</h1>
-            <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-                {profiles.map(profile => (
-                    <Link to={`/profiles/${profile.username}`} key={profile.username} className="block p-6 bg-white rounded-lg shadow-md hover:shadow-lg transition-shadow">
-                        <h2 className="text-xl font-bold text-indigo-600">
-                            {profile.first_name && profile.last_name ? `${profile.first_name} ${profile.last_name}` : profile.username}
-                        </h2>
-                        <p className="text-sm text-gray-500">@{profile.username}</p>
-                    </Link>
-                ))}
-            </div>
+            <input
+                type="text"
+                value={search}
+                onChange={e => setSearch(e.target.value)}
+                placeholder="Search by username"
+                className="mb-6 block w-full border-gray-300 rounded-md shadow-sm p-2 border"
+            />
+            {isLoading ? (
+                <div className="text-center p-8">Loading profiles...</div>
+            ) : (
+                <>
+                    <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+                        {profiles.map(profile => (
+                            <Link to={`/profiles/${profile.username}`} key={profile.username} className="block p-6 bg-white rounded-lg shadow-md hover:shadow-lg transition-shadow">
+                                <h2 className="text-xl font-bold text-indigo-600">
+                                    {profile.first_name && profile.last_name ? `${profile.first_name} ${profile.last_name}` : profile.username}
+                                </h2>
+                                <p className="text-sm text-gray-500">@{profile.username}</p>
+                            </Link>
+                        ))}
+                    </div>
+                    {profiles.length === 0 && (
+                        <p className="text-center text-gray-500">No public profiles found.</p>
+                    )}
+                    {nextUrl && (
+                        <div className="text-center mt-6">
+                            <button
+                                type="button"
+                                onClick={loadMore}
+                                disabled={isLoadingMore}
+                                className="bg-indigo-600 text-white px-4 py-2 rounded-md hover:bg-indigo-700 disabled:opacity-50"
+                            >
+                                {isLoadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
+                </>
+            )}
         </div>
     );
 }